@@ -21,9 +21,107 @@ load_dotenv(os.path.join(Path(__file__).resolve().parent.parent, '.env'))
 # Configurações do Gemini
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
 GEMINI_PRODUCT_NUMBER = os.environ.get('GEMINI_PRODUCT_NUMBER')
+# Modelo Gemini utilizado na geração dos guias
+GEMINI_MODEL_NAME = os.environ.get('GEMINI_MODEL_NAME', 'gemini-2.0-flash')
+# Número máximo de chamadas simultâneas ao Gemini por geração de guia
+GEMINI_MAX_CONCURRENCY = int(os.environ.get('GEMINI_MAX_CONCURRENCY', '6'))
+# Cotas da API usadas pelo limitador de taxa compartilhado (main/ratelimit.py)
+GEMINI_RPM = int(os.environ.get('GEMINI_RPM', '1000'))  # requisições por minuto
+GEMINI_TPM = int(os.environ.get('GEMINI_TPM', '1000000'))  # tokens por minuto
+GEMINI_ESTIMATED_OUTPUT_TOKENS = int(os.environ.get('GEMINI_ESTIMATED_OUTPUT_TOKENS', '2000'))
+GEMINI_RATE_LIMIT_RETRIES = int(os.environ.get('GEMINI_RATE_LIMIT_RETRIES', '3'))
+
+# Resiliência das chamadas ao Gemini: timeout, retentativas e circuit breaker
+GEMINI_REQUEST_TIMEOUT = int(os.environ.get('GEMINI_REQUEST_TIMEOUT', '120'))  # segundos por chamada
+GEMINI_MAX_RETRIES = int(os.environ.get('GEMINI_MAX_RETRIES', '3'))
+GEMINI_RETRY_BASE_DELAY = float(os.environ.get('GEMINI_RETRY_BASE_DELAY', '1.0'))  # segundos
+GEMINI_RETRY_MAX_DELAY = float(os.environ.get('GEMINI_RETRY_MAX_DELAY', '20.0'))  # segundos
+GEMINI_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('GEMINI_CIRCUIT_FAILURE_THRESHOLD', '5'))
+GEMINI_CIRCUIT_RESET_TIMEOUT = int(os.environ.get('GEMINI_CIRCUIT_RESET_TIMEOUT', '30'))  # segundos
+
+# Cache de contexto do Gemini para o prefixo compartilhado pelas partes de um guia
+GEMINI_CONTEXT_CACHE = os.environ.get('GEMINI_CONTEXT_CACHE', 'True') == 'True'
+# Mínimo de tokens do prefixo aceito pela API para o modelo configurado (4096 no gemini-2.0-flash);
+# abaixo dele as partes usam o contexto enxuto, sem o esqueleto completo
+GEMINI_CONTEXT_CACHE_MIN_TOKENS = int(os.environ.get('GEMINI_CONTEXT_CACHE_MIN_TOKENS', '4096'))
+GEMINI_CONTEXT_CACHE_TTL = int(os.environ.get('GEMINI_CONTEXT_CACHE_TTL', '900'))  # segundos
+
+# Estratégia de geração: 'oneshot' (uma chamada com o prompt completo),
+# 'fanout' (uma chamada por seção), 'pipeline' (uma chamada por seção, disparada
+# enquanto o esqueleto ainda chega) ou 'auto' (escolhe entre oneshot e fanout
+# por número de partes e cota disponível)
+GENERATION_STRATEGY = os.environ.get('GENERATION_STRATEGY', 'auto')
+GENERATION_ONESHOT_MAX_PARTS = int(os.environ.get('GENERATION_ONESHOT_MAX_PARTS', '3'))
+GENERATION_ONESHOT_PRESSURE_MAX_PARTS = int(os.environ.get('GENERATION_ONESHOT_PRESSURE_MAX_PARTS', '8'))
+
+# Cache persistente de guias completos
+GUIDE_CACHE_TTL = int(os.environ.get('GUIDE_CACHE_TTL', str(7 * 24 * 60 * 60)))  # 7 dias
+GUIDE_CACHE_MAX_ENTRIES = int(os.environ.get('GUIDE_CACHE_MAX_ENTRIES', '500'))
+# Links permanentes dos guias: validade após sair do cache e max-age do Cache-Control
+GUIDE_PERMALINK_TTL = int(os.environ.get('GUIDE_PERMALINK_TTL', str(90 * 24 * 60 * 60)))  # 90 dias
+GUIDE_PERMALINK_MAX_AGE = int(os.environ.get('GUIDE_PERMALINK_MAX_AGE', str(60 * 60)))  # 1 hora
+# Conteúdo armazenado dos guias: compressão ('zlib' ou 'zstd', com o pacote zstandard) e
+# dicionário compartilhado em main/dictionaries/<nome>.txt, gerado com
+# build_content_dictionary a partir de guias reais (vazio desativa)
+GUIDE_CONTENT_CODEC = os.environ.get('GUIDE_CONTENT_CODEC', 'zlib')
+GUIDE_CONTENT_COMPRESSION_LEVEL = int(os.environ.get('GUIDE_CONTENT_COMPRESSION_LEVEL', '9'))
+GUIDE_CONTENT_DICTIONARY = os.environ.get('GUIDE_CONTENT_DICTIONARY', '')
+# Intervalo entre as limpezas dos conteúdos sem seção, feitas pelo worker da fila
+GUIDE_CONTENT_PURGE_INTERVAL = int(os.environ.get('GUIDE_CONTENT_PURGE_INTERVAL', str(60 * 60)))  # 1 hora
+# Memorização das etapas (esqueleto, introdução, partes, conclusão) por hash do prompt
+SECTION_MEMO_TTL = int(os.environ.get('SECTION_MEMO_TTL', str(7 * 24 * 60 * 60)))  # 7 dias
+# Requisições idênticas simultâneas esperam a geração em andamento (main/singleflight.py)
+SINGLE_FLIGHT_TIMEOUT = float(os.environ.get('SINGLE_FLIGHT_TIMEOUT', '180'))  # espera máxima, em segundos
+SINGLE_FLIGHT_LOCK_TTL = int(os.environ.get('SINGLE_FLIGHT_LOCK_TTL', '600'))  # trava abandonada (worker morto)
+SINGLE_FLIGHT_POLL_INTERVAL = float(os.environ.get('SINGLE_FLIGHT_POLL_INTERVAL', '0.5'))  # segundos
+
+# Fila de geração em segundo plano (python manage.py run_generation_worker)
+GENERATION_JOB_STALE_AFTER = int(os.environ.get('GENERATION_JOB_STALE_AFTER', '600'))  # segundos sem progresso
+GENERATION_JOB_MAX_ATTEMPTS = int(os.environ.get('GENERATION_JOB_MAX_ATTEMPTS', '2'))
+# Sinal de vida do job enquanto uma etapa demora (chamada lenta, espera de retentativa ou de cota)
+GENERATION_JOB_HEARTBEAT_INTERVAL = float(os.environ.get(
+    'GENERATION_JOB_HEARTBEAT_INTERVAL', str(GENERATION_JOB_STALE_AFTER / 3)
+))  # segundos
+
+# Modo de manutenção (python manage.py set_maintenance_mode): releitura do estado
+# compartilhado a cada MAINTENANCE_CHECK_TTL segundos e caminhos que continuam acessíveis
+MAINTENANCE_CHECK_TTL = float(os.environ.get('MAINTENANCE_CHECK_TTL', '5'))  # segundos
+MAINTENANCE_RETRY_AFTER = int(os.environ.get('MAINTENANCE_RETRY_AFTER', '300'))  # segundos, cabeçalho Retry-After
+MAINTENANCE_EXEMPT_PATHS = ['/admin/', '/metrics/', '/static/']
+
+# Endpoint /metrics (formato Prometheus) com duração, tokens e retentativas por etapa
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+
+# Cache dos fragmentos HTML de cada seção, por hash do Markdown
+RENDER_FRAGMENT_TTL = int(os.environ.get('RENDER_FRAGMENT_TTL', str(24 * 60 * 60)))  # 1 dia
 # Configuração da ZukiJourney
 ZUKI_API_KEY = os.environ.get('ZUKI_API_KEY')
 
+# Provedor de LLM (main/llm): 'gemini', 'openai' (API compatível com a OpenAI,
+# ex: ZukiJourney) ou 'stub' (local e determinístico, para testes de carga)
+LLM_BACKEND = os.environ.get('LLM_BACKEND', 'gemini')
+OPENAI_COMPAT_BASE_URL = os.environ.get('OPENAI_COMPAT_BASE_URL', 'https://api.zukijourney.com/v1')
+OPENAI_COMPAT_MODEL = os.environ.get('OPENAI_COMPAT_MODEL', 'gpt-4o-mini')
+# Configuração de geração padrão dos provedores, no formato do Gemini; variáveis
+# não definidas ficam com o padrão do modelo. A configuração de cada chamada
+# (ex: o JSON do esqueleto) é aplicada por cima desta.
+LLM_GENERATION_CONFIG = {
+    key: cast(os.environ[variable])
+    for key, variable, cast in (
+        ('temperature', 'LLM_TEMPERATURE', float),
+        ('top_p', 'LLM_TOP_P', float),
+        ('max_output_tokens', 'LLM_MAX_OUTPUT_TOKENS', int),
+    )
+    if os.environ.get(variable)
+}
+# Provedor stub: latência média até o primeiro token, velocidade de geração e 429 simulado
+LLM_STUB_LATENCY = float(os.environ.get('LLM_STUB_LATENCY', '0.2'))  # segundos
+LLM_STUB_LATENCY_DISTRIBUTION = os.environ.get('LLM_STUB_LATENCY_DISTRIBUTION', 'fixed')  # fixed, exponential ou lognormal
+LLM_STUB_LATENCY_SIGMA = float(os.environ.get('LLM_STUB_LATENCY_SIGMA', '0.5'))  # dispersão da log-normal
+LLM_STUB_TOKENS_PER_SECOND = float(os.environ.get('LLM_STUB_TOKENS_PER_SECOND', '200'))
+LLM_STUB_OUTPUT_TOKENS = int(os.environ.get('LLM_STUB_OUTPUT_TOKENS', '800'))  # tamanho aproximado de cada parte
+LLM_STUB_RATE_LIMIT_EVERY = int(os.environ.get('LLM_STUB_RATE_LIMIT_EVERY', '0'))  # 0 desativa o 429 simulado
+
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -69,8 +167,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'main.middleware.MaintenanceModeMiddleware',  # Primeiro: em manutenção, nada mais precisa rodar
+    'main.middleware.ServerTimingMiddleware',  # Cabeçalho Server-Timing com as etapas da geração
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Adicionar WhiteNoise para servir arquivos estáticos
+    'main.middleware.StaticFilesMiddleware',  # WhiteNoise (arquivos estáticos), também em modo assíncrono
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -123,6 +223,16 @@ else:
         }
     }
 
+# Cache em memória do processo (fragmentos HTML das seções)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('RENDER_FRAGMENT_MAX_ENTRIES', '2000')),
+        },
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -1,3 +1,108 @@
 from django.contrib import admin
+from django.template.defaultfilters import filesizeformat
 
-# Register your models here.
+from .models import (
+    ContentBlob,
+    GenerationJob,
+    GenerationLock,
+    Guide,
+    GuideCacheStats,
+    GuideSection,
+    MaintenanceMode,
+    SectionMemo,
+)
+
+
+class GuideSectionInline(admin.TabularInline):
+    model = GuideSection
+    fields = ('position', 'key')
+    readonly_fields = ('position', 'key')
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Guide)
+class GuideAdmin(admin.ModelAdmin):
+    list_display = ('tema', 'num_partes', 'model_name', 'hits', 'size', 'created_at', 'last_accessed_at', 'retired_at')
+    list_filter = ('model_name', 'num_partes', ('retired_at', admin.EmptyFieldListFilter))
+    search_fields = ('tema', 'normalized_tema', 'public_id')
+    readonly_fields = ('public_id', 'cache_key', 'prompt_version', 'content_hash', 'size_bytes', 'hits', 'created_at',
+                       'updated_at', 'last_accessed_at', 'retired_at')
+    inlines = [GuideSectionInline]
+
+    @admin.display(description='tamanho')
+    def size(self, obj):
+        return filesizeformat(obj.size_bytes)
+
+
+@admin.register(ContentBlob)
+class ContentBlobAdmin(admin.ModelAdmin):
+    list_display = ('digest', 'codec', 'dictionary', 'size_display', 'stored_size', 'created_at')
+    list_filter = ('codec', 'dictionary')
+    fields = ('digest', 'codec', 'dictionary', 'size', 'created_at')
+    readonly_fields = fields
+
+    @admin.display(description='tamanho')
+    def size_display(self, obj):
+        return filesizeformat(obj.size)
+
+    @admin.display(description='armazenado')
+    def stored_size(self, obj):
+        return filesizeformat(len(obj.data))
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(GuideCacheStats)
+class GuideCacheStatsAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'hits', 'misses', 'hit_rate_display', 'bytes_saved_display')
+    readonly_fields = ('hits', 'misses', 'bytes_saved')
+
+    @admin.display(description='taxa de acertos')
+    def hit_rate_display(self, obj):
+        return f"{obj.hit_rate:.1%}"
+
+    @admin.display(description='dados economizados')
+    def bytes_saved_display(self, obj):
+        return filesizeformat(obj.bytes_saved)
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(SectionMemo)
+class SectionMemoAdmin(admin.ModelAdmin):
+    list_display = ('stage', 'model_name', 'digest', 'created_at')
+    list_filter = ('stage', 'model_name')
+    readonly_fields = ('digest', 'stage', 'model_name', 'created_at')
+
+
+@admin.register(GenerationJob)
+class GenerationJobAdmin(admin.ModelAdmin):
+    list_display = ('tema', 'num_partes', 'status', 'stage', 'completed_steps', 'total_steps', 'attempts', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('tema', 'public_id')
+    readonly_fields = ('public_id', 'worker', 'attempts', 'created_at', 'started_at', 'heartbeat_at', 'finished_at')
+
+
+@admin.register(GenerationLock)
+class GenerationLockAdmin(admin.ModelAdmin):
+    list_display = ('key', 'owner', 'created_at', 'expires_at')
+    readonly_fields = ('key', 'owner', 'created_at', 'expires_at')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(MaintenanceMode)
+class MaintenanceModeAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'enabled', 'updated_at')
+    list_editable = ('enabled',)
+    list_display_links = None
+
+    def has_add_permission(self, request):
+        return False
@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.test.signals import setting_changed
 
 
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main'
+
+    def ready(self):
+        from .llm import reset_backends
+
+        # Os provedores de LLM são criados uma vez por processo (ver main/llm/__init__.py);
+        # override_settings nos testes precisa recriá-los com as novas configurações
+        setting_changed.connect(reset_backends, dispatch_uid='main.llm.reset_backends')
@@ -0,0 +1,511 @@
+"""
+Benchmarks das etapas locais do pipeline (sem chamadas à API).
+
+Usados pelo comando `python manage.py benchmark`. Os guias sintéticos imitam
+a estrutura gerada pela IA (introdução com fases, conquistas e
+mini-desafios, partes longas e conclusão) para que o custo medido seja o do
+pós-processamento e da renderização.
+"""
+import random
+import re
+import time
+from functools import partial
+
+import markdown
+from django.conf import settings
+
+from .compression import CODEC_ZLIB, CODEC_ZSTD, compress, content_digest, decompress, zstandard
+from .guide_cache import guide_sections
+from .llm.stub import EMOJIS, WORDS, stub_conclusion, stub_intro, stub_part
+from .mini_challenges import process_mini_challenges
+from .prompts.guide_prompts import build_conclusion_prompt, build_intro_prompt
+from .rendering import MARKDOWN_EXTENSIONS, render_fragment, render_markdown
+from .skeleton import SkeletonPart, parse_skeleton
+from .titles import calculate_phase_distribution, synthesize_phase_titles
+
+
+def synthetic_guide(num_partes=22, paragraphs_per_part=40):
+    """Guia sintético no formato produzido pelo pipeline"""
+    intro = ["# Tema em {0} Partes: Seu Mapa para Dominar Tema do Zero".format(num_partes), "", "## O Que Você Vai Construir:"]
+    for phase in range(1, 4):
+        intro.append(f"{phase}️⃣ **Fase {phase}: Fase sintética {phase} (Partes 1-{num_partes})**")
+        for conquest in range(3):
+            intro.append(f"- **Conquista:** Habilidade {phase}.{conquest}")
+            intro.append(f"    - *Mini-desafio:* Tarefa prática {phase}.{conquest}")
+        intro.append("")
+    parts = []
+    for part_num in range(1, num_partes + 1):
+        lines = [f"# Parte {part_num}: Dominar o tópico {part_num} 🚀", "", f"- Dificuldade: {min(5, part_num)}/5", ""]
+        for paragraph in range(paragraphs_per_part):
+            lines.append(f"Parágrafo {paragraph} da parte {part_num} com **destaques**, `código` e exemplos concretos.")
+            lines.append("")
+            if paragraph % 10 == 0:
+                lines.append(f"- *Mini-desafio:* Exercício {paragraph} da parte {part_num}")
+                lines.append("")
+        parts.append("\n".join(lines))
+    conclusion = "# CONSIDERAÇÕES FINAIS\n## Síntese\nTexto final."
+    return "\n".join(intro) + "\n\n# PARTES\n\n" + "\n\n".join(parts) + "\n\n" + conclusion
+
+
+def synthetic_sections(num_partes=22, paragraphs_per_part=40):
+    """Apenas as partes do guia sintético, com mini-desafios fora de conquistas"""
+    guide = synthetic_guide(num_partes, paragraphs_per_part)
+    return guide.split("\n\n# PARTES\n\n", 1)[1]
+
+
+def synthetic_skeleton_text(num_partes=22):
+    """Esqueleto no formato de texto antigo, alternando títulos com e sem dois-pontos e emoji"""
+    entries = []
+    for part_num in range(1, num_partes + 1):
+        title = f"Dominar o tópico {part_num}: aplicações práticas" if part_num % 2 else f"Fundamentos do tópico {part_num}"
+        emoji = " 🚀" if part_num % 3 else ""
+        header = f"**Parte {part_num}:**" if part_num % 4 else f"Parte {part_num}:"
+        entries.append(
+            f"{header}\n- Título: {title}{emoji}\n- Tópicos principais:\n"
+            f"  - Conceito {part_num}.1\n  - Conceito {part_num}.2\n- Nível de dificuldade: {min(5, part_num)}"
+        )
+    return "\n\n".join(entries)
+
+
+SAMPLE_TEMAS = ("Python", "História do Brasil", "Física Quântica", "Culinária Italiana", "Inteligência Artificial")
+
+
+def synthetic_guide_sections(tema, num_partes=12, seed=0):
+    """Seções de um guia no formato do provedor stub (como devolvido por order_sections)"""
+    rng = random.Random(f"{tema}:{num_partes}:{seed}")
+    return {
+        'intro': stub_intro(rng, tema, num_partes),
+        'parts': [
+            stub_part(rng, part_num, f"Dominar {rng.choice(WORDS)} {rng.choice(EMOJIS)}", settings.LLM_STUB_OUTPUT_TOKENS)
+            for part_num in range(1, num_partes + 1)
+        ],
+        'conclusion': stub_conclusion(rng, "# CONSIDERAÇÕES FINAIS"),
+    }
+
+
+def prompt_template_headings(tema, num_partes):
+    """Títulos (linhas com #) que os prompts da introdução e da conclusão pedem na resposta"""
+    distribution = calculate_phase_distribution(num_partes)
+    prompts = (
+        build_intro_prompt(tema, num_partes, ["Fase"] * 3, distribution),
+        build_conclusion_prompt(tema, num_partes),
+    )
+    return "\n".join(
+        line.strip() for prompt in prompts for line in prompt.splitlines() if line.strip().startswith('#')
+    )
+
+
+def synthetic_content_samples(guides=30, seed=0):
+    """
+    Markdown e HTML das seções de guias sintéticos de 2 a 12 partes, como
+    gravados em ContentBlob, mais os títulos fixos pedidos pelos prompts
+    (o provedor stub não os reproduz).
+    """
+    samples = []
+    for index in range(guides):
+        tema = SAMPLE_TEMAS[index % len(SAMPLE_TEMAS)]
+        num_partes = 2 + index % 11
+        contents = [content for _, content in guide_sections(synthetic_guide_sections(tema, num_partes, seed + index))]
+        contents.append(prompt_template_headings(tema, num_partes))
+        for content in contents:
+            samples.append(content)
+            samples.append(str(render_fragment(content)))
+    return samples
+
+
+def best_time(fn, *args, repeat=5):
+    """Menor tempo (em segundos) entre repeat execuções de fn(*args)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def format_table(rows):
+    """Linhas de texto de uma tabela com as chaves de rows como colunas"""
+    columns = list(rows[0])
+    lines = ['  '.join(f'{column:>14}' for column in columns)]
+    for row in rows:
+        lines.append('  '.join(
+            f'{row[column]:>14.2f}' if isinstance(row[column], float) else f'{row[column]:>14}'
+            for column in columns
+        ))
+    return lines
+
+
+def benchmark_mini_challenges(scales=(1, 2, 4, 8), repeat=5):
+    """
+    Compara a implementação anterior com a de passagem única em guias de
+    22 partes cada vez mais longos, no guia completo e nas partes avulsas
+    (mini-desafios sem conquista, o caso quadrático da versão anterior).
+    """
+    rows = []
+    for shape, builder in (('guia', synthetic_guide), ('partes', synthetic_sections)):
+        for scale in scales:
+            text = builder(22, 40 * scale)
+            assert legacy_process_mini_challenges(text) == process_mini_challenges(text)
+            rows.append({
+                'shape': shape,
+                'lines': text.count("\n") + 1,
+                'legacy_ms': best_time(legacy_process_mini_challenges, text, repeat=repeat) * 1000,
+                'single_pass_ms': best_time(process_mini_challenges, text, repeat=repeat) * 1000,
+            })
+    return rows
+
+
+def legacy_render_markdown(markdown_text):
+    """Renderização anterior: pipeline do Markdown reconstruído a cada chamada"""
+    return markdown.markdown(
+        process_mini_challenges(markdown_text),
+        extensions=MARKDOWN_EXTENSIONS,
+        output_format='html5'
+    )
+
+
+def benchmark_rendering(calls=200, repeat=5):
+    """
+    Custo por chamada da renderização com o pipeline reconstruído a cada vez
+    e com a instância reaproveitada, em uma seção curta (onde a montagem do
+    pipeline domina) e em um guia completo de 22 partes.
+    """
+    short_section = "# Parte 1: Dominar o básico 🚀\n\n- Dificuldade: 1/5\n\nTexto com **destaque**."
+    samples = (('seção curta', short_section), ('guia 22 partes', synthetic_guide(22, 40)))
+    render_markdown(short_section)  # Instância da thread já criada, como em produção
+    rows = []
+    for name, text in samples:
+        assert legacy_render_markdown(text) == str(render_markdown(text))
+        batch = max(1, calls // (len(text) // 1000 + 1))
+
+        def run(renderer):
+            for _ in range(batch):
+                renderer(text)
+
+        rows.append({
+            'sample': name,
+            'chars': len(text),
+            'legacy_ms': best_time(run, legacy_render_markdown, repeat=repeat) * 1000 / batch,
+            'reused_ms': best_time(run, render_markdown, repeat=repeat) * 1000 / batch,
+        })
+    return rows
+
+
+def benchmark_storage(guides=20, repeat=5):
+    """
+    Espaço ocupado pelo conteúdo de guias sintéticos (Markdown e HTML de
+    cada seção) com cada codec, com e sem o dicionário compartilhado, antes
+    e depois da deduplicação por hash, e o custo de descomprimir uma seção.
+    """
+    # Sementes diferentes das usadas por build_content_dictionary --source synthetic
+    samples = synthetic_content_samples(guides, seed=1000)
+    unique_samples = list({content_digest(text): text for text in samples}.values())
+    dictionary = settings.GUIDE_CONTENT_DICTIONARY
+    configs = [('zlib', CODEC_ZLIB, '')]
+    if dictionary:
+        configs.append((f'zlib+{dictionary}', CODEC_ZLIB, dictionary))
+    if zstandard is not None:
+        configs.append(('zstd', CODEC_ZSTD, ''))
+        if dictionary:
+            configs.append((f'zstd+{dictionary}', CODEC_ZSTD, dictionary))
+
+    rows = []
+    for name, codec, config_dictionary in configs:
+        stored = {content_digest(text): compress(text, codec, config_dictionary) for text in unique_samples}
+        assert all(decompress(*stored[content_digest(text)]) == text for text in unique_samples)
+
+        def read_all():
+            for blob in stored.values():
+                decompress(*blob)
+
+        rows.append({
+            'config': name,
+            'raw_kib': sum(len(text.encode('utf-8')) for text in samples) / 1024,
+            'stored_kib': sum(len(stored[content_digest(text)][2]) for text in samples) / 1024,
+            'dedup_kib': sum(len(data) for _, _, data in stored.values()) / 1024,
+            'read_us': best_time(read_all, repeat=repeat) * 1e6 / len(stored),
+        })
+    return rows
+
+
+def plan_titles(skeleton_content, num_partes, parse, synthesize):
+    """Trabalho local do planejamento: parser de texto do esqueleto, fases e títulos das fases"""
+    skeleton_parts = parse(skeleton_content, num_partes)
+    return synthesize(skeleton_parts, calculate_phase_distribution(num_partes))
+
+
+def benchmark_titles(part_counts=(3, 6, 12, 22), calls=200, repeat=5):
+    """
+    Custo por requisição (em microssegundos) do parser de texto do esqueleto
+    e da síntese dos títulos das fases, com as expressões regulares montadas
+    a cada chamada e pré-compiladas em main/skeleton.py e main/titles.py.
+    """
+    rows = []
+    for num_partes in part_counts:
+        text = synthetic_skeleton_text(num_partes)
+        legacy = partial(plan_titles, text, num_partes, legacy_parse_skeleton, legacy_synthesize_phase_titles)
+        precompiled = partial(plan_titles, text, num_partes, parse_skeleton, synthesize_phase_titles)
+        assert legacy() == precompiled()
+
+        def run(fn):
+            for _ in range(calls):
+                fn()
+
+        rows.append({
+            'parts': num_partes,
+            'legacy_us': best_time(run, legacy, repeat=repeat) * 1e6 / calls,
+            'precompiled_us': best_time(run, precompiled, repeat=repeat) * 1e6 / calls,
+        })
+    return rows
+
+
+def legacy_parse_skeleton(skeleton_content, num_partes):
+    """Parser de texto anterior (padrões montados por parte a cada chamada), mantido como referência"""
+    skeleton_parts = {}
+    for part in range(1, num_partes + 1):
+        patterns = [
+            rf"\*\*Parte {part}:\*\*\n- Título: (.*?)\n- Tópicos principais:\n(.*?)\n- Nível de dificuldade: (\d+)",
+            rf"Parte {part}:\n- Título: (.*?)\n- Tópicos principais:\n(.*?)\n- Nível de dificuldade: (\d+)",
+            rf"Parte {part}:\s*\n\s*- Título: (.*?)\n\s*- Tópicos principais:\n(.*?)\n\s*- Nível de dificuldade: (\d+)"
+        ]
+
+        match = None
+        for pattern in patterns:
+            match = re.search(pattern, skeleton_content, re.DOTALL)
+            if match:
+                break
+
+        if match:
+            title = match.group(1).strip()
+            topics_text = match.group(2)
+            topics = [line.strip().lstrip('- ') for line in topics_text.strip().split("\n")]
+            difficulty = int(match.group(3).strip())
+            skeleton_parts[part] = SkeletonPart(title=title, topics=topics, difficulty=difficulty)
+    return skeleton_parts
+
+
+def legacy_extract_emoji(title):
+    emoji_pattern = re.compile(r'[\U00010000-\U0010ffff]', flags=re.UNICODE)
+    emojis = emoji_pattern.findall(title)
+    return emojis[0] if emojis else "📚"
+
+
+def legacy_synthesize_phase_titles(skeleton_parts, phase_distribution):
+    """Síntese anterior dos títulos das fases, mantida como referência de saída e desempenho"""
+    phase_titles = []
+
+    for phase_idx, (start, end) in enumerate(phase_distribution, 1):
+        if start == end:
+            phase_title = skeleton_parts[start].title
+            phase_titles.append(f"{phase_title}")
+        else:
+            part_titles = [skeleton_parts[i].title for i in range(start, end + 1)]
+            part_titles_base = [re.sub(r'[\U00010000-\U0010ffff]', '', title).strip() for title in part_titles]
+
+            emojis = []
+            for i in range(start, end + 1):
+                emoji = legacy_extract_emoji(skeleton_parts[i].title)
+                if emoji:
+                    emojis.append(emoji)
+
+            selected_emoji = "".join(emojis[:2]) if emojis else "🔄"
+
+            if len(part_titles_base) == 2:
+                processed_titles = []
+                for title in part_titles_base:
+                    if ":" in title:
+                        prefix, suffix = title.split(":", 1)
+                        processed_titles.append((prefix.strip(), suffix.strip()))
+                    else:
+                        processed_titles.append((title, ""))
+
+                if processed_titles[0][1] and processed_titles[1][1]:
+                    prefix1, suffix1 = processed_titles[0]
+                    prefix2, suffix2 = processed_titles[1]
+                    synthetic_title = f"{prefix1} e {prefix2} – {suffix1} e {suffix2}"
+                elif processed_titles[0][1]:
+                    prefix1, suffix1 = processed_titles[0]
+                    title2 = processed_titles[1][0]
+                    synthetic_title = f"{prefix1} e {title2} – {suffix1}"
+                elif processed_titles[1][1]:
+                    title1 = processed_titles[0][0]
+                    prefix2, suffix2 = processed_titles[1]
+                    synthetic_title = f"{title1} e {prefix2} – {suffix2}"
+                else:
+                    synthetic_title = f"{processed_titles[0][0]} e {processed_titles[1][0]}"
+            else:
+                processed_titles = []
+                for title in part_titles_base:
+                    if ":" in title:
+                        prefix, suffix = title.split(":", 1)
+                        processed_titles.append(f"{prefix} – {suffix}")
+                    else:
+                        processed_titles.append(title)
+
+                synthetic_title = " + ".join(processed_titles)
+
+            synthetic_title = f"{synthetic_title} {selected_emoji}"
+            phase_titles.append(synthetic_title)
+
+    return phase_titles
+
+
+def legacy_process_mini_challenges(markdown_text):
+    """Implementação anterior (quadrática), mantida como referência de saída e desempenho"""
+    # Garantir quebras de linha consistentes
+    markdown_text = markdown_text.replace("\r\n", "\n")
+
+    # Corrigir setas duplicadas antes do processamento
+    markdown_text = markdown_text.replace('↳ ↳', '↳')
+
+    # Pré-processamento: inserir marcadores de início de fase
+    phase_pattern = r'(^\d+️⃣\s+\*\*Fase\s+\d+:.*?\*\*\s*$)'
+    markdown_text = re.sub(phase_pattern, r'<!-- phase-marker -->\n\1', markdown_text, flags=re.MULTILINE)
+
+    # Dividir o conteúdo em linhas para processamento
+    lines = markdown_text.split('\n')
+    result_lines = []
+
+    # Mapeamento para rastrear as conquistas e seus mini-desafios
+    conquest_map = {}
+    current_conquest = None
+    current_phase = None
+
+    # Primeira passagem: identificar todas as conquistas e fases
+    for i, line in enumerate(lines):
+        if '<!-- phase-marker -->' in line:
+            current_phase = i + 1  # A linha seguinte contém a fase
+
+        if "**Conquista:**" in line or "*Conquista:*" in line:
+            conquest_id = f"conquest-{len(conquest_map)}"
+            conquest_map[conquest_id] = {
+                'line_number': i,
+                'phase': current_phase,
+                'mini_challenges': []
+            }
+            current_conquest = conquest_id
+
+        if ("*Mini-desafio:*" in line or "Mini-desafio:" in line) and current_conquest:
+            conquest_map[current_conquest]['mini_challenges'].append(i)
+
+    # Segunda passagem: processar todas as linhas e criar estrutura aninhada
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+
+        # Substituir marcador de fase
+        if '<!-- phase-marker -->' in line:
+            result_lines.append('')  # Linha em branco para separar
+            i += 1
+            continue
+
+        # Identificar linhas de conquistas e aplicar classes
+        if "**Conquista:**" in line or "*Conquista:*" in line:
+            # Adicionar classe e começar uma estrutura para a conquista
+            conquest_line = line.replace("- **Conquista:**", "- <span class='conquest-marker'>**Conquista:**</span>")
+            conquest_line = conquest_line.replace("- *Conquista:*", "- <span class='conquest-marker'>*Conquista:*</span>")
+            result_lines.append(conquest_line)
+
+            # Verificar se a próxima linha é um mini-desafio
+            has_mini_challenge = False
+
+            # Procurar pela próxima linha para verificar se é um mini-desafio
+            next_index = i + 1
+            while next_index < len(lines) and not ("**Conquista:**" in lines[next_index] or "*Conquista:*" in lines[next_index]):
+                if "*Mini-desafio:*" in lines[next_index] or "Mini-desafio:" in lines[next_index]:
+                    has_mini_challenge = True
+                    break
+                next_index += 1
+
+            if has_mini_challenge:
+                # Começar uma lista HTML explícita para os mini-desafios
+                result_lines.append("<ul class='mini-challenges-list'>")
+
+                # Encontrar e processar todos os mini-desafios consecutivos
+                next_i = i + 1
+                while next_i < len(lines):
+                    if "**Conquista:**" in lines[next_i] or "*Conquista:*" in lines[next_i]:
+                        break
+
+                    if "*Mini-desafio:*" in lines[next_i] or "Mini-desafio:" in lines[next_i]:
+                        mini_line = lines[next_i].strip()
+                        if mini_line.startswith("- "):
+                            mini_line = mini_line[2:]
+
+                        # Aplicar formatação consistente
+                        mini_line = mini_line.replace("*Mini-desafio:*", "<span class='mini-desafio'>↳ <em>Mini-desafio:</em></span>")
+                        mini_line = mini_line.replace("Mini-desafio:", "<span class='mini-desafio'>↳ <em>Mini-desafio:</em></span>")
+
+                        # Adicionar como item de lista
+                        result_lines.append(f"  <li class='mini-challenge'>{mini_line}</li>")
+
+                        # Marcar como processado para evitar duplicação
+                        lines[next_i] = f"<!-- processed: {next_i} -->"
+
+                    next_i += 1
+
+                # Fechar a lista de mini-desafios
+                result_lines.append("</ul>")
+
+        # Se for um mini-desafio já processado, pular
+        elif line.startswith("<!-- processed:"):
+            pass
+        # Se for um mini-desafio órfão (não vinculado diretamente a uma conquista)
+        elif "*Mini-desafio:*" in line or "Mini-desafio:" in line:
+            # Tentar encontrar a última conquista para associar
+            last_conquest_index = -1
+            for j in range(len(result_lines) - 1, -1, -1):
+                if "conquest-marker" in result_lines[j]:
+                    last_conquest_index = j
+                    break
+
+            if last_conquest_index >= 0:
+                # Verificar se já existe uma lista de mini-desafios
+                if last_conquest_index + 1 < len(result_lines) and result_lines[last_conquest_index + 1] == "<ul class='mini-challenges-list'>":
+                    # Encontrar o último </ul> para adicionar antes dele
+                    for k in range(last_conquest_index + 2, len(result_lines)):
+                        if result_lines[k] == "</ul>":
+                            # Formatar mini-desafio
+                            mini_line = line.strip()
+                            if mini_line.startswith("- "):
+                                mini_line = mini_line[2:]
+
+                            mini_line = mini_line.replace("*Mini-desafio:*", "<span class='mini-desafio'>↳ <em>Mini-desafio:</em></span>")
+                            mini_line = mini_line.replace("Mini-desafio:", "<span class='mini-desafio'>↳ <em>Mini-desafio:</em></span>")
+
+                            # Adicionar à lista existente
+                            result_lines.insert(k, f"  <li class='mini-challenge'>{mini_line}</li>")
+                            break
+                else:
+                    # Criar nova lista para mini-desafios
+                    result_lines.insert(last_conquest_index + 1, "<ul class='mini-challenges-list'>")
+
+                    # Formatar mini-desafio
+                    mini_line = line.strip()
+                    if mini_line.startswith("- "):
+                        mini_line = mini_line[2:]
+
+                    mini_line = mini_line.replace("*Mini-desafio:*", "<span class='mini-desafio'>↳ <em>Mini-desafio:</em></span>")
+                    mini_line = mini_line.replace("Mini-desafio:", "<span class='mini-desafio'>↳ <em>Mini-desafio:</em></span>")
+
+                    # Adicionar mini-desafio à lista
+                    result_lines.insert(last_conquest_index + 2, f"  <li class='mini-challenge'>{mini_line}</li>")
+                    result_lines.insert(last_conquest_index + 3, "</ul>")
+            else:
+                # Se não encontrar conquista, adicionar o mini-desafio normalmente
+                result_lines.append(line)
+        else:
+            # Outras linhas são adicionadas sem alteração
+            result_lines.append(line)
+
+        i += 1
+
+    # Limpar linhas vazias consecutivas
+    cleaned_lines = []
+    for i, line in enumerate(result_lines):
+        if i > 0 and line.strip() == '' and result_lines[i-1].strip() == '':
+            continue
+        cleaned_lines.append(line)
+
+    return '\n'.join(cleaned_lines)
@@ -0,0 +1,149 @@
+"""
+Compressão do conteúdo armazenado dos guias (Markdown e HTML das seções).
+
+Cada texto é comprimido com settings.GUIDE_CONTENT_CODEC ('zlib' ou 'zstd',
+este só com o pacote opcional zstandard instalado) e, opcionalmente, com um
+dicionário compartilhado (settings.GUIDE_CONTENT_DICTIONARY): trechos que se
+repetem entre os guias, como títulos fixos das seções e a marcação HTML de
+conquistas e mini-desafios, que o compressor referencia em vez de repetir
+em cada seção. Textos que não ficam menores são guardados sem compressão.
+
+O codec e o nome do dicionário ficam gravados junto com os dados, então
+trocar as configurações não impede a leitura do que já foi armazenado. Os
+dicionários ficam em main/dictionaries/<nome>.txt e não devem ser alterados
+depois de usados; um dicionário novo (python manage.py
+build_content_dictionary) recebe outro nome.
+"""
+import hashlib
+import logging
+import re
+import zlib
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - dependência opcional
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+CODEC_RAW = 'raw'
+CODEC_ZLIB = 'zlib'
+CODEC_ZSTD = 'zstd'
+
+DICTIONARY_DIR = Path(__file__).resolve().parent / 'dictionaries'
+DICTIONARY_NAME_PATTERN = re.compile(r'^[\w-]+$')
+# O zlib só usa os últimos 32 KiB do dicionário
+DICTIONARY_SIZE = 32 * 1024
+
+# Trechos candidatos a entrar no dicionário: linhas inteiras e sequências de tags HTML
+MARKUP_PATTERN = re.compile(r'(?:<[^>]+>\s*)+')
+MIN_PIECE_LENGTH = 4
+
+
+def content_digest(text):
+    """Hash que identifica um texto armazenado (seções idênticas têm o mesmo)"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def configured_codec():
+    codec = settings.GUIDE_CONTENT_CODEC
+    if codec == CODEC_ZSTD and zstandard is None:
+        logger.warning("GUIDE_CONTENT_CODEC='zstd' sem o pacote zstandard instalado; usando zlib")
+        return CODEC_ZLIB
+    return codec
+
+
+@lru_cache(maxsize=None)
+def load_dictionary(name):
+    """Bytes do dicionário compartilhado main/dictionaries/<name>.txt"""
+    if not DICTIONARY_NAME_PATTERN.match(name):
+        raise ValueError(f"Nome de dicionário inválido: {name}")
+    return (DICTIONARY_DIR / f'{name}.txt').read_bytes()
+
+
+@lru_cache(maxsize=None)
+def zstd_dictionary(name):
+    return zstandard.ZstdCompressionDict(load_dictionary(name), dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+
+
+def compress(text, codec=None, dictionary=None):
+    """
+    Comprime o texto; retorna (codec, dicionário, dados). codec e dictionary
+    substituem as configurações (dictionary='' comprime sem dicionário).
+    """
+    raw = text.encode('utf-8')
+    codec = codec or configured_codec()
+    dictionary = settings.GUIDE_CONTENT_DICTIONARY if dictionary is None else dictionary
+    level = settings.GUIDE_CONTENT_COMPRESSION_LEVEL
+
+    if codec == CODEC_ZSTD:
+        if dictionary:
+            compressor = zstandard.ZstdCompressor(level=level, dict_data=zstd_dictionary(dictionary))
+        else:
+            compressor = zstandard.ZstdCompressor(level=level)
+        data = compressor.compress(raw)
+    elif codec == CODEC_ZLIB:
+        if dictionary:
+            compressor = zlib.compressobj(level, zdict=load_dictionary(dictionary))
+        else:
+            compressor = zlib.compressobj(level)
+        data = compressor.compress(raw) + compressor.flush()
+    else:
+        raise ValueError(f"Codec de compressão desconhecido: {codec}")
+
+    if len(data) >= len(raw):
+        return CODEC_RAW, '', raw
+    return codec, dictionary, data
+
+
+def decompress(codec, dictionary, data):
+    """Texto original de dados produzidos por compress"""
+    data = bytes(data)
+    if codec == CODEC_RAW:
+        raw = data
+    elif codec == CODEC_ZLIB:
+        decompressor = zlib.decompressobj(zdict=load_dictionary(dictionary)) if dictionary else zlib.decompressobj()
+        raw = decompressor.decompress(data) + decompressor.flush()
+    elif codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Conteúdo comprimido com zstd, mas o pacote zstandard não está instalado")
+        if dictionary:
+            decompressor = zstandard.ZstdDecompressor(dict_data=zstd_dictionary(dictionary))
+        else:
+            decompressor = zstandard.ZstdDecompressor()
+        raw = decompressor.decompress(data)
+    else:
+        raise ValueError(f"Codec de compressão desconhecido: {codec}")
+    return raw.decode('utf-8')
+
+
+def train_dictionary(samples, size=DICTIONARY_SIZE):
+    """
+    Monta um dicionário com os trechos (linhas e sequências de tags) que se
+    repetem em mais de uma amostra, até size bytes. Os trechos que mais
+    economizam (ocorrências x tamanho) ficam no fim, mais perto do texto
+    comprimido.
+    """
+    counts = Counter()
+    for sample in samples:
+        pieces = {line.strip() for line in sample.splitlines()}
+        pieces.update(match.group().strip() for match in MARKUP_PATTERN.finditer(sample))
+        counts.update(piece for piece in pieces if len(piece) >= MIN_PIECE_LENGTH)
+
+    common = sorted(
+        (piece for piece, count in counts.items() if count >= 2),
+        key=lambda piece: (counts[piece] * len(piece), piece),
+    )
+    chosen = []
+    total = 0
+    for piece in reversed(common):
+        piece_size = len(piece.encode('utf-8')) + 1
+        if total + piece_size <= size:
+            chosen.append(piece)
+            total += piece_size
+    return "\n".join(reversed(chosen)).encode('utf-8')
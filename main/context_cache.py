@@ -0,0 +1,98 @@
+"""
+Prefixo compartilhado pelas chamadas das partes de um mesmo guia.
+
+O contexto completo de um guia (tema, fases, esqueleto completo e regras
+comuns) só compensa quando vai para o cache de contexto do Gemini: o
+prefixo precisa ter pelo menos settings.GEMINI_CONTEXT_CACHE_MIN_TOKENS, o
+mínimo aceito pela API para o modelo. Nesse caso ele é enviado uma única
+vez como CachedContent, os prompts das partes começam por ele e cada parte
+manda apenas o seu trecho específico; os tokens do prefixo são cobrados a
+preço de cache.
+
+Caso contrário (prefixo pequeno, cache desativado ou erro da API), as
+partes usam o contexto enxuto, sem as fases e o esqueleto das demais
+partes (ver build_section_tasks), para não pagar o contexto completo em
+todas as chamadas.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from google.generativeai import caching
+
+from .llm.gemini import GeminiBackend
+
+logger = logging.getLogger(__name__)
+
+# Separador entre o prefixo compartilhado e o trecho de cada parte
+PREFIX_SEPARATOR = "\n\n"
+
+
+def join_prefix(prefix, prompt):
+    """Prompt completo de uma parte: prefixo compartilhado seguido do trecho específico"""
+    return f"{prefix}{PREFIX_SEPARATOR}{prompt}"
+
+
+class InlineContext:
+    """Sem cache remoto: cada chamada leva o prompt completo (usado também nos testes)"""
+    cached = False
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+
+    def resolve(self, llm, prompt):
+        """Provedor e texto a enviar para um prompt completo"""
+        return llm, prompt
+
+    def close(self):
+        pass
+
+
+class GeminiCachedContext(InlineContext):
+    """Prefixo armazenado como CachedContent; as partes enviam só o trecho específico"""
+    cached = True
+
+    def __init__(self, prefix, cached_content):
+        super().__init__(prefix)
+        self.cached_content = cached_content
+        self.cached_llm = GeminiBackend.from_cached_content(cached_content)
+
+    def resolve(self, llm, prompt):
+        head = self.prefix + PREFIX_SEPARATOR
+        if not prompt.startswith(head):
+            # Introdução e conclusão não usam o contexto das partes
+            return llm, prompt
+        return self.cached_llm, prompt[len(head):]
+
+    def close(self):
+        try:
+            self.cached_content.delete()
+        except Exception as cache_error:
+            # O cache expira sozinho pelo TTL; só registrar
+            logger.warning(f"Falha ao remover o cache de contexto: {str(cache_error)}")
+
+
+def open_shared_context(llm, prefix):
+    """
+    Cria o contexto compartilhado de um guia. Sempre retorna um contexto
+    utilizável: em qualquer falha do cache remoto (ou provedor sem cache de
+    contexto), o InlineContext.
+    """
+    if (
+        not llm.supports_context_cache
+        or not settings.GEMINI_CONTEXT_CACHE
+        or len(prefix) // 4 < settings.GEMINI_CONTEXT_CACHE_MIN_TOKENS
+    ):
+        return InlineContext(prefix)
+    try:
+        cached_content = caching.CachedContent.create(
+            model=llm.model_name,
+            display_name='chunkify-guide-context',
+            contents=[prefix],
+            ttl=timedelta(seconds=settings.GEMINI_CONTEXT_CACHE_TTL),
+        )
+    except Exception as cache_error:
+        logger.warning(f"Cache de contexto indisponível, enviando prompts completos: {str(cache_error)}")
+        return InlineContext(prefix)
+    logger.info(f"Cache de contexto criado: {cached_content.name}")
+    return GeminiCachedContext(prefix, cached_content)
@@ -0,0 +1,857 @@
+"""
+Motor de geração do guia.
+
+O planejamento (esqueleto estrutural e títulos das fases) é feito primeiro.
+A introdução, cada parte e a conclusão dependem apenas desse plano, então
+todas as chamadas à API são disparadas em paralelo por um pool de threads
+limitado por settings.GEMINI_MAX_CONCURRENCY. Os resultados são recolocados
+na ordem do guia antes da montagem final.
+
+Na estratégia 'pipeline' o plano não é uma etapa à parte: cada seção começa
+assim que as suas entradas chegam no streaming do esqueleto.
+"""
+import asyncio
+import logging
+import queue
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from .prompts.chunking_prompt import generate_prompt
+from .prompts.guide_prompts import (
+    build_conclusion_prompt,
+    build_guide_context_prompt,
+    build_intro_prompt,
+    build_part_context_prompt,
+    build_part_prompt,
+    build_skeleton_prompt,
+    build_skeleton_repair_prompt,
+)
+from .context_cache import join_prefix, open_shared_context
+from .metrics import record_cache_hit, record_usage, span
+from .ratelimit import arate_limited_call, get_rate_limiter, rate_limited_call
+from .rendering import PARTS_HEADING, render_fragment
+from .resilience import (
+    CircuitOpenError,
+    acall_with_retries,
+    call_with_retries,
+    get_circuit_breaker,
+    is_transient_error,
+)
+from .section_cache import forget_section, get_section, store_section
+from .skeleton import (
+    SKELETON_GENERATION_CONFIG,
+    IncrementalSkeletonParser,
+    missing_skeleton_parts,
+    parse_skeleton_response,
+)
+from .titles import calculate_phase_distribution, get_phase_for_part, synthesize_phase_titles
+
+logger = logging.getLogger(__name__)
+
+# Quantas vezes pedir apenas as partes que faltaram no esqueleto
+SKELETON_REPAIR_ATTEMPTS = 2
+
+
+def plan_guide(llm, tema, num_partes):
+    """
+    Gera o esqueleto estrutural (invisível ao usuário) e deriva dele o plano
+    do guia: partes do esqueleto, distribuição e títulos das fases.
+
+    Se o esqueleto vier incompleto, apenas as partes que faltaram são
+    pedidas novamente, em uma chamada pequena.
+    """
+    logger.info("Gerando esqueleto estrutural invisível para guiar a estrutura...")
+    skeleton_prompt = build_skeleton_prompt(tema, num_partes)
+    skeleton_content = generate_text(
+        llm,
+        skeleton_prompt,
+        "Resposta inválida na geração do esqueleto estrutural.",
+        stage='skeleton',
+        generation_config=SKELETON_GENERATION_CONFIG,
+    )
+    logger.debug(f"Esqueleto estrutural gerado com sucesso:\n{skeleton_content}")
+    with span('skeleton-parse'):
+        skeleton_parts = parse_skeleton_response(skeleton_content, num_partes)
+
+    repair_skeleton(llm, tema, num_partes, skeleton_parts)
+    return plan_from_skeleton(llm, skeleton_prompt, skeleton_parts, num_partes)
+
+
+def skeleton_repairs(tema, num_partes, skeleton_parts):
+    """
+    Tentativas de complementação do esqueleto: produz (prompt, partes
+    faltantes) enquanto faltarem partes, até SKELETON_REPAIR_ATTEMPTS vezes.
+    Quem consome chama o modelo e passa a resposta para merge_skeleton_repair
+    antes de pedir a próxima tentativa (ver repair_skeleton e aplan_guide).
+    """
+    for _ in range(SKELETON_REPAIR_ATTEMPTS):
+        missing_parts = missing_skeleton_parts(skeleton_parts, num_partes)
+        if not missing_parts:
+            return
+        logger.warning(f"Partes faltantes no esqueleto: {missing_parts}. Pedindo apenas essas partes")
+        yield build_skeleton_repair_prompt(tema, num_partes, skeleton_parts, missing_parts), missing_parts
+
+
+def merge_skeleton_repair(repair_content, skeleton_parts, missing_parts, num_partes):
+    """
+    Acrescenta ao esqueleto as partes que vieram na resposta de complementação;
+    retorna True se o esqueleto ficou completo
+    """
+    repaired_parts = parse_skeleton_response(repair_content, num_partes)
+    for part_num in missing_parts:
+        if part_num in repaired_parts:
+            skeleton_parts[part_num] = repaired_parts[part_num]
+    return not missing_skeleton_parts(skeleton_parts, num_partes)
+
+
+def repair_skeleton(llm, tema, num_partes, skeleton_parts):
+    """Pede novamente apenas as partes que faltaram no esqueleto, completando skeleton_parts"""
+    for repair_prompt, missing_parts in skeleton_repairs(tema, num_partes, skeleton_parts):
+        repair_content = generate_text(
+            llm,
+            repair_prompt,
+            "Resposta inválida na complementação do esqueleto estrutural.",
+            stage='skeleton-repair',
+            generation_config=SKELETON_GENERATION_CONFIG,
+        )
+        if not merge_skeleton_repair(repair_content, skeleton_parts, missing_parts, num_partes):
+            # Não reutilizar uma complementação incompleta na próxima tentativa
+            forget_section(repair_prompt, get_model_name(llm))
+
+
+def plan_from_skeleton(llm, skeleton_prompt, skeleton_parts, num_partes):
+    """Monta o plano do guia a partir das partes do esqueleto já extraídas"""
+    phase_distribution = calculate_phase_distribution(num_partes)
+
+    # Verificar se todas as partes foram encontradas
+    missing_parts = missing_skeleton_parts(skeleton_parts, num_partes)
+    if missing_parts:
+        logger.warning(f"Partes faltantes no esqueleto após a complementação: {missing_parts}")
+        # Não reutilizar um esqueleto em formato inválido na próxima tentativa
+        forget_section(skeleton_prompt, get_model_name(llm))
+        raise Exception(f"Falha ao extrair todas as partes do esqueleto ({len(skeleton_parts)}/{num_partes})")
+
+    return {
+        'skeleton_parts': skeleton_parts,
+        'phase_distribution': phase_distribution,
+        'phase_titles': synthesize_phase_titles(skeleton_parts, phase_distribution),
+    }
+
+
+def build_context_prefix(tema, num_partes, plan):
+    """Contexto completo das partes do guia, candidato ao cache de contexto"""
+    return build_guide_context_prompt(
+        tema,
+        num_partes,
+        plan['skeleton_parts'],
+        plan['phase_titles'],
+        plan['phase_distribution'],
+    )
+
+
+def build_section_tasks(tema, num_partes, plan, shared_context):
+    """
+    Monta a lista ordenada de tarefas (chave, prompt, mensagem de erro)
+    para introdução, partes e conclusão.
+
+    Os prompts das partes começam pelo contexto completo quando ele está em
+    cache (shared_context, ver main/context_cache.py); sem o cache, cada
+    chamada pagaria por ele de novo, então as partes levam só o contexto
+    enxuto, com o título, a fase e os tópicos da própria parte.
+    """
+    if shared_context.cached:
+        context_prefix = shared_context.prefix
+    else:
+        context_prefix = build_part_context_prompt(tema, num_partes)
+    tasks = [(
+        'intro',
+        build_intro_prompt(tema, num_partes, plan['phase_titles'], plan['phase_distribution']),
+        "Resposta inválida na geração da introdução.",
+    )]
+    for part_num in range(1, num_partes + 1):
+        tasks.append((
+            f'part-{part_num}',
+            join_prefix(context_prefix, build_part_prompt(
+                tema,
+                num_partes,
+                part_num,
+                plan['skeleton_parts'][part_num],
+                get_phase_for_part(part_num, plan['phase_distribution']),
+            )),
+            f"Resposta inválida na geração da parte {part_num}.",
+        ))
+    tasks.append((
+        'conclusion',
+        build_conclusion_prompt(tema, num_partes),
+        "Resposta inválida na geração da conclusão.",
+    ))
+    return tasks
+
+
+def get_model_name(llm):
+    """Nome do modelo usado como parte do endereço das etapas memorizadas"""
+    return llm.model_name
+
+
+def run_in_worker(fn, *args):
+    """Executa fn em uma thread do pool, liberando as conexões de banco da thread ao final"""
+    try:
+        return fn(*args)
+    finally:
+        connections.close_all()
+
+
+def call_model(llm, prompt, stage='section', stream=False, generation_config=None, shared_context=None):
+    """
+    Chamada ao modelo com timeout por requisição, limite de taxa,
+    retentativas com backoff exponencial e circuit breaker.
+
+    Com stream=True a chamada só retorna quando o primeiro trecho chega, então
+    falhas até ele (na criação do stream ou na espera pelo primeiro token)
+    também são repetidas. Uma falha no meio da resposta não é repetida, pois
+    os trechos anteriores já foram repassados: ela é propagada e, se
+    transitória, conta como falha no circuit breaker.
+
+    Com shared_context, prompts que começam pelo prefixo compartilhado são
+    enviados ao modelo com o prefixo em cache.
+    """
+    if shared_context is not None:
+        llm, prompt = shared_context.resolve(llm, prompt)
+    if stream:
+        request = partial(open_stream, llm.stream)
+    else:
+        request = llm.generate
+    response = call_with_retries(
+        lambda: rate_limited_call(
+            lambda: request(prompt, generation_config=generation_config, timeout=settings.GEMINI_REQUEST_TIMEOUT),
+            prompt,
+            count_tokens=not stream,
+        ),
+        stage,
+    )
+    return iter_stream(*response) if stream else response
+
+
+def open_stream(request, *args, **kwargs):
+    """Inicia uma resposta em streaming e espera o primeiro trecho; retorna (primeiro trecho ou None, demais)"""
+    chunks = iter(request(*args, **kwargs))
+    return next(chunks, None), chunks
+
+
+def iter_stream(first_chunk, chunks):
+    """Trechos de uma resposta aberta por open_stream; falhas no meio dela contam no circuit breaker"""
+    if first_chunk is None:
+        return
+    yield first_chunk
+    try:
+        yield from chunks
+    except Exception as stream_error:
+        if is_transient_error(stream_error):
+            get_circuit_breaker().record_failure()
+        raise
+
+
+async def acall_model(llm, prompt, stage='section', generation_config=None, shared_context=None):
+    """Versão assíncrona de call_model"""
+    if shared_context is not None:
+        llm, prompt = shared_context.resolve(llm, prompt)
+    return await acall_with_retries(
+        lambda: arate_limited_call(
+            lambda: llm.agenerate(prompt, generation_config=generation_config, timeout=settings.GEMINI_REQUEST_TIMEOUT),
+            prompt,
+        ),
+        stage,
+    )
+
+
+def generate_text(llm, prompt, error_message, stage='section', generation_config=None, shared_context=None):
+    """
+    Executa uma chamada ao modelo e devolve o texto da resposta.
+
+    A saída é memorizada pelo hash do prompt, então etapas já concluídas em
+    uma requisição anterior não chamam a API novamente.
+    """
+    with span(stage):
+        model_name = get_model_name(llm)
+        memoized = get_section(prompt, model_name)
+        if memoized is not None:
+            logger.info(f"Etapa '{stage}' reutilizada de uma geração anterior")
+            record_cache_hit('section')
+            return memoized
+
+        response = call_model(
+            llm, prompt, stage, generation_config=generation_config, shared_context=shared_context
+        )
+        record_usage(response.prompt_tokens, response.response_tokens)
+        if response.text:
+            store_section(prompt, model_name, stage, response.text)
+            return response.text
+        raise Exception(error_message)
+
+
+def stream_text(llm, prompt, error_message, on_delta, stage='section', generation_config=None,
+                shared_context=None):
+    """
+    Executa uma chamada em streaming ao modelo, repassando cada trecho de
+    texto recebido para on_delta, e devolve o texto completo da resposta.
+
+    Uma etapa memorizada é repassada para on_delta em um único trecho.
+    """
+    with span(stage):
+        model_name = get_model_name(llm)
+        memoized = get_section(prompt, model_name)
+        if memoized is not None:
+            logger.info(f"Etapa '{stage}' reutilizada de uma geração anterior")
+            record_cache_hit('section')
+            on_delta(memoized)
+            return memoized
+
+        chunks = []
+        for text in call_model(
+            llm, prompt, stage, stream=True, generation_config=generation_config, shared_context=shared_context
+        ):
+            chunks.append(text)
+            on_delta(text)
+        if not chunks:
+            raise Exception(error_message)
+        content = "".join(chunks)
+        store_section(prompt, model_name, stage, content)
+        return content
+
+
+class SectionFailures:
+    """Acompanha as seções que falharam durante a geração paralela"""
+
+    def __init__(self, total):
+        self.total = total
+        self.errors = {}
+
+    def result_or_none(self, key, future):
+        """Resultado da seção, ou None (com registro no log) se ela falhou"""
+        try:
+            return future.result()
+        except Exception as section_error:
+            logger.error(f"Seção '{key}' falhou e ficará faltando no guia: {str(section_error)}")
+            self.errors[key] = section_error
+            return None
+
+    def raise_if_all_failed(self):
+        if self.errors and len(self.errors) == self.total:
+            raise next(iter(self.errors.values()))
+
+
+def missing_section_markdown(key, tema, num_partes, plan):
+    """Conteúdo provisório de uma seção que não pôde ser gerada"""
+    notice = (
+        "> ⚠️ Esta seção não pôde ser gerada agora. Envie o formulário novamente "
+        "para completá-la; as seções já prontas serão reaproveitadas."
+    )
+    if key == 'intro':
+        return f"# {tema} em {num_partes} Partes: Seu Mapa para Dominar {tema} do Zero\n\n{notice}"
+    if key == 'conclusion':
+        return f"# CONSIDERAÇÕES FINAIS\n\n{notice}"
+    part_num = int(key.split('-', 1)[1])
+    return f"# Parte {part_num}: {plan['skeleton_parts'][part_num].title}\n\n{notice}"
+
+
+def describe_missing_sections(missing):
+    """Aviso exibido ao usuário quando o guia foi montado sem algumas seções"""
+    return (
+        f"{len(missing)} seção(ões) do guia não puderam ser geradas agora. "
+        "Envie o formulário novamente para completá-las; as seções já prontas serão reaproveitadas."
+    )
+
+
+def fill_missing_sections(results, tema, num_partes, plan):
+    """
+    Substitui as seções com conteúdo None pelo conteúdo provisório e
+    retorna a lista de chaves que ficaram faltando.
+    """
+    missing = [key for key, content in results.items() if content is None]
+    for key in missing:
+        results[key] = missing_section_markdown(key, tema, num_partes, plan)
+    return missing
+
+
+def iter_sections(llm, tema, num_partes, plan, max_concurrency=None):
+    """
+    Gera introdução, partes e conclusão em paralelo e produz tuplas
+    (chave, conteúdo) à medida que cada seção fica pronta, fora de ordem.
+
+    Uma seção que falha mesmo após as retentativas é produzida com conteúdo
+    None, para que o guia seja montado sem ela; as demais seções já ficam
+    memorizadas e uma nova requisição gera apenas as que faltaram. Se todas
+    as seções falharem, a primeira exceção é propagada.
+    """
+    shared_context = open_shared_context(llm, build_context_prefix(tema, num_partes, plan))
+    tasks = build_section_tasks(tema, num_partes, plan, shared_context)
+    max_concurrency = max_concurrency or settings.GEMINI_MAX_CONCURRENCY
+    workers = max(1, min(max_concurrency, len(tasks)))
+
+    logger.info(f"Gerando {len(tasks)} seções com até {workers} chamadas simultâneas")
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='gemini')
+    try:
+        generate = partial(generate_text, shared_context=shared_context)
+        # Cada thread roda em uma cópia do contexto, para herdar o trace da requisição
+        pending = {
+            executor.submit(copy_context().run, run_in_worker, generate, llm, prompt, error_message, key): key
+            for key, prompt, error_message in tasks
+        }
+        failures = SectionFailures(len(tasks))
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = pending.pop(future)
+                yield key, failures.result_or_none(key, future)
+        failures.raise_if_all_failed()
+    finally:
+        # Em caso de erro, não desperdiçar chamadas que ainda não começaram
+        executor.shutdown(wait=True, cancel_futures=True)
+        shared_context.close()
+
+
+def iter_section_events(llm, tema, num_partes, plan, max_concurrency=None):
+    """
+    Variante de iter_sections com streaming de tokens.
+
+    Produz tuplas ('delta', chave, trecho) para cada trecho recebido da API e
+    ('section', chave, conteúdo) quando uma seção termina. Os trechos de uma
+    mesma seção chegam sempre na ordem e antes do evento 'section' dela.
+    Falhas de seções são tratadas como em iter_sections.
+    """
+    shared_context = open_shared_context(llm, build_context_prefix(tema, num_partes, plan))
+    tasks = build_section_tasks(tema, num_partes, plan, shared_context)
+    max_concurrency = max_concurrency or settings.GEMINI_MAX_CONCURRENCY
+    workers = max(1, min(max_concurrency, len(tasks)))
+    events = queue.Queue()
+
+    def run_task(key, prompt, error_message):
+        return stream_text(
+            llm,
+            prompt,
+            error_message,
+            lambda text: events.put(('delta', key, text)),
+            stage=key,
+            shared_context=shared_context,
+        )
+
+    logger.info(f"Gerando {len(tasks)} seções em streaming com até {workers} chamadas simultâneas")
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='gemini')
+    try:
+        pending = {}
+        for key, prompt, error_message in tasks:
+            future = executor.submit(copy_context().run, run_in_worker, run_task, key, prompt, error_message)
+            pending[future] = key
+            # O callback roda após o último trecho da seção ter sido enfileirado
+            future.add_done_callback(lambda done: events.put(('section', done, None)))
+
+        failures = SectionFailures(len(tasks))
+        while pending:
+            kind, source, text = events.get()
+            if kind == 'delta':
+                yield 'delta', source, text
+            else:
+                key = pending.pop(source)
+                yield 'section', key, failures.result_or_none(key, source)
+        failures.raise_if_all_failed()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        shared_context.close()
+
+
+def generate_sections(llm, tema, num_partes, plan, max_concurrency=None):
+    """
+    Gera todas as seções em paralelo e as devolve na ordem do guia.
+
+    Retorna um dicionário com 'intro', 'parts' (lista na ordem das partes)
+    e 'conclusion'. Seções que falharam recebem o conteúdo provisório.
+    """
+    results = dict(iter_sections(llm, tema, num_partes, plan, max_concurrency))
+    fill_missing_sections(results, tema, num_partes, plan)
+    return order_sections(results, num_partes)
+
+
+def build_pipelined_part_task(tema, num_partes, part_num, skeleton_part, phase_distribution):
+    """Tarefa de uma parte no pipeline especulativo: depende apenas da entrada dela no esqueleto"""
+    return (
+        f'part-{part_num}',
+        join_prefix(build_part_context_prompt(tema, num_partes), build_part_prompt(
+            tema,
+            num_partes,
+            part_num,
+            skeleton_part,
+            get_phase_for_part(part_num, phase_distribution),
+        )),
+        f"Resposta inválida na geração da parte {part_num}.",
+    )
+
+
+def iter_pipelined_sections(llm, tema, num_partes, max_concurrency=None):
+    """
+    Pipeline especulativo: cada seção é disparada assim que as suas
+    entradas ficam prontas, em vez de esperar o esqueleto completo.
+
+    - a conclusão não depende do esqueleto e começa junto com ele;
+    - o esqueleto é pedido em streaming e cada parte começa assim que a sua
+      entrada chega completa (IncrementalSkeletonParser), com um prompt sem
+      o esqueleto das demais partes (build_part_context_prompt);
+    - a introdução precisa dos títulos de todas as fases e começa quando o
+      esqueleto termina (depois da complementação, se faltarem partes).
+
+    Produz ('skeleton', plano) quando o plano fica pronto e (chave, conteúdo)
+    para cada seção na ordem em que terminam; partes podem terminar antes do
+    esqueleto. Falhas de seções são tratadas como em iter_sections; uma
+    falha do esqueleto interrompe a geração, como em plan_guide.
+    """
+    phase_distribution = calculate_phase_distribution(num_partes)
+    skeleton_prompt = build_skeleton_prompt(tema, num_partes)
+    parser = IncrementalSkeletonParser(num_partes)
+    max_concurrency = max_concurrency or settings.GEMINI_MAX_CONCURRENCY
+    workers = max(1, min(max_concurrency, num_partes + 3))
+    events = queue.Queue()
+    pending = {}
+    started = set()
+
+    def on_delta(text):
+        # Roda na thread do esqueleto; as partes são disparadas pela thread principal
+        for part_num, skeleton_part in parser.feed(text):
+            events.put(('entry', part_num, skeleton_part))
+
+    def submit(key, prompt, error_message):
+        future = executor.submit(copy_context().run, run_in_worker, generate_text, llm, prompt, error_message, key)
+        pending[future] = key
+        future.add_done_callback(lambda done: events.put(('section', done, None)))
+
+    def start_part(part_num, skeleton_part):
+        if part_num not in started:
+            started.add(part_num)
+            submit(*build_pipelined_part_task(tema, num_partes, part_num, skeleton_part, phase_distribution))
+
+    logger.info(f"Gerando o esqueleto em streaming e {num_partes + 2} seções em pipeline com até {workers} chamadas simultâneas")
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='gemini')
+    try:
+        skeleton_future = executor.submit(
+            copy_context().run,
+            run_in_worker,
+            partial(stream_text, stage='skeleton', generation_config=SKELETON_GENERATION_CONFIG),
+            llm,
+            skeleton_prompt,
+            "Resposta inválida na geração do esqueleto estrutural.",
+            on_delta,
+        )
+        # As entradas são enfileiradas antes deste evento, que só ocorre após o último trecho
+        skeleton_future.add_done_callback(lambda done: events.put(('skeleton', done, None)))
+        submit('conclusion', build_conclusion_prompt(tema, num_partes), "Resposta inválida na geração da conclusão.")
+
+        failures = SectionFailures(num_partes + 2)
+        skeleton_done = False
+        while not skeleton_done or pending:
+            kind, source, value = events.get()
+            if kind == 'entry':
+                start_part(source, value)
+            elif kind == 'section':
+                key = pending.pop(source)
+                yield key, failures.result_or_none(key, source)
+            else:
+                skeleton_done = True
+                skeleton_content = source.result()
+                logger.debug(f"Esqueleto estrutural gerado com sucesso:\n{skeleton_content}")
+                with span('skeleton-parse'):
+                    skeleton_parts = parse_skeleton_response(skeleton_content, num_partes)
+                repair_skeleton(llm, tema, num_partes, skeleton_parts)
+                plan = plan_from_skeleton(llm, skeleton_prompt, skeleton_parts, num_partes)
+                # Partes que não vieram no streaming (ex: resposta em texto ou complementação)
+                for part_num, skeleton_part in sorted(skeleton_parts.items()):
+                    start_part(part_num, skeleton_part)
+                submit(
+                    'intro',
+                    build_intro_prompt(tema, num_partes, plan['phase_titles'], phase_distribution),
+                    "Resposta inválida na geração da introdução.",
+                )
+                yield 'skeleton', plan
+        failures.raise_if_all_failed()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+STRATEGY_ONESHOT = 'oneshot'
+STRATEGY_FANOUT = 'fanout'
+STRATEGY_PIPELINE = 'pipeline'
+STRATEGIES = (STRATEGY_ONESHOT, STRATEGY_FANOUT, STRATEGY_PIPELINE)
+
+PART_HEADING_PATTERN = re.compile(r'^#\s+Parte\s+(\d+)\b', re.MULTILINE)
+CONCLUSION_HEADING_PATTERN = re.compile(r'^#\s+(?:Conclusão|CONCLUSÃO|CONSIDERAÇÕES FINAIS)\b', re.MULTILINE)
+PARTS_DIVIDER_PATTERN = re.compile(r'^#\s+PARTES\b.*$', re.MULTILINE)
+
+
+def choose_strategy(num_partes, requested=None):
+    """
+    Escolhe entre gerar o guia em uma única chamada (oneshot) ou em uma
+    chamada por seção (fanout).
+
+    A escolha explícita da requisição tem precedência, depois a configurada
+    em settings.GENERATION_STRATEGY. No modo 'auto', guias pequenos usam uma
+    única chamada, assim como guias médios quando a cota disponível no
+    limitador não comporta todas as chamadas do fanout. O pipeline
+    especulativo ('pipeline') só é usado quando pedido explicitamente.
+    """
+    strategy = requested if requested in STRATEGIES else settings.GENERATION_STRATEGY
+    if strategy in STRATEGIES:
+        return strategy
+    if num_partes <= settings.GENERATION_ONESHOT_MAX_PARTS:
+        return STRATEGY_ONESHOT
+    fanout_calls = num_partes + 3  # esqueleto, introdução, partes e conclusão
+    if num_partes <= settings.GENERATION_ONESHOT_PRESSURE_MAX_PARTS and get_rate_limiter().headroom() < fanout_calls:
+        return STRATEGY_ONESHOT
+    return STRATEGY_FANOUT
+
+
+def split_guide_sections(markdown_text, num_partes):
+    """
+    Separa um guia gerado em uma única chamada em introdução, partes e
+    conclusão (no formato de order_sections). Retorna None se alguma parte
+    ou a conclusão não for encontrada.
+    """
+    part_headings = {}
+    for match in PART_HEADING_PATTERN.finditer(markdown_text):
+        part_headings.setdefault(int(match.group(1)), match.start())
+    conclusion = CONCLUSION_HEADING_PATTERN.search(markdown_text)
+    if conclusion is None or sorted(part_headings) != list(range(1, num_partes + 1)):
+        return None
+
+    starts = [part_headings[part_num] for part_num in range(1, num_partes + 1)]
+    if starts != sorted(starts) or starts[-1] > conclusion.start():
+        return None
+    ends = starts[1:] + [conclusion.start()]
+
+    intro = PARTS_DIVIDER_PATTERN.sub('', markdown_text[:starts[0]]).strip()
+    return {
+        'intro': intro,
+        'parts': [markdown_text[start:end].strip() for start, end in zip(starts, ends)],
+        'conclusion': markdown_text[conclusion.start():].strip(),
+    }
+
+
+def oneshot_sections(llm, tema, num_partes, content):
+    """Seções do guia de uma chamada única, ou None (descartando a resposta memorizada)"""
+    sections = split_guide_sections(content, num_partes)
+    if sections is None:
+        logger.warning("Guia em chamada única fora do formato esperado; gerando por seção")
+        forget_section(generate_prompt(tema, num_partes), get_model_name(llm))
+    return sections
+
+
+def build_guide(llm, tema, num_partes, on_progress=None, max_concurrency=None, strategy=None):
+    """
+    Executa o pipeline completo (esqueleto e seções em paralelo) e devolve
+    uma tupla (seções na ordem do guia, chaves das seções que faltaram). O
+    Markdown final sai de assemble_guide e o HTML de render_sections.
+
+    Com a estratégia 'oneshot' (ver choose_strategy) o guia é pedido em uma
+    única chamada com o prompt completo; se a resposta não puder ser
+    separada em seções, a geração segue por seção. Com 'pipeline' as seções
+    começam enquanto o esqueleto ainda chega (ver iter_pipelined_sections).
+
+    Cada seção é convertida para HTML assim que chega, enquanto as demais
+    ainda estão sendo geradas; os fragmentos ficam no cache e a montagem do
+    HTML final só junta os pedaços.
+
+    on_progress(stage, completed, total) é chamado na thread de quem invocou
+    a função sempre que uma etapa termina; total conta o esqueleto, a
+    introdução, cada parte e a conclusão.
+    """
+    total = num_partes + 3
+    report = on_progress or (lambda stage, completed, total: None)
+    strategy = choose_strategy(num_partes, strategy)
+
+    if strategy == STRATEGY_ONESHOT:
+        logger.info(f"Gerando '{tema}' em uma única chamada")
+        report('oneshot', 0, total)
+        content = generate_text(
+            llm,
+            generate_prompt(tema, num_partes),
+            "Resposta inválida na geração do guia completo.",
+            stage='oneshot',
+        )
+        sections = oneshot_sections(llm, tema, num_partes, content)
+        if sections is not None:
+            for section_content in [sections['intro'], *sections['parts'], sections['conclusion']]:
+                render_fragment(section_content)
+            report('sections', total, total)
+            return sections, []
+
+    report('skeleton', 0, total)
+    if strategy == STRATEGY_PIPELINE:
+        # O plano chega no meio das seções, como o evento 'skeleton'
+        plan = None
+        completed = 0
+        events = iter_pipelined_sections(llm, tema, num_partes, max_concurrency)
+    else:
+        plan = plan_guide(llm, tema, num_partes)
+        completed = 1
+        report('sections', completed, total)
+        events = iter_sections(llm, tema, num_partes, plan, max_concurrency)
+
+    results = {}
+    for key, content in events:
+        if key == 'skeleton':
+            plan = content
+        else:
+            results[key] = content
+            if content is not None:
+                render_fragment(content)
+        completed += 1
+        report('sections', completed, total)
+
+    missing = fill_missing_sections(results, tema, num_partes, plan)
+    return order_sections(results, num_partes), missing
+
+
+async def agenerate_text(llm, prompt, error_message, stage='section', generation_config=None,
+                         shared_context=None):
+    """Versão assíncrona de generate_text"""
+    with span(stage):
+        model_name = get_model_name(llm)
+        memoized = await sync_to_async(get_section)(prompt, model_name)
+        if memoized is not None:
+            logger.info(f"Etapa '{stage}' reutilizada de uma geração anterior")
+            record_cache_hit('section')
+            return memoized
+
+        response = await acall_model(
+            llm, prompt, stage, generation_config=generation_config, shared_context=shared_context
+        )
+        record_usage(response.prompt_tokens, response.response_tokens)
+        if response.text:
+            await sync_to_async(store_section)(prompt, model_name, stage, response.text)
+            return response.text
+        raise Exception(error_message)
+
+
+async def aplan_guide(llm, tema, num_partes):
+    """Versão assíncrona de plan_guide"""
+    logger.info("Gerando esqueleto estrutural invisível para guiar a estrutura...")
+    skeleton_prompt = build_skeleton_prompt(tema, num_partes)
+    skeleton_content = await agenerate_text(
+        llm,
+        skeleton_prompt,
+        "Resposta inválida na geração do esqueleto estrutural.",
+        stage='skeleton',
+        generation_config=SKELETON_GENERATION_CONFIG,
+    )
+    logger.debug(f"Esqueleto estrutural gerado com sucesso:\n{skeleton_content}")
+    with span('skeleton-parse'):
+        skeleton_parts = parse_skeleton_response(skeleton_content, num_partes)
+
+    for repair_prompt, missing_parts in skeleton_repairs(tema, num_partes, skeleton_parts):
+        repair_content = await agenerate_text(
+            llm,
+            repair_prompt,
+            "Resposta inválida na complementação do esqueleto estrutural.",
+            stage='skeleton-repair',
+            generation_config=SKELETON_GENERATION_CONFIG,
+        )
+        if not merge_skeleton_repair(repair_content, skeleton_parts, missing_parts, num_partes):
+            await sync_to_async(forget_section)(repair_prompt, get_model_name(llm))
+
+    return await sync_to_async(plan_from_skeleton)(llm, skeleton_prompt, skeleton_parts, num_partes)
+
+
+async def abuild_guide(llm, tema, num_partes, max_concurrency=None, strategy=None):
+    """
+    Versão assíncrona de build_guide, com o mesmo valor de retorno.
+
+    As seções são geradas como tarefas do event loop, limitadas por um
+    semáforo em vez de um pool de threads, então um único processo ASGI pode
+    manter muitas gerações em andamento ao mesmo tempo. Como os provedores
+    não têm streaming assíncrono, a estratégia 'pipeline' segue como fanout.
+    """
+    if choose_strategy(num_partes, strategy) == STRATEGY_ONESHOT:
+        logger.info(f"Gerando '{tema}' em uma única chamada (async)")
+        content = await agenerate_text(
+            llm,
+            generate_prompt(tema, num_partes),
+            "Resposta inválida na geração do guia completo.",
+            stage='oneshot',
+        )
+        sections = await sync_to_async(oneshot_sections)(llm, tema, num_partes, content)
+        if sections is not None:
+            return sections, []
+
+    plan = await aplan_guide(llm, tema, num_partes)
+    shared_context = await sync_to_async(open_shared_context)(
+        llm, build_context_prefix(tema, num_partes, plan)
+    )
+    tasks = build_section_tasks(tema, num_partes, plan, shared_context)
+    semaphore = asyncio.Semaphore(max_concurrency or settings.GEMINI_MAX_CONCURRENCY)
+
+    async def run_task(key, prompt, error_message):
+        async with semaphore:
+            return await agenerate_text(llm, prompt, error_message, stage=key, shared_context=shared_context)
+
+    logger.info(f"Gerando {len(tasks)} seções de forma assíncrona")
+    pending = [asyncio.ensure_future(run_task(*task)) for task in tasks]
+    try:
+        await asyncio.wait(pending)
+    finally:
+        # Se a requisição for cancelada, cancelar as seções que ainda não terminaram
+        for future in pending:
+            future.cancel()
+        await sync_to_async(shared_context.close)()
+
+    failures = SectionFailures(len(tasks))
+    results = {
+        key: failures.result_or_none(key, future)
+        for (key, _, _), future in zip(tasks, pending)
+    }
+    failures.raise_if_all_failed()
+    missing = fill_missing_sections(results, tema, num_partes, plan)
+    return order_sections(results, num_partes), missing
+
+
+def order_sections(results, num_partes):
+    """Reorganiza um dicionário {chave: conteúdo} de seções na ordem do guia"""
+    return {
+        'intro': results['intro'],
+        'parts': [results[f'part-{part_num}'] for part_num in range(1, num_partes + 1)],
+        'conclusion': results['conclusion'],
+    }
+
+
+def assemble_guide(sections):
+    """Concatena as seções na ordem final do guia em Markdown"""
+    final_result = sections['intro'] + f"\n\n{PARTS_HEADING}\n\n"
+    for part_content in sections['parts']:
+        final_result += part_content + "\n\n"
+    final_result += sections['conclusion']
+    return final_result
+
+
+def describe_api_error(api_error):
+    """Traduz uma exceção da API em uma mensagem amigável para o usuário"""
+    if isinstance(api_error, CircuitOpenError):
+        return str(api_error)
+    error_msg = str(api_error).lower()
+    if "content filter" in error_msg or "blocked" in error_msg or "safety" in error_msg:
+        return "O tema foi bloqueado pelo filtro de conteúdo da API. Por favor, tente outro tema."
+    elif "rate limit" in error_msg or "quota" in error_msg:
+        return "Limite de requisições da API atingido. Por favor, tente novamente em alguns minutos."
+    elif "context length" in error_msg or "too many tokens" in error_msg or "maximum token" in error_msg:
+        return "O tema solicitado é muito complexo ou extenso. Por favor, tente um tema mais específico ou reduza o número de partes."
+    elif "timeout" in error_msg or "deadline" in error_msg:
+        return "A requisição excedeu o tempo limite. Por favor, tente novamente ou escolha um tema menos complexo."
+    elif "invalid" in error_msg and "character" in error_msg:
+        return "O tema contém caracteres inválidos ou especiais. Por favor, simplifique o texto."
+    # Se estiver em modo de desenvolvimento, mostrar o erro real
+    if settings.DEBUG:
+        return f"Erro na API: {str(api_error)}"
+    return "Ocorreu um erro ao processar sua solicitação. Por favor, tente novamente mais tarde."
@@ -0,0 +1,275 @@
+"""
+Cache persistente de guias completos.
+
+Um guia é identificado pelo tema normalizado, número de partes, nome do
+modelo e um hash dos templates de prompt, de modo que qualquer alteração nos
+prompts invalida automaticamente as entradas antigas. As entradas expiram
+após settings.GUIDE_CACHE_TTL segundos e, acima de
+settings.GUIDE_CACHE_MAX_ENTRIES, as menos acessadas recentemente saem do
+cache (LRU).
+
+Um guia que sai do cache não é apagado, e sim retirado (retired_at): o link
+permanente (Guide.public_id, view guide_permalink) continua servindo o HTML
+armazenado por mais settings.GUIDE_PERMALINK_TTL segundos.
+
+O conteúdo de cada guia é gravado por seção (GuideSection), com o Markdown e
+o HTML comprimidos em ContentBlob e endereçados pelo hash do texto: seções
+idênticas, em um guia ou entre guias, ocupam espaço uma única vez. Os
+conteúdos que ficam sem seção são apagados periodicamente pelo worker da fila
+(purge_orphan_blobs).
+
+Falhas no banco de dados nunca interrompem a geração: são apenas registradas
+no log e tratadas como cache miss.
+"""
+import hashlib
+import logging
+import unicodedata
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .compression import compress, content_digest
+from .metrics import record_cache_hit
+from .models import ContentBlob, Guide, GuideCacheStats, GuideSection
+from .rendering import PARTS_HEADING, render_fragment
+from .section_cache import purge_expired_sections
+from .skeleton import SkeletonPart
+from .prompts.chunking_prompt import generate_prompt
+from .prompts.guide_prompts import (
+    build_conclusion_prompt,
+    build_guide_context_prompt,
+    build_intro_prompt,
+    build_part_context_prompt,
+    build_part_prompt,
+    build_skeleton_prompt,
+)
+
+logger = logging.getLogger(__name__)
+
+# Conteúdos sem seção conferidos e apagados por transação em purge_orphan_blobs
+ORPHAN_PURGE_BATCH = 500
+
+
+def compute_prompt_version():
+    """Hash dos templates de prompt, renderizados com valores fixos de exemplo"""
+    sample_part = SkeletonPart(title='{title}', topics=['{topic}'], difficulty='{difficulty}')
+    templates = [
+        build_skeleton_prompt('{tema}', '{num_partes}'),
+        build_intro_prompt('{tema}', '{num_partes}', ['{f1}', '{f2}', '{f3}'], [(1, 1), (2, 3), (4, 4)]),
+        build_guide_context_prompt('{tema}', '{num_partes}', {1: sample_part}, ['{f1}', '{f2}', '{f3}'], [(1, 1), (2, 3), (4, 4)]),
+        build_part_prompt('{tema}', '{num_partes}', 1, sample_part, '{phase}'),
+        build_part_context_prompt('{tema}', '{num_partes}'),
+        build_conclusion_prompt('{tema}', '{num_partes}'),
+        generate_prompt('{tema}', 3),
+    ]
+    return hashlib.sha256("\n\x00\n".join(templates).encode('utf-8')).hexdigest()[:16]
+
+
+PROMPT_VERSION = compute_prompt_version()
+
+
+def normalize_tema(tema):
+    """Normaliza o tema para comparação (espaços, caixa e formas Unicode)"""
+    return " ".join(unicodedata.normalize('NFKC', tema).casefold().split())
+
+
+def make_cache_key(tema, num_partes, model_name):
+    """Chave determinística do guia no cache"""
+    raw = f"{normalize_tema(tema)}\x00{num_partes}\x00{model_name}\x00{PROMPT_VERSION}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _bump_stats(**increments):
+    """Incrementa atomicamente os contadores globais do cache"""
+    updates = {field: F(field) + amount for field, amount in increments.items()}
+    if not GuideCacheStats.objects.filter(pk=1).update(**updates):
+        GuideCacheStats.objects.get_or_create(pk=1)
+        GuideCacheStats.objects.filter(pk=1).update(**updates)
+
+
+def get_cached_guide(tema, num_partes, model_name):
+    """Retorna o Guide em cache para a requisição, ou None"""
+    try:
+        guide = Guide.objects.filter(
+            cache_key=make_cache_key(tema, num_partes, model_name), retired_at__isnull=True,
+        ).first()
+        if guide is not None and guide.created_at < timezone.now() - timedelta(seconds=settings.GUIDE_CACHE_TTL):
+            logger.info(f"Guia em cache expirado para '{tema}' ({num_partes} partes)")
+            Guide.objects.filter(pk=guide.pk).update(retired_at=timezone.now())
+            guide = None
+
+        if guide is None:
+            _bump_stats(misses=1)
+            return None
+
+        now = timezone.now()
+        Guide.objects.filter(pk=guide.pk).update(hits=F('hits') + 1, last_accessed_at=now)
+        _bump_stats(hits=1, bytes_saved=guide.size_bytes)
+        logger.info(f"Guia servido do cache para '{tema}' ({num_partes} partes)")
+        record_cache_hit('guide')
+        return guide
+    except Exception as cache_error:
+        logger.warning(f"Falha ao consultar o cache de guias: {str(cache_error)}")
+        return None
+
+
+def get_cached_guide_payload(tema, num_partes, model_name):
+    """
+    Versão de get_cached_guide para as views assíncronas: o Markdown e o HTML
+    são montados a partir das seções (consultas ao banco) já aqui, fora do
+    event loop. Retorna um dicionário com markdown, html e permalink_url, ou None.
+    """
+    guide = get_cached_guide(tema, num_partes, model_name)
+    if guide is None:
+        return None
+    try:
+        return {'markdown': guide.markdown, 'html': guide.html, 'permalink_url': guide.get_absolute_url()}
+    except Exception as cache_error:
+        logger.warning(f"Falha ao ler o guia em cache: {str(cache_error)}")
+        return None
+
+
+def guide_sections(sections):
+    """(chave, Markdown) de cada seção, na ordem do guia (como devolvido por order_sections)"""
+    yield 'intro', sections['intro']
+    yield 'parts-heading', PARTS_HEADING
+    for part_num, content in enumerate(sections['parts'], 1):
+        yield f'part-{part_num}', content
+    yield 'conclusion', sections['conclusion']
+
+
+def store_blobs(texts):
+    """
+    Grava comprimidos os textos ainda não armazenados; retorna {hash: id do
+    ContentBlob}. Deve rodar dentro de transaction.atomic: os conteúdos
+    reaproveitados ficam travados até o fim da transação, e purge_orphan_blobs
+    não os apaga enquanto as seções que os usam não forem gravadas.
+    """
+    texts_by_digest = {content_digest(text): text for text in texts}
+    blobs = ContentBlob.objects.select_for_update()
+    blob_ids = dict(blobs.filter(digest__in=texts_by_digest).values_list('digest', 'pk'))
+    new_blobs = []
+    for digest, text in texts_by_digest.items():
+        if digest not in blob_ids:
+            codec, dictionary, data = compress(text)
+            new_blobs.append(ContentBlob(digest=digest, codec=codec, dictionary=dictionary, data=data,
+                                         size=len(text.encode('utf-8'))))
+    if new_blobs:
+        # Outro processo pode gravar o mesmo texto ao mesmo tempo
+        ContentBlob.objects.bulk_create(new_blobs, ignore_conflicts=True)
+        blob_ids.update(blobs.filter(
+            digest__in=[blob.digest for blob in new_blobs]
+        ).values_list('digest', 'pk'))
+    return blob_ids
+
+
+def store_guide(tema, num_partes, model_name, sections):
+    """
+    Armazena um guia completo (seções como devolvido por order_sections) e
+    aplica a remoção LRU. Retorna o Guide (com o link permanente) ou None.
+    """
+    try:
+        now = timezone.now()
+        entries = [
+            (key, content, str(render_fragment(content)))
+            for key, content in guide_sections(sections)
+        ]
+        markdown_text = Guide.MARKDOWN_SEPARATOR.join(content for _, content, _ in entries)
+        html = Guide.HTML_SEPARATOR.join(fragment for _, _, fragment in entries)
+        with transaction.atomic():
+            blob_ids = store_blobs([content for _, content, _ in entries] + [fragment for _, _, fragment in entries])
+            guide, _ = Guide.objects.update_or_create(
+                cache_key=make_cache_key(tema, num_partes, model_name),
+                defaults={
+                    'tema': tema,
+                    'normalized_tema': normalize_tema(tema),
+                    'num_partes': num_partes,
+                    'model_name': model_name,
+                    'prompt_version': PROMPT_VERSION,
+                    'content_hash': content_digest(html),
+                    'size_bytes': len(markdown_text.encode('utf-8')) + len(html.encode('utf-8')),
+                    # Um guia retirado que é gerado de novo volta ao cache com o mesmo link
+                    'created_at': now,
+                    'last_accessed_at': now,
+                    'retired_at': None,
+                },
+            )
+            guide.sections.all().delete()
+            GuideSection.objects.bulk_create(
+                GuideSection(guide=guide, key=key, position=position,
+                             markdown_blob_id=blob_ids[content_digest(content)],
+                             html_blob_id=blob_ids[content_digest(fragment)])
+                for position, (key, content, fragment) in enumerate(entries)
+            )
+        # O guia acabou de ser montado: evitar consultar e descomprimir as seções de novo
+        guide.markdown = markdown_text
+        guide.html = html
+        evict_guides()
+        return guide
+    except Exception as cache_error:
+        logger.warning(f"Falha ao armazenar o guia no cache: {str(cache_error)}")
+        return None
+
+
+def evict_guides():
+    """
+    Retira do cache os guias expirados e, acima do limite, os menos acessados
+    recentemente e apaga os retirados há mais de GUIDE_PERMALINK_TTL. Os
+    conteúdos que ficam sem seção são apagados depois, por purge_orphan_blobs
+    """
+    now = timezone.now()
+    active_guides = Guide.objects.filter(retired_at__isnull=True)
+    active_guides.filter(created_at__lt=now - timedelta(seconds=settings.GUIDE_CACHE_TTL)).update(retired_at=now)
+
+    stale_ids = list(
+        active_guides.order_by('-last_accessed_at')
+        .values_list('pk', flat=True)[settings.GUIDE_CACHE_MAX_ENTRIES:]
+    )
+    if stale_ids:
+        Guide.objects.filter(pk__in=stale_ids).update(retired_at=now)
+
+    Guide.objects.filter(retired_at__lt=now - timedelta(seconds=settings.GUIDE_PERMALINK_TTL)).delete()
+
+    # Aproveitar para limpar as etapas memorizadas expiradas
+    purge_expired_sections()
+
+
+def purge_orphan_blobs():
+    """
+    Apaga os conteúdos que nenhuma seção usa mais (guias apagados ou gravados
+    de novo); retorna quantos foram apagados. Executada periodicamente pelo
+    worker da fila (settings.GUIDE_CONTENT_PURGE_INTERVAL), fora da gravação
+    dos guias: a busca percorre todos os conteúdos.
+
+    Um conteúdo sem seção pode estar sendo reaproveitado por um store_guide
+    em andamento. Os travados por store_blobs ficam para a próxima vez, e as
+    referências são conferidas de novo dentro da transação que apaga.
+    """
+    deleted = 0
+    try:
+        orphans = ContentBlob.objects.filter(markdown_sections__isnull=True, html_sections__isnull=True)
+        last_id = 0
+        while True:
+            orphan_ids = list(
+                orphans.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:ORPHAN_PURGE_BATCH]
+            )
+            if not orphan_ids:
+                break
+            last_id = orphan_ids[-1]
+            with transaction.atomic():
+                locked_ids = list(
+                    ContentBlob.objects.select_for_update(skip_locked=True)
+                    .filter(pk__in=orphan_ids).values_list('pk', flat=True)
+                )
+                deleted += orphans.filter(pk__in=locked_ids).delete()[0]
+            if len(orphan_ids) < ORPHAN_PURGE_BATCH:
+                break
+        if deleted:
+            logger.info(f"{deleted} conteúdos sem seção apagados")
+        return deleted
+    except Exception as db_error:
+        logger.warning(f"Falha ao apagar os conteúdos sem seção: {str(db_error)}")
+        return deleted
@@ -0,0 +1,168 @@
+"""
+Fila de geração de guias em segundo plano, armazenada no banco de dados.
+
+A view enfileira um GenerationJob e responde imediatamente; um ou mais
+workers (python manage.py run_generation_worker) reivindicam os jobs com um
+UPDATE condicional, o que funciona tanto no SQLite quanto no PostgreSQL sem
+broker externo. O progresso de cada etapa é gravado no próprio job para ser
+consultado pela view de status. Enquanto o job roda, uma thread atualiza
+heartbeat_at a cada settings.GENERATION_JOB_HEARTBEAT_INTERVAL segundos, de
+modo que uma etapa longa (retentativas, espera de cota) não faça o job
+parecer travado para requeue_stale_jobs.
+"""
+import logging
+import os
+import socket
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from .generation import (
+    build_guide,
+    describe_api_error,
+    describe_missing_sections,
+)
+from .guide_cache import get_cached_guide, make_cache_key, store_guide
+from .llm import get_backend
+from .models import GenerationJob
+from .rendering import render_sections
+from .singleflight import single_flight
+
+logger = logging.getLogger(__name__)
+
+
+def default_worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_job(tema, num_partes):
+    """Cria um job pendente para a geração do guia"""
+    job = GenerationJob.objects.create(tema=tema, num_partes=num_partes, total_steps=num_partes + 3)
+    logger.info(f"Job {job.public_id} enfileirado para '{tema}' ({num_partes} partes)")
+    return job
+
+
+def requeue_stale_jobs():
+    """Devolve à fila jobs cujo worker parou de dar sinal de vida"""
+    stale_before = timezone.now() - timedelta(seconds=settings.GENERATION_JOB_STALE_AFTER)
+    stale = GenerationJob.objects.filter(status=GenerationJob.STATUS_RUNNING, heartbeat_at__lt=stale_before)
+    retry = stale.filter(attempts__lt=settings.GENERATION_JOB_MAX_ATTEMPTS).update(
+        status=GenerationJob.STATUS_PENDING,
+        worker='',
+    )
+    failed = stale.update(
+        status=GenerationJob.STATUS_FAILED,
+        error="A geração foi interrompida. Por favor, tente novamente.",
+        finished_at=timezone.now(),
+    )
+    if retry or failed:
+        logger.warning(f"Jobs travados: {retry} devolvidos à fila, {failed} marcados como falha")
+
+
+def claim_next_job(worker_name):
+    """Reivindica atomicamente o job pendente mais antigo, ou retorna None"""
+    while True:
+        job_id = (
+            GenerationJob.objects.filter(status=GenerationJob.STATUS_PENDING)
+            .values_list('pk', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+
+        now = timezone.now()
+        claimed = GenerationJob.objects.filter(pk=job_id, status=GenerationJob.STATUS_PENDING).update(
+            status=GenerationJob.STATUS_RUNNING,
+            worker=worker_name,
+            attempts=F('attempts') + 1,
+            started_at=now,
+            heartbeat_at=now,
+        )
+        if claimed:
+            return GenerationJob.objects.get(pk=job_id)
+        # Outro worker levou o job primeiro; tentar o próximo
+
+
+def _finish(job, **fields):
+    GenerationJob.objects.filter(pk=job.pk).update(finished_at=timezone.now(), **fields)
+
+
+@contextmanager
+def heartbeat(job):
+    """Atualiza heartbeat_at periodicamente, independente do fim das etapas"""
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(settings.GENERATION_JOB_HEARTBEAT_INTERVAL):
+                try:
+                    GenerationJob.objects.filter(pk=job.pk, status=GenerationJob.STATUS_RUNNING).update(
+                        heartbeat_at=timezone.now(),
+                    )
+                except Exception as db_error:
+                    # Um sinal perdido não é grave; o próximo pode funcionar
+                    logger.warning(f"Falha ao atualizar o heartbeat do job {job.public_id}: {str(db_error)}")
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f"heartbeat-{job.pk}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_job(job):
+    """Executa o pipeline de geração de um job já reivindicado"""
+    logger.info(f"Executando job {job.public_id}: '{job.tema}' ({job.num_partes} partes)")
+
+    def on_progress(stage, completed, total):
+        GenerationJob.objects.filter(pk=job.pk).update(
+            stage=stage,
+            completed_steps=completed,
+            total_steps=total,
+            heartbeat_at=timezone.now(),
+        )
+
+    def finish_cached(cached_guide):
+        _finish(job, status=GenerationJob.STATUS_DONE, stage='done',
+                completed_steps=F('total_steps'), html_result=cached_guide.html)
+
+    with heartbeat(job):
+        try:
+            llm = get_backend()
+            cached_guide = get_cached_guide(job.tema, job.num_partes, llm.model_name)
+            if cached_guide is not None:
+                finish_cached(cached_guide)
+                return
+
+            # Um guia idêntico sendo gerado por uma view ou outro worker: esperar e consultar o cache de novo
+            with single_flight(make_cache_key(job.tema, job.num_partes, llm.model_name)) as waited:
+                cached_guide = get_cached_guide(job.tema, job.num_partes, llm.model_name) if waited else None
+                if cached_guide is not None:
+                    finish_cached(cached_guide)
+                    return
+                sections, missing_sections = build_guide(llm, job.tema, job.num_partes, on_progress=on_progress)
+                if not missing_sections:
+                    store_guide(job.tema, job.num_partes, llm.model_name, sections)
+
+            on_progress('render', job.num_partes + 3, job.num_partes + 3)
+            html_result = render_sections(sections)
+            if missing_sections:
+                # Guia incompleto: entregar o que foi gerado, com aviso, sem ir para o cache
+                _finish(job, status=GenerationJob.STATUS_DONE, stage='done', html_result=str(html_result),
+                        error=describe_missing_sections(missing_sections))
+                logger.warning(f"Job {job.public_id} concluído sem as seções {', '.join(missing_sections)}")
+                return
+            _finish(job, status=GenerationJob.STATUS_DONE, stage='done', html_result=str(html_result))
+            logger.info(f"Job {job.public_id} concluído")
+        except Exception as api_error:
+            logger.exception(f"Falha no job {job.public_id}: {str(api_error)}")
+            _finish(job, status=GenerationJob.STATUS_FAILED, error=describe_api_error(api_error))
@@ -0,0 +1,64 @@
+"""
+Provedores de LLM do pipeline de geração.
+
+settings.LLM_BACKEND escolhe o provedor: 'gemini' (padrão), 'openai'
+(API compatível com a OpenAI, ex: ZukiJourney) ou 'stub' (local, sem rede).
+
+Cada provedor é criado uma única vez por processo, na primeira requisição, e
+reaproveitado pelas seguintes: a configuração do SDK, os clientes e as
+conexões (canais gRPC do Gemini, pool HTTP da OpenAI) deixam de ser
+refeitos a cada requisição. Alterações de LLM_*, GEMINI_* e OPENAI_COMPAT_*
+via override_settings descartam os provedores criados (ver MainConfig.ready).
+"""
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.conf import settings
+
+from ..metrics import span
+from .base import LLMBackend, LLMResponse, RateLimitedLLMError, TransientLLMError
+
+# Prefixos das configurações lidas na criação dos provedores
+BACKEND_SETTING_PREFIXES = ('LLM_', 'GEMINI_', 'OPENAI_COMPAT_', 'ZUKI_')
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name=None):
+    """Provedor configurado (ou o informado em name), compartilhado pelo processo"""
+    name = name or settings.LLM_BACKEND
+    backend = _backends.get(name)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(name)
+            if backend is None:
+                # Só a primeira requisição do processo paga a configuração
+                with span('configure'):
+                    backend = create_backend(name)
+                _backends[name] = backend
+    return backend
+
+
+def create_backend(name):
+    if name == 'gemini':
+        from .gemini import GeminiBackend
+        return GeminiBackend()
+    if name == 'openai':
+        from .openai_compat import OpenAICompatibleBackend
+        return OpenAICompatibleBackend()
+    if name == 'stub':
+        from .stub import StubBackend
+        return StubBackend()
+    raise ImproperlyConfigured(f"Provedor de LLM desconhecido: {name}")
+
+
+def reset_backends(setting=None, **kwargs):
+    """
+    Descarta os provedores criados; o próximo get_backend cria novos. Também
+    é o receptor do sinal setting_changed (testes com override_settings).
+    """
+    if setting is not None and not setting.startswith(BACKEND_SETTING_PREFIXES):
+        return
+    with _backends_lock:
+        _backends.clear()
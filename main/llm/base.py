@@ -0,0 +1,53 @@
+"""
+Interface comum dos provedores de LLM usados pelo pipeline de geração.
+"""
+from dataclasses import dataclass
+
+
+@dataclass
+class LLMResponse:
+    """Resposta de uma chamada não-streaming"""
+    text: str
+    total_tokens: int = None
+    prompt_tokens: int = None
+    response_tokens: int = None
+
+
+class LLMBackend:
+    """
+    Provedor de LLM: chamada síncrona, assíncrona e em streaming.
+
+    generation_config segue o formato do Gemini (ex: response_mime_type e
+    response_schema); cada implementação aproveita o que o provedor
+    suportar e ignora o resto. timeout é o limite, em segundos, de cada
+    requisição.
+    """
+
+    # Nome do modelo, usado nas chaves de cache e de memorização
+    model_name = None
+    # Se o provedor aceita cache de contexto remoto (main/context_cache.py)
+    supports_context_cache = False
+
+    def generate(self, prompt, generation_config=None, timeout=None):
+        """Retorna um LLMResponse"""
+        raise NotImplementedError
+
+    async def agenerate(self, prompt, generation_config=None, timeout=None):
+        """Versão assíncrona de generate"""
+        raise NotImplementedError
+
+    def stream(self, prompt, generation_config=None, timeout=None):
+        """
+        Faz a requisição e retorna um iterador com os trechos de texto à
+        medida que chegam. Erros da requisição devem ocorrer na chamada, não
+        na primeira iteração, para que as retentativas funcionem.
+        """
+        raise NotImplementedError
+
+
+class TransientLLMError(Exception):
+    """Falha temporária do provedor (conexão, timeout, erro 5xx); a chamada pode ser repetida"""
+
+
+class RateLimitedLLMError(Exception):
+    """Cota do provedor esgotada (HTTP 429); a chamada pode ser repetida após a espera (ver main/ratelimit.py)"""
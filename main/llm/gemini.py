@@ -0,0 +1,110 @@
+"""
+Provedor Google Gemini (google-generativeai).
+
+O SDK é configurado (genai.configure) na criação do provedor, que acontece
+uma vez por processo (ver get_backend). As chamadas síncronas compartilham
+o canal gRPC do cliente padrão do SDK, assim como as assíncronas
+(generate_content_async). O cliente assíncrono padrão é criado uma vez por
+processo, e o seu canal gRPC só funciona no event loop em que foi criado. Sob
+ASGI há um único loop por processo. Sob WSGI, cada view assíncrona roda em um
+loop novo: nos loops seguintes ao primeiro, a chamada síncrona roda em uma
+thread.
+"""
+import asyncio
+import threading
+import weakref
+
+import google.generativeai as genai
+from django.conf import settings
+
+from .base import LLMBackend, LLMResponse
+
+# Event loop em que o cliente assíncrono padrão do SDK foi criado (referência fraca)
+_async_client_loop = None
+_async_client_lock = threading.Lock()
+
+
+def owns_async_client():
+    """Indica se o loop atual pode usar o cliente assíncrono padrão do SDK"""
+    global _async_client_loop
+    loop = asyncio.get_running_loop()
+    with _async_client_lock:
+        if _async_client_loop is None:
+            _async_client_loop = weakref.ref(loop)
+        return _async_client_loop() is loop
+
+
+def gemini_response(response):
+    """LLMResponse com o texto e os tokens informados pela API (usage_metadata), se disponíveis"""
+    usage = getattr(response, 'usage_metadata', None)
+    return LLMResponse(
+        text=response.text,
+        total_tokens=getattr(usage, 'total_token_count', None) or None,
+        prompt_tokens=getattr(usage, 'prompt_token_count', None) or None,
+        response_tokens=getattr(usage, 'candidates_token_count', None) or None,
+    )
+
+
+class GeminiBackend(LLMBackend):
+    supports_context_cache = True
+
+    def __init__(self, model_name=None, model=None):
+        if model is None:
+            genai.configure(api_key=settings.GEMINI_API_KEY)
+            model = genai.GenerativeModel(
+                model_name or settings.GEMINI_MODEL_NAME,
+                generation_config=settings.LLM_GENERATION_CONFIG or None,
+            )
+        self.model = model
+        self.model_name = model.model_name
+
+    @classmethod
+    def from_cached_content(cls, cached_content):
+        """Provedor que envia as chamadas junto com um CachedContent já criado"""
+        return cls(model=genai.GenerativeModel.from_cached_content(
+            cached_content,
+            generation_config=settings.LLM_GENERATION_CONFIG or None,
+        ))
+
+    def _request_options(self, timeout):
+        return {'timeout': timeout} if timeout else None
+
+    def generate(self, prompt, generation_config=None, timeout=None):
+        response = self.model.generate_content(
+            prompt,
+            generation_config=generation_config,
+            request_options=self._request_options(timeout),
+        )
+        return gemini_response(response)
+
+    async def agenerate(self, prompt, generation_config=None, timeout=None):
+        if not owns_async_client():
+            return await asyncio.to_thread(self.generate, prompt, generation_config, timeout)
+        response = await self.model.generate_content_async(
+            prompt,
+            generation_config=generation_config,
+            request_options=self._request_options(timeout),
+        )
+        return gemini_response(response)
+
+    def stream(self, prompt, generation_config=None, timeout=None):
+        response = self.model.generate_content(
+            prompt,
+            stream=True,
+            generation_config=generation_config,
+            request_options=self._request_options(timeout),
+        )
+        # A requisição é feita aqui (e não na primeira iteração) para que
+        # retentativas e limite de taxa envolvam a chamada em si
+        return iter_chunk_texts(response)
+
+
+def iter_chunk_texts(response):
+    for chunk in response:
+        # Trechos sem partes de texto (ex: apenas metadados) são ignorados
+        try:
+            text = chunk.text
+        except ValueError:
+            continue
+        if text:
+            yield text
@@ -0,0 +1,128 @@
+"""
+Provedor compatível com a API da OpenAI (ex: ZukiJourney), via SDK openai.
+
+O cliente síncrono (e o seu pool de conexões HTTP) é compartilhado por todas
+as requisições do processo; o assíncrono é criado um por event loop, já que
+as conexões abertas por ele pertencem ao loop em que foram criadas.
+"""
+import asyncio
+import threading
+import weakref
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import LLMBackend, LLMResponse, RateLimitedLLMError, TransientLLMError
+
+try:
+    import openai
+except ImportError:  # pragma: no cover - dependência opcional
+    openai = None
+
+
+# Parâmetros de geração no formato do Gemini e os equivalentes na API da OpenAI
+GENERATION_PARAMETERS = {'temperature': 'temperature', 'top_p': 'top_p', 'max_output_tokens': 'max_tokens'}
+
+
+class OpenAICompatibleBackend(LLMBackend):
+
+    def __init__(self, model_name=None, api_key=None, base_url=None):
+        if openai is None:
+            raise ImproperlyConfigured("O pacote 'openai' não está instalado")
+        self.model_name = model_name or settings.OPENAI_COMPAT_MODEL
+        self.api_key = api_key or settings.ZUKI_API_KEY
+        self.base_url = base_url or settings.OPENAI_COMPAT_BASE_URL
+        self.generation_config = dict(settings.LLM_GENERATION_CONFIG)
+        self.client = openai.OpenAI(api_key=self.api_key, base_url=self.base_url)
+        self.async_clients = weakref.WeakKeyDictionary()
+        self.lock = threading.Lock()
+
+    def _async_client(self):
+        """Cliente assíncrono do event loop atual"""
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            client = self.async_clients.get(loop)
+            if client is None:
+                client = openai.AsyncOpenAI(api_key=self.api_key, base_url=self.base_url)
+                self.async_clients[loop] = client
+        return client
+
+    def _request(self, prompt, generation_config, timeout, **extra):
+        request = {
+            'model': self.model_name,
+            'messages': [{'role': 'user', 'content': prompt}],
+            'timeout': timeout,
+        }
+        request.update(generation_parameters(self.generation_config, generation_config))
+        request.update(extra)
+        return request
+
+    def generate(self, prompt, generation_config=None, timeout=None):
+        with translate_errors():
+            completion = self.client.chat.completions.create(**self._request(prompt, generation_config, timeout))
+        return completion_response(completion)
+
+    async def agenerate(self, prompt, generation_config=None, timeout=None):
+        with translate_errors():
+            completion = await self._async_client().chat.completions.create(
+                **self._request(prompt, generation_config, timeout)
+            )
+        return completion_response(completion)
+
+    def stream(self, prompt, generation_config=None, timeout=None):
+        with translate_errors():
+            chunks = self.client.chat.completions.create(
+                **self._request(prompt, generation_config, timeout, stream=True)
+            )
+        return iter_chunk_texts(chunks)
+
+
+@contextmanager
+def translate_errors():
+    """
+    Converte falhas temporárias do SDK em TransientLLMError (ver
+    main/resilience.py) e cota esgotada em RateLimitedLLMError
+    """
+    try:
+        yield
+    except openai.RateLimitError as api_error:
+        raise RateLimitedLLMError(str(api_error)) from api_error
+    except openai.APITimeoutError as api_error:
+        raise TransientLLMError(f"timeout: {str(api_error)}") from api_error
+    except (openai.APIConnectionError, openai.InternalServerError) as api_error:
+        raise TransientLLMError(f"unavailable: {str(api_error)}") from api_error
+
+
+def generation_parameters(default_config, generation_config):
+    """
+    Parâmetros da API da OpenAI equivalentes à configuração de geração do
+    Gemini: a da chamada (generation_config) por cima da padrão do provedor.
+    """
+    config = {**default_config, **(generation_config or {})}
+    parameters = {
+        parameter: config[key]
+        for key, parameter in GENERATION_PARAMETERS.items()
+        if config.get(key) is not None
+    }
+    if config.get('response_mime_type') == 'application/json':
+        # O schema do Gemini não é repassado; o prompt já descreve os campos
+        parameters['response_format'] = {'type': 'json_object'}
+    return parameters
+
+
+def completion_response(completion):
+    usage = getattr(completion, 'usage', None)
+    return LLMResponse(
+        text=completion.choices[0].message.content or "",
+        total_tokens=getattr(usage, 'total_tokens', None),
+        prompt_tokens=getattr(usage, 'prompt_tokens', None),
+        response_tokens=getattr(usage, 'completion_tokens', None),
+    )
+
+
+def iter_chunk_texts(chunks):
+    with translate_errors():
+        for chunk in chunks:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
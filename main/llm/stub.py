@@ -0,0 +1,203 @@
+"""
+Provedor local e determinístico, sem rede, para testes de carga e benchmarks.
+
+As respostas seguem o formato que cada etapa do pipeline espera (esqueleto
+em JSON, introdução com fases e conquistas, partes, conclusão e guia
+completo) e são derivadas do hash do prompt, então o mesmo prompt gera
+sempre o mesmo texto. A latência simula o tempo até o primeiro token, com
+média settings.LLM_STUB_LATENCY e distribuição fixa, exponencial ou
+log-normal, mais o tempo de geração de cada token; a cada
+settings.LLM_STUB_RATE_LIMIT_EVERY chamadas uma resposta 429 é simulada.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+
+from django.conf import settings
+
+from .base import LLMBackend, LLMResponse, RateLimitedLLMError
+
+PARTS_PATTERN = re.compile(r'em (\d+) partes')
+PART_PATTERN = re.compile(r'Crie APENAS a parte (\d+)')
+TITLE_PATTERN = re.compile(r'^# Parte \d+: (.+)$', re.MULTILINE)
+REPAIR_PATTERN = re.compile(r'SOMENTE as partes ([\d, ]+)')
+TEMA_PATTERN = re.compile(r'(?:sobre|para o tema) "([^"]+)"')
+
+WORDS = (
+    "conceito", "prática", "exemplo", "ferramenta", "projeto", "estrutura", "modelo",
+    "análise", "técnica", "padrão", "processo", "resultado", "erro", "teste", "dado",
+)
+EMOJIS = ("🚀", "🧠", "🛠️", "📊", "🔍", "⚡", "🎯", "🧩")
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'exponential', 'lognormal')
+
+
+class StubRateLimitError(RateLimitedLLMError):
+    """Erro 429 simulado"""
+
+
+class StubBackend(LLMBackend):
+
+    def __init__(self, model_name='stub', latency=None, tokens_per_second=None, output_tokens=None,
+                 rate_limit_every=None, latency_distribution=None, latency_sigma=None, seed=None):
+        self.model_name = model_name
+        self.latency = settings.LLM_STUB_LATENCY if latency is None else latency
+        self.latency_distribution = latency_distribution or settings.LLM_STUB_LATENCY_DISTRIBUTION
+        if self.latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Distribuição de latência desconhecida: {self.latency_distribution}")
+        self.latency_sigma = settings.LLM_STUB_LATENCY_SIGMA if latency_sigma is None else latency_sigma
+        self.tokens_per_second = tokens_per_second or settings.LLM_STUB_TOKENS_PER_SECOND
+        self.output_tokens = output_tokens or settings.LLM_STUB_OUTPUT_TOKENS
+        self.rate_limit_every = (
+            settings.LLM_STUB_RATE_LIMIT_EVERY if rate_limit_every is None else rate_limit_every
+        )
+        self.calls = 0
+        self.lock = threading.Lock()
+        # Só a latência é aleatória; o texto depende apenas do prompt
+        self.latency_rng = random.Random(seed)
+
+    def _check_rate_limit(self):
+        with self.lock:
+            self.calls += 1
+            calls = self.calls
+        if self.rate_limit_every and calls % self.rate_limit_every == 0:
+            raise StubRateLimitError("429 rate limit (simulado pelo provedor stub)")
+
+    def _first_token_latency(self):
+        if self.latency_distribution == 'fixed' or self.latency <= 0:
+            return self.latency
+        with self.lock:
+            if self.latency_distribution == 'exponential':
+                return self.latency_rng.expovariate(1 / self.latency)
+            # Log-normal com média igual a self.latency (cauda longa, como APIs reais)
+            mu = math.log(self.latency) - self.latency_sigma ** 2 / 2
+            return self.latency_rng.lognormvariate(mu, self.latency_sigma)
+
+    def _response(self, prompt, generation_config):
+        text = build_stub_text(prompt, generation_config, self.output_tokens)
+        prompt_tokens = estimate_stub_tokens(prompt)
+        response_tokens = estimate_stub_tokens(text)
+        return LLMResponse(
+            text=text,
+            total_tokens=prompt_tokens + response_tokens,
+            prompt_tokens=prompt_tokens,
+            response_tokens=response_tokens,
+        )
+
+    def _generation_time(self, text):
+        return estimate_stub_tokens(text) / self.tokens_per_second
+
+    def generate(self, prompt, generation_config=None, timeout=None):
+        self._check_rate_limit()
+        response = self._response(prompt, generation_config)
+        time.sleep(self._first_token_latency() + self._generation_time(response.text))
+        return response
+
+    async def agenerate(self, prompt, generation_config=None, timeout=None):
+        self._check_rate_limit()
+        response = self._response(prompt, generation_config)
+        await asyncio.sleep(self._first_token_latency() + self._generation_time(response.text))
+        return response
+
+    def stream(self, prompt, generation_config=None, timeout=None):
+        self._check_rate_limit()
+        text = self._response(prompt, generation_config).text
+        return self._iter_chunks(text, self._first_token_latency())
+
+    def _iter_chunks(self, text, latency):
+        time.sleep(latency)
+        chunk_size = 64
+        for start in range(0, len(text), chunk_size):
+            chunk = text[start:start + chunk_size]
+            time.sleep(self._generation_time(chunk))
+            yield chunk
+
+
+def estimate_stub_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def build_stub_text(prompt, generation_config, output_tokens):
+    """Texto determinístico no formato esperado pela etapa que o prompt representa"""
+    rng = random.Random(hashlib.sha256(prompt.encode('utf-8')).hexdigest())
+    tema_match = TEMA_PATTERN.search(prompt)
+    tema = tema_match.group(1) if tema_match else "Tema"
+    parts_match = PARTS_PATTERN.search(prompt)
+    num_partes = int(parts_match.group(1)) if parts_match else 3
+
+    if (generation_config or {}).get('response_mime_type') == 'application/json':
+        repair = REPAIR_PATTERN.search(prompt)
+        numbers = (
+            [int(number) for number in re.findall(r'\d+', repair.group(1))] if repair
+            else range(1, num_partes + 1)
+        )
+        return json.dumps({'parts': [stub_skeleton_part(rng, number) for number in numbers]}, ensure_ascii=False)
+
+    part = PART_PATTERN.search(prompt)
+    if part:
+        part_num = int(part.group(1))
+        title = TITLE_PATTERN.search(prompt)
+        title = title.group(1) if title else f"Dominar {tema} {rng.choice(EMOJIS)}"
+        return stub_part(rng, part_num, title, output_tokens)
+    if 'Crie um guia de estudos completo' in prompt:
+        body = [stub_intro(rng, tema, num_partes), "# PARTES"]
+        body.extend(
+            stub_part(rng, part_num, f"Dominar {rng.choice(WORDS)} {rng.choice(EMOJIS)}", output_tokens // num_partes)
+            for part_num in range(1, num_partes + 1)
+        )
+        body.append(stub_conclusion(rng, "# Conclusão"))
+        return "\n\n".join(body)
+    if 'Crie apenas a introdução' in prompt:
+        return stub_intro(rng, tema, num_partes)
+    if 'Crie apenas a conclusão' in prompt:
+        return stub_conclusion(rng, "# CONSIDERAÇÕES FINAIS")
+    return stub_paragraph(rng, output_tokens)
+
+
+def stub_sentence(rng, words=12):
+    sentence = " ".join(rng.choice(WORDS) for _ in range(words))
+    return sentence.capitalize() + "."
+
+
+def stub_paragraph(rng, tokens):
+    # ~1,3 tokens por palavra
+    sentences = max(1, int(tokens / 1.3) // 12)
+    return " ".join(stub_sentence(rng) for _ in range(sentences))
+
+
+def stub_skeleton_part(rng, number):
+    return {
+        'number': number,
+        'title': f"Dominar {rng.choice(WORDS)} {rng.choice(EMOJIS)}",
+        'topics': [rng.choice(WORDS) for _ in range(3)],
+        'difficulty': min(5, 1 + number // 2),
+    }
+
+
+def stub_intro(rng, tema, num_partes):
+    lines = [f"# {tema} em {num_partes} Partes: Seu Mapa para Dominar {tema} do Zero", "", "## O Que Você Vai Construir:"]
+    for phase in range(1, 4):
+        lines.append(f"{phase}️⃣ **Fase {phase}: {rng.choice(WORDS).capitalize()} (Parte {phase})**")
+        for _ in range(2):
+            lines.append(f"- **Conquista:** {stub_sentence(rng, 6)}")
+            lines.append(f"    - *Mini-desafio:* {stub_sentence(rng, 8)}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def stub_part(rng, part_num, title, tokens):
+    lines = [f"# Parte {part_num}: {title}", "", f"- Dificuldade: {min(5, part_num)}/5", ""]
+    paragraphs = max(1, tokens // 150)
+    for _ in range(paragraphs):
+        lines.append(stub_paragraph(rng, 150))
+        lines.append("")
+    return "\n".join(lines).rstrip()
+
+
+def stub_conclusion(rng, heading):
+    return f"{heading}\n## Síntese\n{stub_paragraph(rng, 120)}"
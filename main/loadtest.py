@@ -0,0 +1,268 @@
+"""
+Teste de carga de ponta a ponta das views de geração.
+
+Usado pelo comando `python manage.py loadtest`. As requisições passam pelo
+Django inteiro (URLs, view, pipeline de geração, renderização e cache), mas
+o modelo é o provedor stub (main/llm/stub.py), com latência configurável e
+sem rede. Cada requisição usa um tema inédito, para que o cache de guias,
+a memorização das etapas e o cache de fragmentos não sejam aproveitados.
+
+Para cada view e número de partes são medidos:
+- latência p50/p95/p99 das requisições;
+- requisições por segundo por worker (vazão dividida pela concorrência);
+- pico de memória alocada por uma requisição isolada (tracemalloc);
+- tempo de CPU por requisição em process_mini_challenges e na renderização
+  do Markdown (a renderização inclui o processamento dos mini-desafios).
+
+Uma requisição também conta como erro quando o guia não pôde ser gravado
+(store_guide registra a exceção, ex: "database is locked", e devolve None,
+então a resposta em si parece normal); o total dessas falhas vai em
+'store_errors'.
+"""
+import asyncio
+import contextvars
+import math
+import threading
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from unittest import mock
+
+from django.conf import settings
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from . import ratelimit, rendering, resilience, views
+
+VIEWS = ('sync', 'async', 'stream')
+DEFAULT_PARTS = (2, 4, 8, 12, 16, 22)
+# Marcas de erro ou de guia incompleto na resposta de cada view
+FAILURE_MARKERS = {
+    'sync': (b'alert-danger', b'alert-warning'),
+    'async': (b'alert-danger', b'alert-warning'),
+    'stream': (b'event: error', b'event: warning'),
+}
+# Campos comparados entre duas execuções (menor é melhor)
+COMPARED_FIELDS = ('p50_ms', 'p95_ms', 'p99_ms', 'peak_kib', 'mini_challenges_cpu_ms', 'render_cpu_ms')
+
+
+def percentile(samples, fraction):
+    """Percentil por posição mais próxima (nearest-rank) de uma lista de amostras"""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+class CpuTimer:
+    """Acumula o tempo de CPU da thread gasto nas chamadas de uma função"""
+
+    def __init__(self):
+        self.total = 0.0
+        self.lock = threading.Lock()
+
+    def wrap(self, fn):
+        @wraps(fn)
+        def timed(*args, **kwargs):
+            start = time.thread_time()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.thread_time() - start
+                with self.lock:
+                    self.total += elapsed
+        return timed
+
+
+# Falhas de gravação da requisição em andamento (uma lista por thread ou tarefa)
+_store_failures = contextvars.ContextVar('loadtest_store_failures')
+
+
+class StoreFailureCounter:
+    """Conta os guias que store_guide não conseguiu gravar (retorno None)"""
+
+    def __init__(self):
+        self.total = 0
+        self.lock = threading.Lock()
+
+    def wrap(self, fn):
+        @wraps(fn)
+        def counted(*args, **kwargs):
+            guide = fn(*args, **kwargs)
+            if guide is None:
+                with self.lock:
+                    self.total += 1
+                # sync_to_async copia o contexto, mas a lista é a mesma da requisição
+                failures = _store_failures.get(None)
+                if failures is not None:
+                    failures.append(args[0])
+            return guide
+        return counted
+
+
+def unique_tema(view, num_partes, index):
+    # Tema inédito a cada requisição: nenhum cache é aproveitado
+    return f"Carga {view} {num_partes}p {index} {uuid.uuid4().hex[:8]}"
+
+
+def is_failure(view, content):
+    return any(marker in content for marker in FAILURE_MARKERS[view])
+
+
+def request_sync(num_partes, index, strategy):
+    response = Client().post(reverse('home'), {
+        'tema': unique_tema('sync', num_partes, index),
+        'num_partes': num_partes,
+        'strategy': strategy or '',
+    })
+    return response.status_code != 200 or is_failure('sync', response.content)
+
+
+def request_stream(num_partes, index, strategy):
+    response = Client().get(reverse('stream_guide'), {
+        'tema': unique_tema('stream', num_partes, index),
+        'num_partes': num_partes,
+    })
+    content = b''.join(response.streaming_content)
+    return response.status_code != 200 or is_failure('stream', content)
+
+
+async def arequest_async(num_partes, index, strategy):
+    response = await AsyncClient().post(reverse('home_async'), {
+        'tema': unique_tema('async', num_partes, index),
+        'num_partes': num_partes,
+        'strategy': strategy or '',
+    })
+    return response.status_code != 200 or is_failure('async', response.content)
+
+
+def timed_request(request, num_partes, index, strategy):
+    failures = []
+    _store_failures.set(failures)
+    start = time.perf_counter()
+    failed = request(num_partes, index, strategy)
+    return time.perf_counter() - start, failed or bool(failures)
+
+
+async def atimed_request(semaphore, num_partes, index, strategy):
+    async with semaphore:
+        # Cada requisição roda em uma tarefa do gather, com uma cópia própria do contexto
+        failures = []
+        _store_failures.set(failures)
+        start = time.perf_counter()
+        failed = await arequest_async(num_partes, index, strategy)
+        return time.perf_counter() - start, failed or bool(failures)
+
+
+def run_batch(view, num_partes, requests, concurrency, strategy):
+    """Executa requests requisições com até concurrency simultâneas; retorna [(segundos, falhou)]"""
+    if view == 'async':
+        async def gather():
+            semaphore = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(*(
+                atimed_request(semaphore, num_partes, index, strategy) for index in range(requests)
+            ))
+        return asyncio.run(gather())
+
+    request = request_sync if view == 'sync' else request_stream
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='loadtest') as executor:
+        return list(executor.map(
+            lambda index: timed_request(request, num_partes, index, strategy), range(requests)
+        ))
+
+
+def measure_peak_memory(view, num_partes, strategy):
+    """Pico de memória alocada (KiB) durante uma requisição isolada"""
+    tracemalloc.start()
+    try:
+        if view == 'async':
+            asyncio.run(arequest_async(num_partes, 'mem', strategy))
+        else:
+            (request_sync if view == 'sync' else request_stream)(num_partes, 'mem', strategy)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def stub_settings(latency, distribution, tokens_per_second):
+    return override_settings(
+        LLM_BACKEND='stub',
+        LLM_STUB_LATENCY=latency,
+        LLM_STUB_LATENCY_DISTRIBUTION=distribution,
+        LLM_STUB_TOKENS_PER_SECOND=tokens_per_second,
+        LLM_STUB_RATE_LIMIT_EVERY=0,
+        # O cache de contexto é exclusivo do Gemini; o stub sempre envia o prompt completo
+        GEMINI_CONTEXT_CACHE=False,
+    )
+
+
+def benchmark_scale(view, num_partes, requests, concurrency, strategy, rpm, tpm):
+    """Mede uma combinação de view e número de partes"""
+    mini_challenges_timer = CpuTimer()
+    render_timer = CpuTimer()
+    store_failures = StoreFailureCounter()
+    # Limitador e circuit breaker novos a cada medição, para que uma não afete a seguinte
+    with mock.patch.object(ratelimit, '_limiter', ratelimit.AdaptiveRateLimiter(rpm, tpm)), \
+            mock.patch.object(resilience, '_breaker', None), \
+            mock.patch.object(rendering, 'process_mini_challenges',
+                              mini_challenges_timer.wrap(rendering.process_mini_challenges)), \
+            mock.patch.object(rendering, 'render_markdown', render_timer.wrap(rendering.render_markdown)), \
+            mock.patch.object(views, 'store_guide', store_failures.wrap(views.store_guide)):
+        start = time.perf_counter()
+        samples = run_batch(view, num_partes, requests, concurrency, strategy)
+        elapsed = time.perf_counter() - start
+        # Tempo de CPU do lote (a medição de memória, abaixo, não entra na média)
+        mini_challenges_cpu = mini_challenges_timer.total
+        render_cpu = render_timer.total
+        store_errors = store_failures.total
+        peak_kib = measure_peak_memory(view, num_partes, strategy)
+
+    latencies = [seconds * 1000 for seconds, _ in samples]
+    return {
+        'view': view,
+        'parts': num_partes,
+        'requests': requests,
+        'errors': sum(1 for _, failed in samples if failed),
+        'store_errors': store_errors,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'rps_worker': requests / elapsed / concurrency,
+        'peak_kib': peak_kib,
+        'mini_challenges_cpu_ms': mini_challenges_cpu * 1000 / requests,
+        'render_cpu_ms': render_cpu * 1000 / requests,
+    }
+
+
+def run_loadtest(views=VIEWS, parts=DEFAULT_PARTS, requests=20, concurrency=4, latency=0.2,
+                 distribution='lognormal', tokens_per_second=400.0, strategy=None, rpm=None, tpm=None):
+    """Executa todas as combinações de view e número de partes; retorna uma linha por combinação"""
+    rpm = rpm or settings.GEMINI_RPM
+    tpm = tpm or settings.GEMINI_TPM
+    with stub_settings(latency, distribution, tokens_per_second):
+        return [
+            benchmark_scale(view, num_partes, requests, concurrency, strategy, rpm, tpm)
+            for view in views
+            for num_partes in parts
+        ]
+
+
+def compare_results(baseline, results):
+    """
+    Variação percentual de cada campo comparado em relação a uma execução
+    anterior (mesma view e número de partes); positivo significa piora.
+    """
+    previous = {(row['view'], row['parts']): row for row in baseline}
+    rows = []
+    for row in results:
+        before = previous.get((row['view'], row['parts']))
+        if before is None:
+            continue
+        delta = {'view': row['view'], 'parts': row['parts']}
+        for field in COMPARED_FIELDS:
+            old = before.get(field)
+            delta[f'{field}_%'] = (row[field] - old) * 100 / old if old else 0.0
+        rows.append(delta)
+    return rows
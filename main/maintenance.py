@@ -0,0 +1,109 @@
+"""
+Modo de manutenção, verificado pelo MaintenanceModeMiddleware antes de
+qualquer outro middleware.
+
+O estado fica em uma linha do banco (MaintenanceMode), então vale para todos
+os workers e instâncias. Cada processo guarda o valor lido por
+settings.MAINTENANCE_CHECK_TTL segundos: durante esse intervalo as
+requisições não consultam nem o banco nem o sistema de arquivos, e uma
+mudança leva no máximo esse tempo para chegar aos demais processos.
+
+O arquivo maintenance_mode na raiz do projeto, usado pelas versões
+anteriores, continua ativando o modo de manutenção.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.template.loader import render_to_string
+
+from .models import MaintenanceMode
+
+logger = logging.getLogger(__name__)
+
+MAINTENANCE_MESSAGE = "O serviço está temporariamente indisponível para manutenção. Por favor, tente novamente mais tarde."
+
+
+def maintenance_file_path():
+    return os.path.join(settings.BASE_DIR, 'maintenance_mode')
+
+
+def read_maintenance_state():
+    """Lê o estado atual (arquivo legado ou banco), sem cache"""
+    if os.path.exists(maintenance_file_path()):
+        return True
+    try:
+        return MaintenanceMode.objects.filter(pk=1, enabled=True).exists()
+    except Exception as db_error:
+        # Sem banco não há como saber; manter o site no ar
+        logger.warning(f"Falha ao consultar o modo de manutenção: {str(db_error)}")
+        return False
+
+
+class MaintenanceFlag:
+    """Estado do modo de manutenção guardado no processo por um TTL"""
+
+    def __init__(self):
+        self.enabled = False
+        self.expires_at = 0.0
+        self.lock = threading.Lock()
+
+    def cached(self):
+        """Valor guardado, ou None se expirou"""
+        return self.enabled if time.monotonic() < self.expires_at else None
+
+    def refresh(self):
+        with self.lock:
+            # Outra thread pode ter atualizado enquanto esta esperava
+            if time.monotonic() >= self.expires_at:
+                self.enabled = read_maintenance_state()
+                self.expires_at = time.monotonic() + settings.MAINTENANCE_CHECK_TTL
+            return self.enabled
+
+    def invalidate(self):
+        with self.lock:
+            self.expires_at = 0.0
+
+
+_flag = MaintenanceFlag()
+
+
+def cached_maintenance_mode():
+    """Estado guardado no processo, ou None se precisa ser relido"""
+    return _flag.cached()
+
+
+def is_maintenance_mode():
+    """Verifica se o sistema está em modo de manutenção (com cache no processo)"""
+    enabled = _flag.cached()
+    return _flag.refresh() if enabled is None else enabled
+
+
+def invalidate_maintenance_cache():
+    _flag.invalidate()
+
+
+def set_maintenance_mode(enabled):
+    """Ativa ou desativa o modo de manutenção para todos os processos"""
+    MaintenanceMode.objects.update_or_create(pk=1, defaults={'enabled': enabled})
+    if not enabled and os.path.exists(maintenance_file_path()):
+        os.remove(maintenance_file_path())
+    invalidate_maintenance_cache()
+
+
+_responses = {}
+
+
+def maintenance_response_body(kind):
+    """Corpo da resposta 503 ('html' ou 'json'), montado uma única vez por processo"""
+    body = _responses.get(kind)
+    if body is None:
+        if kind == 'json':
+            body = json.dumps({'error': MAINTENANCE_MESSAGE}, ensure_ascii=False).encode('utf-8')
+        else:
+            body = render_to_string('503.html', {'message': MAINTENANCE_MESSAGE}).encode('utf-8')
+        _responses[kind] = body
+    return body
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main.benchmarks import (
+    benchmark_mini_challenges,
+    benchmark_rendering,
+    benchmark_storage,
+    benchmark_titles,
+    format_table,
+)
+
+SUITES = {
+    'mini_challenges': benchmark_mini_challenges,
+    'rendering': benchmark_rendering,
+    'titles': benchmark_titles,
+    'storage': benchmark_storage,
+}
+
+
+class Command(BaseCommand):
+    help = 'Executa os benchmarks das etapas locais do pipeline (sem chamadas à API)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'suites',
+            nargs='*',
+            help=f"Suítes a executar (padrão: todas): {', '.join(SUITES)}",
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Execuções por medição; é reportado o menor tempo',
+        )
+
+    def handle(self, *args, **options):
+        names = options['suites'] or list(SUITES)
+        unknown = [name for name in names if name not in SUITES]
+        if unknown:
+            raise CommandError(f"Suíte desconhecida: {', '.join(unknown)}")
+
+        for name in names:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'== {name} =='))
+            rows = SUITES[name](repeat=options['repeat'])
+            for line in format_table(rows):
+                self.stdout.write(line)
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main.benchmarks import synthetic_content_samples
+from main.compression import CODEC_ZLIB, DICTIONARY_DIR, DICTIONARY_NAME_PATTERN, compress, train_dictionary
+from main.models import ContentBlob
+
+
+class Command(BaseCommand):
+    help = 'Gera um dicionário de compressão para o conteúdo dos guias (main/dictionaries/<nome>.txt)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', help='Nome do dicionário (use em GUIDE_CONTENT_DICTIONARY)')
+        parser.add_argument(
+            '--source',
+            choices=('stored', 'synthetic'),
+            default='stored',
+            help='Amostras: seções já armazenadas no banco ou guias sintéticos no formato do provedor stub '
+                 '(só para testes e benchmarks: o texto do stub não representa os guias reais)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=2000,
+            help='Máximo de conteúdos armazenados (os mais recentes) usados como amostra',
+        )
+        parser.add_argument(
+            '--guides',
+            type=int,
+            default=30,
+            help='Número de guias sintéticos usados como amostra',
+        )
+
+    def handle(self, *args, **options):
+        name = options['name']
+        if not DICTIONARY_NAME_PATTERN.match(name):
+            raise CommandError("Use apenas letras, números, '-' e '_' no nome do dicionário")
+        path = DICTIONARY_DIR / f'{name}.txt'
+        if path.exists():
+            # Conteúdos gravados com o dicionário só podem ser lidos com ele
+            raise CommandError(f"O dicionário {name} já existe; escolha outro nome")
+
+        if options['source'] == 'stored':
+            blobs = ContentBlob.objects.order_by('-created_at')[:options['limit']]
+            samples = [blob.text for blob in blobs]
+        else:
+            samples = synthetic_content_samples(options['guides'])
+        if len(samples) < 2:
+            raise CommandError("Amostras insuficientes para montar o dicionário")
+
+        DICTIONARY_DIR.mkdir(exist_ok=True)
+        path.write_bytes(train_dictionary(samples))
+
+        plain = sum(len(compress(text, CODEC_ZLIB, '')[2]) for text in samples)
+        with_dictionary = sum(len(compress(text, CODEC_ZLIB, name)[2]) for text in samples)
+        self.stdout.write(self.style.SUCCESS(
+            f"Dicionário {name} gravado em {path} ({path.stat().st_size} bytes). "
+            f"Amostras com zlib: {plain / 1024:.1f} KiB sem dicionário, {with_dictionary / 1024:.1f} KiB com"
+        ))
@@ -0,0 +1,123 @@
+import json
+import logging
+import os
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from main.benchmarks import format_table
+from main.llm.stub import LATENCY_DISTRIBUTIONS
+from main.loadtest import DEFAULT_PARTS, VIEWS, compare_results, run_loadtest
+
+
+def current_commit():
+    """Commit atual do repositório, para identificar a execução no JSON"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de carga de ponta a ponta das views de geração com o provedor stub '
+        '(sem chamadas à API), em um banco de testes temporário'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--views',
+            nargs='+',
+            choices=VIEWS,
+            default=list(VIEWS),
+            help='Views a medir: sync (/), async (/async/) e stream (/stream/)',
+        )
+        parser.add_argument(
+            '--parts',
+            nargs='+',
+            type=int,
+            default=list(DEFAULT_PARTS),
+            help='Números de partes dos guias (2 a 22)',
+        )
+        parser.add_argument('--requests', type=int, default=20, help='Requisições por medição')
+        parser.add_argument('--concurrency', type=int, default=4, help='Requisições simultâneas (workers)')
+        parser.add_argument('--latency', type=float, default=0.2, help='Latência média até o primeiro token, em segundos')
+        parser.add_argument(
+            '--distribution',
+            choices=LATENCY_DISTRIBUTIONS,
+            default='lognormal',
+            help='Distribuição da latência do provedor stub',
+        )
+        parser.add_argument('--tokens-per-second', type=float, default=400.0, help='Velocidade de geração do stub')
+        parser.add_argument(
+            '--strategy',
+            help='Estratégia de geração enviada às views sync e async (padrão: settings.GENERATION_STRATEGY)',
+        )
+        parser.add_argument('--rpm', type=int, help='Requisições por minuto do limitador (padrão: settings.GEMINI_RPM)')
+        parser.add_argument('--tpm', type=int, help='Tokens por minuto do limitador (padrão: settings.GEMINI_TPM)')
+        parser.add_argument('--output', help='Arquivo JSON onde salvar os resultados')
+        parser.add_argument('--compare', help='Arquivo JSON de uma execução anterior para comparação')
+
+    def handle(self, *args, **options):
+        invalid = [parts for parts in options['parts'] if not 2 <= parts <= 22]
+        if invalid:
+            raise CommandError(f"Número de partes fora do intervalo 2-22: {', '.join(map(str, invalid))}")
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as baseline_file:
+                baseline = json.load(baseline_file)
+
+        config = {
+            key: options[key]
+            for key in ('views', 'parts', 'requests', 'concurrency', 'latency', 'distribution',
+                        'tokens_per_second', 'strategy', 'rpm', 'tpm')
+        }
+        # Logs por etapa de cada requisição poluiriam a saída e o tempo medido
+        logging.disable(logging.INFO)
+        setup_test_environment()
+        if connection.vendor == 'sqlite':
+            # Banco de testes em arquivo: o SQLite em memória compartilhado bloqueia
+            # tabelas inteiras entre threads, sem esperar, e as gravações falhariam
+            connection.settings_dict['TEST']['NAME'] = os.path.join(
+                tempfile.gettempdir(), f'chunkify-loadtest-{os.getpid()}.sqlite3'
+            )
+        old_database_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            results = run_loadtest(**config)
+        finally:
+            connection.creation.destroy_test_db(old_database_name, verbosity=0)
+            teardown_test_environment()
+            logging.disable(logging.NOTSET)
+
+        for line in format_table(results):
+            self.stdout.write(line)
+
+        if options['output']:
+            report = {
+                'commit': current_commit(),
+                'created_at': datetime.now(timezone.utc).isoformat(),
+                'config': config,
+                'results': results,
+            }
+            with open(options['output'], 'w', encoding='utf-8') as output_file:
+                json.dump(report, output_file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados salvos em {options['output']}"))
+
+        if baseline is not None:
+            deltas = compare_results(baseline['results'], results)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"== variação em relação a {baseline.get('commit') or options['compare']} (%) =="
+            ))
+            if deltas:
+                for line in format_table(deltas):
+                    self.stdout.write(line)
+            else:
+                self.stdout.write('Nenhuma medição em comum com a execução anterior')
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+import time
+
+from main.guide_cache import purge_orphan_blobs
+from main.jobs import claim_next_job, default_worker_name, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Processa a fila de geração de guias armazenada no banco de dados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Segundos de espera quando a fila está vazia',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Processar os jobs pendentes e sair',
+        )
+
+    def handle(self, *args, **options):
+        worker_name = default_worker_name()
+        self.stdout.write(f'Worker de geração iniciado ({worker_name})')
+
+        purged_at = None
+        while True:
+            close_old_connections()
+            requeue_stale_jobs()
+            # Limpeza periódica do conteúdo armazenado, fora do caminho das requisições
+            if purged_at is None or time.monotonic() - purged_at >= settings.GUIDE_CONTENT_PURGE_INTERVAL:
+                purge_orphan_blobs()
+                purged_at = time.monotonic()
+
+            job = claim_next_job(worker_name)
+            if job is not None:
+                run_job(job)
+                continue
+
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS('Fila de geração vazia'))
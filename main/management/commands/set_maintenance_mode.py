@@ -1,6 +1,7 @@
-from django.core.management.base import BaseCommand, CommandError
-from django.conf import settings
-import os
+from django.core.management.base import BaseCommand
+
+from main.maintenance import read_maintenance_state, set_maintenance_mode
+
 
 class Command(BaseCommand):
     help = 'Ativar ou desativar o modo de manutenção da aplicação'
@@ -18,29 +19,25 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
-        maintenance_file = os.path.join(settings.BASE_DIR, 'maintenance_mode')
-        
         if options['on']:
-            # Criar o arquivo de flag de manutenção
-            with open(maintenance_file, 'w') as f:
-                f.write('Sistema em manutenção. API sem créditos suficientes.')
-            
+            # O estado fica no banco e vale para todos os workers e instâncias
+            set_maintenance_mode(True)
+
             self.stdout.write(
                 self.style.SUCCESS('Modo de manutenção ATIVADO')
             )
-            
+
         elif options['off']:
-            # Remover o arquivo de flag de manutenção se existir
-            if os.path.exists(maintenance_file):
-                os.remove(maintenance_file)
-                
+            # Também remove o arquivo de flag das versões anteriores, se existir
+            set_maintenance_mode(False)
+
             self.stdout.write(
                 self.style.SUCCESS('Modo de manutenção DESATIVADO')
             )
-            
+
         else:
             # Status atual
-            if os.path.exists(maintenance_file):
+            if read_maintenance_state():
                 self.stdout.write('Modo de manutenção: ATIVADO')
             else:
                 self.stdout.write('Modo de manutenção: DESATIVADO')
@@ -0,0 +1,224 @@
+"""
+Instrumentação por etapa do pipeline de geração.
+
+Cada etapa (configure, skeleton, skeleton-parse, intro, part-N, conclusion,
+oneshot, postprocess, render) roda dentro de um span que registra duração,
+tokens de prompt e de resposta, retentativas e acertos de cache. Os spans
+alimentam:
+- o registro do processo, exposto no formato do Prometheus em /metrics;
+- o trace da requisição atual (ContextVar), enviado no cabeçalho
+  Server-Timing pelo ServerTimingMiddleware.
+
+As threads do pool de geração herdam o trace por contextvars.copy_context;
+as tarefas asyncio e o sync_to_async já propagam o contexto sozinhos. Com
+vários processos (ex: workers do gunicorn), cada um tem o seu registro.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from dataclasses import dataclass
+
+# Limites dos buckets do histograma de duração, em segundos
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+current_trace = ContextVar('current_trace', default=None)
+current_span = ContextVar('current_span', default=None)
+
+
+@dataclass
+class Span:
+    """Uma etapa do pipeline"""
+    stage: str
+    duration: float = 0.0
+    prompt_tokens: int = None
+    response_tokens: int = None
+    retries: int = 0
+    cache_hits: int = 0
+    error: bool = False
+
+
+def stage_label(stage):
+    """Rótulo da etapa nas métricas: as partes são agregadas em 'part'"""
+    return 'part' if stage.startswith('part-') else stage
+
+
+class RequestTrace:
+    """Spans concluídos durante uma requisição, em ordem de término"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.spans = []
+        self.lock = threading.Lock()
+
+    def add(self, span):
+        with self.lock:
+            self.spans.append(span)
+
+    def server_timing(self):
+        """Valor do cabeçalho Server-Timing: duração somada por etapa, em ms, e o total"""
+        with self.lock:
+            totals = {}
+            for span in self.spans:
+                totals[span.stage] = totals.get(span.stage, 0.0) + span.duration
+        entries = [f"{stage};dur={duration * 1000:.1f}" for stage, duration in totals.items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.started_at) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+class MetricsRegistry:
+    """Contadores e histogramas do processo, seguros entre threads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.durations = {}
+            self.tokens = {}
+            self.retries = {}
+            self.errors = {}
+            self.cache_hits = {}
+
+    def observe(self, span):
+        label = stage_label(span.stage)
+        with self.lock:
+            histogram = self.durations.setdefault(label, {'buckets': [0] * len(DURATION_BUCKETS), 'sum': 0.0, 'count': 0})
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if span.duration <= bound:
+                    histogram['buckets'][index] += 1
+            histogram['sum'] += span.duration
+            histogram['count'] += 1
+            for kind, count in (('prompt', span.prompt_tokens), ('response', span.response_tokens)):
+                if count:
+                    self.tokens[(label, kind)] = self.tokens.get((label, kind), 0) + count
+            if span.retries:
+                self.retries[label] = self.retries.get(label, 0) + span.retries
+            if span.error:
+                self.errors[label] = self.errors.get(label, 0) + 1
+
+    def record_cache_hit(self, cache):
+        with self.lock:
+            self.cache_hits[cache] = self.cache_hits.get(cache, 0) + 1
+
+    def render(self):
+        """Métricas no formato de texto do Prometheus (versão 0.0.4)"""
+        with self.lock:
+            lines = [
+                "# HELP chunkify_stage_duration_seconds Duração de cada etapa da geração",
+                "# TYPE chunkify_stage_duration_seconds histogram",
+            ]
+            for label, histogram in sorted(self.durations.items()):
+                for bound, count in zip(DURATION_BUCKETS, histogram['buckets']):
+                    lines.append(f'chunkify_stage_duration_seconds_bucket{{stage="{label}",le="{bound}"}} {count}')
+                lines.append(f'chunkify_stage_duration_seconds_bucket{{stage="{label}",le="+Inf"}} {histogram["count"]}')
+                lines.append(f'chunkify_stage_duration_seconds_sum{{stage="{label}"}} {histogram["sum"]:.6f}')
+                lines.append(f'chunkify_stage_duration_seconds_count{{stage="{label}"}} {histogram["count"]}')
+            lines += [
+                "# HELP chunkify_stage_tokens_total Tokens informados pelo provedor, por etapa",
+                "# TYPE chunkify_stage_tokens_total counter",
+            ]
+            for (label, kind), count in sorted(self.tokens.items()):
+                lines.append(f'chunkify_stage_tokens_total{{stage="{label}",kind="{kind}"}} {count}')
+            lines += [
+                "# HELP chunkify_stage_retries_total Retentativas de chamadas ao modelo, por etapa",
+                "# TYPE chunkify_stage_retries_total counter",
+            ]
+            for label, count in sorted(self.retries.items()):
+                lines.append(f'chunkify_stage_retries_total{{stage="{label}"}} {count}')
+            lines += [
+                "# HELP chunkify_stage_errors_total Etapas que terminaram com erro",
+                "# TYPE chunkify_stage_errors_total counter",
+            ]
+            for label, count in sorted(self.errors.items()):
+                lines.append(f'chunkify_stage_errors_total{{stage="{label}"}} {count}')
+            lines += [
+                "# HELP chunkify_cache_hits_total Acertos de cache (guide, section, fragment)",
+                "# TYPE chunkify_cache_hits_total counter",
+            ]
+            for cache, count in sorted(self.cache_hits.items()):
+                lines.append(f'chunkify_cache_hits_total{{cache="{cache}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def request_trace():
+    """Trace da requisição atual; os spans concluídos dentro do bloco são acumulados nele"""
+    trace = RequestTrace()
+    token = current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        current_trace.reset(token)
+
+
+def iter_with_trace(iterator, trace):
+    """
+    Consome iterator (ex: o conteúdo de uma StreamingHttpResponse, produzido
+    depois que o middleware já retornou) em um contexto próprio, com trace
+    como trace da requisição.
+    """
+    context = copy_context()
+    context.run(current_trace.set, trace)
+    iterator = iter(iterator)
+    try:
+        while True:
+            try:
+                yield context.run(next, iterator)
+            except StopIteration:
+                return
+    finally:
+        # Cliente desconectado: encerrar o gerador interno (e as chamadas pendentes) também
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            context.run(close)
+
+
+@contextmanager
+def span(stage):
+    """Mede uma etapa e a registra no processo e no trace da requisição, se houver"""
+    current = Span(stage)
+    token = current_span.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException:
+        current.error = True
+        raise
+    finally:
+        current.duration = time.perf_counter() - start
+        current_span.reset(token)
+        registry.observe(current)
+        trace = current_trace.get()
+        if trace is not None:
+            trace.add(current)
+
+
+def record_usage(prompt_tokens, response_tokens):
+    """Tokens de uma resposta do modelo, atribuídos à etapa atual"""
+    current = current_span.get()
+    if current is None:
+        return
+    if prompt_tokens:
+        current.prompt_tokens = (current.prompt_tokens or 0) + prompt_tokens
+    if response_tokens:
+        current.response_tokens = (current.response_tokens or 0) + response_tokens
+
+
+def record_retry():
+    """Uma retentativa de chamada ao modelo na etapa atual"""
+    current = current_span.get()
+    if current is not None:
+        current.retries += 1
+
+
+def record_cache_hit(cache):
+    """Acerto de cache ('guide', 'section' ou 'fragment')"""
+    registry.record_cache_hit(cache)
+    current = current_span.get()
+    if current is not None:
+        current.cache_hits += 1
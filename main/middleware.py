@@ -0,0 +1,124 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .maintenance import cached_maintenance_mode, is_maintenance_mode, maintenance_response_body
+from .metrics import request_trace
+
+
+class MaintenanceModeMiddleware:
+    """
+    Responde 503 com uma página estática enquanto o modo de manutenção está
+    ativo (ver main/maintenance.py). Fica em primeiro lugar em MIDDLEWARE,
+    então sessão, CSRF, views e templates nem chegam a rodar.
+
+    Caminhos em settings.MAINTENANCE_EXEMPT_PATHS (ex: admin, /metrics/)
+    continuam acessíveis.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def is_exempt(self, request):
+        return request.path.startswith(tuple(settings.MAINTENANCE_EXEMPT_PATHS))
+
+    def maintenance_response(self, request):
+        wants_json = request.path.startswith('/jobs/') or 'application/json' in request.headers.get('Accept', '')
+        response = HttpResponse(
+            maintenance_response_body('json' if wants_json else 'html'),
+            status=503,
+            content_type='application/json' if wants_json else 'text/html; charset=utf-8',
+        )
+        response['Retry-After'] = str(settings.MAINTENANCE_RETRY_AFTER)
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.is_exempt(request) and is_maintenance_mode():
+            return self.maintenance_response(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if not self.is_exempt(request):
+            enabled = cached_maintenance_mode()
+            if enabled is None:
+                # Só a releitura (após o TTL) consulta o banco
+                enabled = await sync_to_async(is_maintenance_mode)()
+            if enabled:
+                return self.maintenance_response(request)
+        return await self.get_response(request)
+
+
+class ServerTimingMiddleware:
+    """
+    Abre o trace de cada requisição e envia as etapas concluídas no cabeçalho
+    Server-Timing (visível na aba de rede do navegador).
+
+    Em respostas em streaming o cabeçalho sai antes da geração, então só traz
+    as etapas anteriores ao primeiro byte; as demais aparecem em /metrics.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with request_trace() as trace:
+            response = self.get_response(request)
+        response['Server-Timing'] = trace.server_timing()
+        return response
+
+    async def __acall__(self, request):
+        with request_trace() as trace:
+            response = await self.get_response(request)
+        response['Server-Timing'] = trace.server_timing()
+        return response
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware que também roda em modo assíncrono.
+
+    O original só é síncrono: sob ASGI o Django o envolve com sync_to_async e
+    cada requisição, inclusive as das views assíncronas, troca de contexto
+    duas vezes (do event loop para uma thread e de volta, com async_to_sync,
+    para o restante da cadeia). Aqui só os arquivos estáticos saem do event
+    loop (leitura do disco); as demais requisições seguem direto, sem passar
+    por uma thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file, thread_sensitive=False)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Guide',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cache_key', models.CharField(max_length=64, unique=True)),
+                ('tema', models.CharField(max_length=200)),
+                ('normalized_tema', models.CharField(db_index=True, max_length=200)),
+                ('num_partes', models.PositiveSmallIntegerField()),
+                ('model_name', models.CharField(max_length=100)),
+                ('prompt_version', models.CharField(max_length=64)),
+                ('markdown', models.TextField()),
+                ('html', models.TextField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_accessed_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'guia',
+                'verbose_name_plural': 'guias',
+            },
+        ),
+        migrations.CreateModel(
+            name='GuideCacheStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hits', models.PositiveBigIntegerField(default=0)),
+                ('misses', models.PositiveBigIntegerField(default=0)),
+                ('bytes_saved', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'estatísticas do cache de guias',
+                'verbose_name_plural': 'estatísticas do cache de guias',
+            },
+        ),
+    ]
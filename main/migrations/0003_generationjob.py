@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:40
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0002_sectionmemo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('public_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('tema', models.CharField(max_length=200)),
+                ('num_partes', models.PositiveSmallIntegerField()),
+                ('status', models.CharField(choices=[('pending', 'Na fila'), ('running', 'Em execução'), ('done', 'Concluído'), ('failed', 'Falhou')], db_index=True, default='pending', max_length=10)),
+                ('stage', models.CharField(blank=True, max_length=20)),
+                ('completed_steps', models.PositiveSmallIntegerField(default=0)),
+                ('total_steps', models.PositiveSmallIntegerField(default=0)),
+                ('html_result', models.TextField(blank=True)),
+                ('error', models.TextField(blank=True)),
+                ('worker', models.CharField(blank=True, max_length=100)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'job de geração',
+                'verbose_name_plural': 'jobs de geração',
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
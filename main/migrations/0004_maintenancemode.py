@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0003_generationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaintenanceMode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('enabled', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'modo de manutenção',
+                'verbose_name_plural': 'modo de manutenção',
+            },
+        ),
+    ]
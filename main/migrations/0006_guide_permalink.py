@@ -0,0 +1,54 @@
+import uuid
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0005_generationlock'),
+    ]
+
+    operations = [
+        # Único só depois de preencher as linhas existentes (0007 e 0008)
+        migrations.AddField(
+            model_name='guide',
+            name='public_id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='guide',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='guide',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='guide',
+            name='retired_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='GuideSection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=20)),
+                ('position', models.PositiveSmallIntegerField()),
+                ('markdown', models.TextField()),
+                ('html', models.TextField()),
+                ('guide', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sections', to='main.guide')),
+            ],
+            options={
+                'verbose_name': 'seção do guia',
+                'verbose_name_plural': 'seções do guia',
+                'ordering': ['guide', 'position'],
+                'constraints': [models.UniqueConstraint(fields=('guide', 'position'), name='unique_guide_section_position')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+import hashlib
+import uuid
+
+from django.db import migrations
+
+
+def populate_permalinks(apps, schema_editor):
+    """Link permanente e hash do conteúdo (ETag) dos guias já armazenados"""
+    Guide = apps.get_model('main', 'Guide')
+    for guide in Guide.objects.only('pk', 'html'):
+        guide.public_id = uuid.uuid4()
+        guide.content_hash = hashlib.sha256(guide.html.encode('utf-8')).hexdigest()
+        guide.save(update_fields=['public_id', 'content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_guide_permalink'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_permalinks, migrations.RunPython.noop),
+    ]
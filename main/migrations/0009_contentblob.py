@@ -0,0 +1,44 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0008_guide_public_id_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('codec', models.CharField(max_length=10)),
+                ('dictionary', models.CharField(blank=True, max_length=50)),
+                ('data', models.BinaryField()),
+                ('size', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'conteúdo armazenado',
+                'verbose_name_plural': 'conteúdos armazenados',
+            },
+        ),
+        migrations.AddField(
+            model_name='guide',
+            name='size_bytes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        # Obrigatórios depois de preencher as linhas existentes (0010 e 0011)
+        migrations.AddField(
+            model_name='guidesection',
+            name='markdown_blob',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='markdown_sections', to='main.contentblob'),
+        ),
+        migrations.AddField(
+            model_name='guidesection',
+            name='html_blob',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='html_sections', to='main.contentblob'),
+        ),
+    ]
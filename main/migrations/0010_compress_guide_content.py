@@ -0,0 +1,84 @@
+import hashlib
+import zlib
+
+from django.db import migrations
+
+from main.generation import split_guide_sections
+from main.rendering import PARTS_HEADING, render_fragment
+
+# Separadores das seções no guia completo (Guide.MARKDOWN_SEPARATOR e Guide.HTML_SEPARATOR)
+MARKDOWN_SEPARATOR = "\n\n"
+HTML_SEPARATOR = "\n"
+
+
+def without_whitespace(text):
+    return ''.join(text.split())
+
+
+def compress_guides(apps, schema_editor):
+    """
+    Separa o conteúdo de cada guia nas seções usadas por store_guide
+    (introdução, título das partes, cada parte e conclusão), com o Markdown
+    e o HTML comprimidos (zlib, sem dicionário). As seções gravadas antes
+    não incluem o título das partes e não remontam o guia exatamente, então
+    o Markdown completo é separado de novo com split_guide_sections; um guia
+    que não pode ser separado (ou que não remonta com o mesmo conteúdo) fica
+    em uma única seção ('guide').
+    """
+    Guide = apps.get_model('main', 'Guide')
+    GuideSection = apps.get_model('main', 'GuideSection')
+    ContentBlob = apps.get_model('main', 'ContentBlob')
+
+    def blob_for(text):
+        raw = text.encode('utf-8')
+        data = zlib.compress(raw, 9)
+        codec = 'zlib'
+        if len(data) >= len(raw):
+            codec, data = 'raw', raw
+        blob, _ = ContentBlob.objects.get_or_create(
+            digest=hashlib.sha256(raw).hexdigest(),
+            defaults={'codec': codec, 'dictionary': '', 'data': data, 'size': len(raw)},
+        )
+        return blob
+
+    def split_entries(guide):
+        """(chave, Markdown, HTML) de cada seção, ou None se o guia não puder ser separado"""
+        sections = split_guide_sections(guide.markdown, guide.num_partes)
+        if sections is None:
+            return None
+        entries = [('intro', sections['intro']), ('parts-heading', PARTS_HEADING)]
+        entries.extend((f'part-{part_num}', content) for part_num, content in enumerate(sections['parts'], 1))
+        entries.append(('conclusion', sections['conclusion']))
+        # As seções voltam sem os espaços das bordas; qualquer outra diferença é conteúdo perdido
+        if without_whitespace(MARKDOWN_SEPARATOR.join(content for _, content in entries)) != \
+                without_whitespace(guide.markdown):
+            return None
+        try:
+            return [(key, content, str(render_fragment(content))) for key, content in entries]
+        except Exception:
+            return None
+
+    for guide in Guide.objects.all():
+        entries = split_entries(guide) or [('guide', guide.markdown, guide.html)]
+        html = HTML_SEPARATOR.join(fragment for _, _, fragment in entries)
+        GuideSection.objects.filter(guide=guide).delete()
+        for position, (key, content, fragment) in enumerate(entries):
+            GuideSection.objects.create(
+                guide=guide, key=key, position=position,
+                markdown_blob=blob_for(content), html_blob=blob_for(fragment),
+            )
+        # Renderizado por seção, o HTML pode mudar; o ETag do link permanente acompanha
+        guide.content_hash = hashlib.sha256(html.encode('utf-8')).hexdigest()
+        guide.size_bytes = len(guide.markdown.encode('utf-8')) + len(html.encode('utf-8'))
+        guide.save(update_fields=['content_hash', 'size_bytes'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_contentblob'),
+    ]
+
+    operations = [
+        migrations.RunPython(compress_guides, migrations.RunPython.noop),
+    ]
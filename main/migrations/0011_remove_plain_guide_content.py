@@ -0,0 +1,38 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_compress_guide_content'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='guide',
+            name='markdown',
+        ),
+        migrations.RemoveField(
+            model_name='guide',
+            name='html',
+        ),
+        migrations.RemoveField(
+            model_name='guidesection',
+            name='markdown',
+        ),
+        migrations.RemoveField(
+            model_name='guidesection',
+            name='html',
+        ),
+        migrations.AlterField(
+            model_name='guidesection',
+            name='markdown_blob',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='markdown_sections', to='main.contentblob'),
+        ),
+        migrations.AlterField(
+            model_name='guidesection',
+            name='html_blob',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='html_sections', to='main.contentblob'),
+        ),
+    ]
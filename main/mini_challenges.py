@@ -0,0 +1,149 @@
+"""
+Estruturação das conquistas e mini-desafios do guia em uma única passagem.
+
+Cada linha de conquista abre um segmento que vai até a próxima conquista.
+Os mini-desafios do segmento são reunidos em uma lista HTML logo abaixo da
+conquista e as demais linhas do segmento seguem na ordem original. Como o
+segmento é acumulado e descarregado uma única vez quando termina, o custo é
+linear no tamanho do guia (a versão anterior reescaneava o texto a partir de
+cada conquista e inseria linhas no meio da lista de resultado).
+"""
+import re
+
+PHASE_PATTERN = re.compile(r'(^\d+️⃣\s+\*\*Fase\s+\d+:.*?\*\*\s*$)', re.MULTILINE)
+PHASE_MARKER = '<!-- phase-marker -->'
+PROCESSED_PREFIX = '<!-- processed:'
+
+MINI_CHALLENGES_OPEN = "<ul class='mini-challenges-list'>"
+MINI_CHALLENGES_CLOSE = "</ul>"
+MINI_CHALLENGE_LABEL = "<span class='mini-desafio'>↳ <em>Mini-desafio:</em></span>"
+
+
+def is_conquest(line):
+    # Cobre tanto '**Conquista:**' quanto '*Conquista:*'
+    return "*Conquista:*" in line
+
+
+def is_mini_challenge(line):
+    # Cobre tanto '*Mini-desafio:*' quanto 'Mini-desafio:'
+    return "Mini-desafio:" in line
+
+
+def format_conquest(line):
+    line = line.replace("- **Conquista:**", "- <span class='conquest-marker'>**Conquista:**</span>")
+    return line.replace("- *Conquista:*", "- <span class='conquest-marker'>*Conquista:*</span>")
+
+
+def format_mini_challenge(line):
+    """Converte a linha de um mini-desafio em um item da lista HTML"""
+    mini_line = line.strip()
+    if mini_line.startswith("- "):
+        mini_line = mini_line[2:]
+    # As duas substituições em sequência reproduzem a marcação que o CSS já espera
+    mini_line = mini_line.replace("*Mini-desafio:*", MINI_CHALLENGE_LABEL)
+    mini_line = mini_line.replace("Mini-desafio:", MINI_CHALLENGE_LABEL)
+    return f"  <li class='mini-challenge'>{mini_line}</li>"
+
+
+class MiniChallengeTransformer:
+    """Acumula as linhas de saída, descartando linhas em branco consecutivas"""
+
+    def __init__(self):
+        self.output = []
+        self.previous_blank = False
+        self.seen_conquest_marker = False
+        # Segmento da conquista atual: linha da conquista, mini-desafios e demais linhas
+        self.conquest_line = None
+        self.mini_challenges = []
+        self.segment_lines = []
+
+    def emit(self, line):
+        blank = line.strip() == ''
+        if blank and self.previous_blank:
+            return
+        self.previous_blank = blank
+        self.output.append(line)
+        if "conquest-marker" in line:
+            self.seen_conquest_marker = True
+
+    def emit_plain(self, line):
+        """Linha fora de conquistas e mini-desafios"""
+        if PHASE_MARKER in line:
+            self.emit('')  # Linha em branco para separar as fases
+        elif not line.startswith(PROCESSED_PREFIX):
+            self.emit(line)
+
+    def flush_segment(self):
+        if self.conquest_line is None:
+            return
+        self.emit(self.conquest_line)
+        if self.mini_challenges:
+            self.emit(MINI_CHALLENGES_OPEN)
+            for item in self.mini_challenges:
+                self.emit(item)
+            self.emit(MINI_CHALLENGES_CLOSE)
+        for line in self.segment_lines:
+            self.emit_plain(line)
+        self.conquest_line = None
+        self.mini_challenges = []
+        self.segment_lines = []
+
+    def feed(self, line):
+        if is_conquest(line):
+            self.flush_segment()
+            if PHASE_MARKER in line:
+                # Marcador de fase tem precedência, mas a linha ainda encerra o segmento
+                self.emit('')
+                return
+            self.conquest_line = format_conquest(line)
+        elif self.conquest_line is not None:
+            if is_mini_challenge(line):
+                self.mini_challenges.append(format_mini_challenge(line))
+            else:
+                self.segment_lines.append(line)
+        elif PHASE_MARKER in line or line.startswith(PROCESSED_PREFIX) or not is_mini_challenge(line):
+            self.emit_plain(line)
+        else:
+            self.attach_orphan(line)
+
+    def attach_orphan(self, line):
+        """
+        Mini-desafio antes da primeira conquista. Só há onde anexá-lo se o
+        próprio texto já trouxer a marcação de conquista, caso raro em que a
+        lista de saída é percorrida como antes.
+        """
+        if not self.seen_conquest_marker:
+            self.emit(line)
+            return
+        output = self.output
+        last_conquest_index = max(j for j, result_line in enumerate(output) if "conquest-marker" in result_line)
+        item = format_mini_challenge(line)
+        if last_conquest_index + 1 < len(output) and output[last_conquest_index + 1] == MINI_CHALLENGES_OPEN:
+            for k in range(last_conquest_index + 2, len(output)):
+                if output[k] == MINI_CHALLENGES_CLOSE:
+                    output.insert(k, item)
+                    break
+        else:
+            output[last_conquest_index + 1:last_conquest_index + 1] = [MINI_CHALLENGES_OPEN, item, MINI_CHALLENGES_CLOSE]
+        self.previous_blank = output[-1].strip() == ''
+
+    def finish(self):
+        self.flush_segment()
+        return '\n'.join(self.output)
+
+
+def process_mini_challenges(markdown_text):
+    """Estrutura conquistas e mini-desafios do guia em uma única passagem"""
+    # Garantir quebras de linha consistentes
+    markdown_text = markdown_text.replace("\r\n", "\n")
+
+    # Corrigir setas duplicadas antes do processamento
+    markdown_text = markdown_text.replace('↳ ↳', '↳')
+
+    # Inserir marcadores de início de fase
+    markdown_text = PHASE_PATTERN.sub(PHASE_MARKER + r'\n\1', markdown_text)
+
+    transformer = MiniChallengeTransformer()
+    for line in markdown_text.split('\n'):
+        transformer.feed(line)
+    return transformer.finish()
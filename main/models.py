@@ -1,3 +1,233 @@
+import uuid
+
 from django.db import models
+from django.urls import reverse
+from django.utils.functional import cached_property
+
+from .compression import decompress
+
+
+class Guide(models.Model):
+    """
+    Guia completo gerado pela IA, armazenado para evitar novas chamadas à API.
+
+    A chave de cache combina o tema normalizado, o número de partes, o modelo
+    e a versão dos prompts (ver main/guide_cache.py). Cada guia também tem um
+    link permanente (public_id), que continua válido depois que o guia sai
+    do cache (retired_at) até settings.GUIDE_PERMALINK_TTL.
+
+    O conteúdo fica nas seções (GuideSection), comprimido e deduplicado;
+    markdown e html são montados a partir delas quando acessados.
+    """
+    # Separadores das seções no guia completo (ver assemble_guide e render_sections)
+    MARKDOWN_SEPARATOR = "\n\n"
+    HTML_SEPARATOR = "\n"
+
+
+    public_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    cache_key = models.CharField(max_length=64, unique=True)
+    tema = models.CharField(max_length=200)
+    normalized_tema = models.CharField(max_length=200, db_index=True)
+    num_partes = models.PositiveSmallIntegerField()
+    model_name = models.CharField(max_length=100)
+    prompt_version = models.CharField(max_length=64)
+    content_hash = models.CharField(max_length=64, blank=True)
+    size_bytes = models.PositiveIntegerField(default=0)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    last_accessed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    retired_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'guia'
+        verbose_name_plural = 'guias'
+
+    def __str__(self):
+        return f"{self.tema} ({self.num_partes} partes)"
+
+    def get_absolute_url(self):
+        return reverse('guide_permalink', args=[self.public_id])
+
+    @cached_property
+    def markdown(self):
+        sections = self.sections.select_related('markdown_blob')
+        return self.MARKDOWN_SEPARATOR.join(section.markdown for section in sections)
+
+    @cached_property
+    def html(self):
+        sections = self.sections.select_related('html_blob')
+        return self.HTML_SEPARATOR.join(section.html for section in sections)
+
+
+class ContentBlob(models.Model):
+    """
+    Texto comprimido (Markdown ou HTML de uma seção), endereçado pelo hash
+    do conteúdo: seções idênticas em guias diferentes são armazenadas uma
+    única vez (ver main/compression.py).
+    """
+    digest = models.CharField(max_length=64, unique=True)
+    codec = models.CharField(max_length=10)
+    dictionary = models.CharField(max_length=50, blank=True)
+    data = models.BinaryField()
+    size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'conteúdo armazenado'
+        verbose_name_plural = 'conteúdos armazenados'
+
+    def __str__(self):
+        return f"{self.digest[:12]} ({self.codec})"
+
+    @cached_property
+    def text(self):
+        return decompress(self.codec, self.dictionary, self.data)
+
+
+class GuideSection(models.Model):
+    """
+    Seção de um guia armazenado (introdução, título das partes, parte ou
+    conclusão), com o Markdown gerado e o HTML já renderizado. Cada texto só
+    é descomprimido quando acessado.
+    """
+    guide = models.ForeignKey(Guide, on_delete=models.CASCADE, related_name='sections')
+    key = models.CharField(max_length=20)
+    position = models.PositiveSmallIntegerField()
+    markdown_blob = models.ForeignKey(ContentBlob, on_delete=models.PROTECT, related_name='markdown_sections')
+    html_blob = models.ForeignKey(ContentBlob, on_delete=models.PROTECT, related_name='html_sections')
+
+    class Meta:
+        ordering = ['guide', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['guide', 'position'], name='unique_guide_section_position'),
+        ]
+        verbose_name = 'seção do guia'
+        verbose_name_plural = 'seções do guia'
+
+    def __str__(self):
+        return f"{self.guide} - {self.key}"
+
+    @property
+    def markdown(self):
+        return self.markdown_blob.text
+
+    @property
+    def html(self):
+        return self.html_blob.text
+
+
+class GuideCacheStats(models.Model):
+    """Contadores globais do cache de guias (linha única)"""
+    hits = models.PositiveBigIntegerField(default=0)
+    misses = models.PositiveBigIntegerField(default=0)
+    bytes_saved = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'estatísticas do cache de guias'
+        verbose_name_plural = 'estatísticas do cache de guias'
+
+    def __str__(self):
+        return f"Cache de guias: {self.hit_rate:.1%} de acertos"
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class SectionMemo(models.Model):
+    """
+    Saída de uma etapa da geração (esqueleto, introdução, parte ou conclusão),
+    endereçada pelo hash do texto exato do prompt e do modelo.
+    """
+    digest = models.CharField(max_length=64, unique=True)
+    stage = models.CharField(max_length=20)
+    model_name = models.CharField(max_length=100)
+    content = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'seção memorizada'
+        verbose_name_plural = 'seções memorizadas'
+
+    def __str__(self):
+        return f"{self.stage} ({self.digest[:12]})"
+
+
+class GenerationLock(models.Model):
+    """
+    Trava de geração de um guia compartilhada entre processos: enquanto
+    existir, requisições idênticas em outros workers esperam o guia chegar
+    ao cache em vez de chamar a API (ver main/singleflight.py).
+    """
+    key = models.CharField(max_length=64, unique=True)
+    owner = models.CharField(max_length=64)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'trava de geração'
+        verbose_name_plural = 'travas de geração'
+
+    def __str__(self):
+        return f"{self.key[:12]} ({self.owner})"
+
+
+class GenerationJob(models.Model):
+    """
+    Geração de guia executada em segundo plano por um worker
+    (python manage.py run_generation_worker). O próprio banco de dados faz o
+    papel de fila.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Na fila'),
+        (STATUS_RUNNING, 'Em execução'),
+        (STATUS_DONE, 'Concluído'),
+        (STATUS_FAILED, 'Falhou'),
+    ]
+
+    public_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    tema = models.CharField(max_length=200)
+    num_partes = models.PositiveSmallIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    stage = models.CharField(max_length=20, blank=True)
+    completed_steps = models.PositiveSmallIntegerField(default=0)
+    total_steps = models.PositiveSmallIntegerField(default=0)
+    html_result = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = 'job de geração'
+        verbose_name_plural = 'jobs de geração'
+
+    def __str__(self):
+        return f"{self.tema} ({self.num_partes} partes) - {self.get_status_display()}"
+
+
+class MaintenanceMode(models.Model):
+    """
+    Modo de manutenção compartilhado por todos os processos (linha única).
+    Alterado por python manage.py set_maintenance_mode ou pelo admin; ver
+    main/maintenance.py.
+    """
+    enabled = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'modo de manutenção'
+        verbose_name_plural = 'modo de manutenção'
 
-# Create your models here.
+    def __str__(self):
+        return f"Modo de manutenção: {'ativado' if self.enabled else 'desativado'}"
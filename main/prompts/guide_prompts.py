@@ -0,0 +1,193 @@
+# Prompts usados na abordagem de uma requisição por seção do guia
+
+
+def format_phase_range(phase_range):
+    """Formata o intervalo de partes de uma fase, ex: 'Parte 1' ou 'Partes 1-2'"""
+    start, end = phase_range
+    if end > start:
+        return f"Partes {start}-{end}"
+    return f"Parte {start}"
+
+
+def build_skeleton_prompt(tema, num_partes):
+    """Monta o prompt do esqueleto estrutural (invisível ao usuário), respondido em JSON"""
+    return f"""Crie um esqueleto estrutural detalhado e CONSISTENTE para um guia de estudos sobre "{tema}" em {num_partes} partes.
+
+Para cada parte, defina:
+1. Um título específico (começando com um verbo e incluindo um emoji)
+2. 3-4 tópicos principais que serão abordados nesta parte
+3. Nível de dificuldade (1-5, aumentando progressivamente)
+
+Responda em JSON com a lista "parts", uma entrada para cada parte de 1 a {num_partes}:
+- number: número da parte
+- title: título específico com verbo e emoji
+- topics: lista com os tópicos principais
+- difficulty: nível de dificuldade (1-5)"""
+
+
+def build_skeleton_repair_prompt(tema, num_partes, skeleton_parts, missing_parts):
+    """Monta o prompt que pede apenas as partes que faltaram no esqueleto"""
+    defined_parts = "\n".join(
+        f"- Parte {part_num}: {skeleton_parts[part_num].title} (dificuldade {skeleton_parts[part_num].difficulty})"
+        for part_num in sorted(skeleton_parts)
+    )
+    missing_list = ", ".join(str(part_num) for part_num in missing_parts)
+    return f"""Complete o esqueleto estrutural de um guia de estudos sobre "{tema}" em {num_partes} partes.
+
+Partes já definidas:
+{defined_parts or "- (nenhuma)"}
+
+Crie SOMENTE as partes {missing_list}, coerentes com as já definidas e com a dificuldade aumentando progressivamente.
+Para cada uma, defina um título específico (começando com um verbo e incluindo um emoji), 3-4 tópicos principais e o nível de dificuldade (1-5).
+
+Responda em JSON com a lista "parts", com os campos number, title, topics e difficulty."""
+
+
+def build_intro_prompt(tema, num_partes, phase_titles, phase_distribution):
+    """Monta o prompt da introdução a partir dos títulos sintetizados das fases"""
+    return f"""Crie apenas a introdução para um guia de estudos sobre "{tema}" em {num_partes} partes.
+
+Use esta formatação:
+# {tema} em {num_partes} Partes: Seu Mapa para Dominar {tema} do Zero
+
+## Por Onde Começar?
+[4 perguntas específicas com problemas relacionados a {tema}, sem começar com "Você"]
+FORMATO CORRETO (sem pronome inicial):
+- Se sente perdido ao tentar [ação específica de {tema}]?
+- Tem dificuldade em entender [conceito específico de {tema}]?
+- Fica confuso ao tentar [ação relacionada a {tema}]?
+- Precisa dominar [habilidade específica] em [tempo determinado]?
+
+## O Que Você Vai Construir:
+1️⃣ **Fase 1: {phase_titles[0]} ({format_phase_range(phase_distribution[0])})**
+- **Conquista:** [Habilidade concreta específica sobre {tema}]
+    - *Mini-desafio:* [Tarefa prática sobre {tema} relacionada à conquista acima]
+- **Conquista:** [Outra habilidade concreta específica sobre {tema}]
+    - *Mini-desafio:* [Outra tarefa prática sobre {tema} relacionada à conquista acima]
+
+2️⃣ **Fase 2: {phase_titles[1]} ({format_phase_range(phase_distribution[1])})**
+- **Conquista:** [Habilidade intermediária específica sobre {tema}]
+    - *Mini-desafio:* [Tarefa mais complexa sobre {tema} relacionada à conquista acima]
+- **Conquista:** [Outra habilidade intermediária específica sobre {tema}]
+    - *Mini-desafio:* [Outra tarefa complexa sobre {tema} relacionada à conquista acima]
+- **Conquista:** [Terceira habilidade intermediária sobre {tema}]
+    - *Mini-desafio:* [Tarefa desafiadora sobre {tema} relacionada à conquista acima]
+
+3️⃣ **Fase 3: {phase_titles[2]} ({format_phase_range(phase_distribution[2])})**
+- **Conquista:** [Habilidade avançada específica sobre {tema}]
+    - *Mini-desafio:* [Projeto avançado sobre {tema} relacionado à conquista acima]
+- **Conquista:** [Outra habilidade avançada sobre {tema}]
+    - *Mini-desafio:* [Outro projeto avançado sobre {tema} relacionado à conquista acima]
+- **Conquista:** [Habilidade de expert em {tema}]
+    - *Mini-desafio:* [Projeto complexo sobre {tema} para demonstrar maestria]
+
+## Kit Ferramentas Incluso:
+[Lista de 5 ferramentas principais para {tema}, cada uma com emoji e descrição específica de uso]
+Exemplo de formato para cada ferramenta:
+- [Emoji] **[Nome da Ferramenta]:** [Descrição curta e específica do uso para {tema}]
+
+## Primeiro Passo Imediato:
+[3 ações concretas e verificáveis para começar com {tema}, com foco em resultados práticos]
+Exemplo de formato para cada ação:
+1️⃣ **[Ação específica]** → [Resultado esperado]
+
+IMPORTANTE:
+1. NÃO mencione tempo ou duração (minutos, horas, etc.) nos primeiros passos
+2. Coloque TODO o texto do passo em negrito (incluindo a ação e o resultado)
+3. Use APENAS exemplos e termos específicos de {tema}"""
+
+
+def build_guide_context_prompt(tema, num_partes, skeleton_parts, phase_titles, phase_distribution):
+    """
+    Monta o contexto completo compartilhado pelas partes do guia: fases,
+    esqueleto completo e a estrutura comum de cada parte. É o prefixo
+    idêntico dos prompts de parte quando vai para o cache de contexto.
+    """
+    phases = "\n".join(
+        f"- Fase {phase_num}: {phase_title} ({format_phase_range(phase_range)})"
+        for phase_num, (phase_title, phase_range) in enumerate(zip(phase_titles, phase_distribution), 1)
+    )
+    skeleton = "\n".join(
+        f"- Parte {part_num}: {part.title} (dificuldade {part.difficulty}/5) - {', '.join(part.topics)}"
+        for part_num, part in sorted(skeleton_parts.items())
+    )
+    return f"""Você está escrevendo, uma parte por vez, um guia de estudos sobre "{tema}" em {num_partes} partes.
+
+Fases do guia:
+{phases}
+
+Esqueleto completo do guia:
+{skeleton}
+
+{build_part_guidelines(tema)}"""
+
+
+def build_part_guidelines(tema):
+    """Estrutura comum e regras de todas as partes do guia"""
+    return f"""Cada parte deve incluir:
+- Dificuldade: [nível da parte]/5
+- Taxonomia de Bloom: [Nível]
+- Estilo de Aprendizado: [Perfil]
+- Progresso Acumulado: [percentual]% do core mastery
+- Objetivo Transformador: frase específica sobre o que a pessoa conseguirá fazer
+- Conexões com partes anteriores e posteriores
+- Tópicos Nucleares: os tópicos da parte no esqueleto
+- Rotas Alternativas: caminho simples e avançado para aprender
+- Armadilhas Comuns: problemas reais frequentes com soluções concretas
+- Checklist de Domínio: 3-4 itens verificáveis sobre habilidades concretas
+- Caso Real: exemplo específico de uso de {tema} no mundo real
+- Prompt de IA: um prompt detalhado para praticar o aprendizado
+- Desafio Relâmpago: desafio específico
+
+IMPORTANTE:
+1. Seja ALTAMENTE ESPECÍFICO sobre {tema}, use exemplos reais e termos técnicos
+2. Crie APENAS a parte pedida, sem introdução ou conclusão
+3. Use linguagem técnica própria de {tema}
+4. NÃO INCLUA nenhuma referência a tempo de estudo (horas, dias, semanas, etc.)"""
+
+
+def build_part_context_prompt(tema, num_partes):
+    """
+    Prefixo enxuto das partes, sem as fases e o esqueleto das demais partes.
+    Usado quando o contexto completo não fica em cache (seria cobrado de novo
+    em cada parte) e no pipeline especulativo, em que cada parte é pedida
+    assim que a sua entrada do esqueleto chega.
+    """
+    return f"""Você está escrevendo, uma parte por vez, um guia de estudos sobre "{tema}" em {num_partes} partes.
+As demais partes são escritas ao mesmo tempo: siga o título, a fase e os tópicos indicados para esta parte.
+
+{build_part_guidelines(tema)}"""
+
+
+def build_part_prompt(tema, num_partes, part_num, skeleton_part, phase_num):
+    """Monta o trecho específico de uma parte (vai depois do contexto compartilhado)"""
+    return f"""Crie APENAS a parte {part_num} de um guia de estudos sobre "{tema}" em {num_partes} partes.
+
+IMPORTANTE: Use EXATAMENTE este título, sem alterações:
+# Parte {part_num}: {skeleton_part.title}
+
+Esta parte se refere à Fase {phase_num} do guia.
+
+Para a Parte {part_num}:
+- Dificuldade: {skeleton_part.difficulty}/5
+- Progresso Acumulado: {part_num*10}% do core mastery
+- Tópicos Nucleares: {', '.join(skeleton_part.topics)}"""
+
+
+def build_conclusion_prompt(tema, num_partes):
+    """Monta o prompt da conclusão do guia"""
+    return f"""Crie apenas a conclusão para um guia de estudos sobre "{tema}" em {num_partes} partes.
+
+Use esta formatação:
+# CONSIDERAÇÕES FINAIS
+## Integração dos Conhecimentos
+## Síntese
+## Conclusão
+
+A conclusão deve:
+1. Sintetizar a progressão de conhecimento através das {num_partes} partes
+2. Explicar como os conceitos aprendidos se integram no uso real de {tema}
+3. Sugerir próximos passos para continuar o aprendizado
+4. Reforçar a jornada completa de domínio do {tema}
+
+Seja específico sobre {tema}, não use texto genérico."""
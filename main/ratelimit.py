@@ -0,0 +1,224 @@
+"""
+Limitador de taxa adaptativo para as chamadas ao Gemini.
+
+Um único limitador por processo controla dois baldes de fichas (token
+bucket): requisições por minuto (settings.GEMINI_RPM) e tokens por minuto
+(settings.GEMINI_TPM). Cada chamada reserva sua cota antes de ser feita e
+espera apenas o tempo necessário para que a cota exista, em vez de uma pausa
+fixa entre chamadas.
+
+Quando a API responde com 429/ResourceExhausted, a taxa efetiva é reduzida
+pela metade e as novas chamadas aguardam o tempo de recuperação; a cada
+sucesso a taxa volta a subir gradualmente até o limite configurado.
+"""
+import asyncio
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from google.api_core import exceptions as google_exceptions
+
+from .llm import RateLimitedLLMError
+from .metrics import record_retry
+
+logger = logging.getLogger(__name__)
+
+# Menor fração da taxa configurada que o ajuste adaptativo pode atingir
+MIN_RATE_FACTOR = 0.1
+# Quanto da taxa é recuperado a cada chamada bem-sucedida
+RATE_RECOVERY_STEP = 0.05
+
+RETRY_DELAY_PATTERN = re.compile(r'retry[_ ]delay\s*\{\s*seconds:\s*(\d+)', re.IGNORECASE)
+
+RATE_LIMIT_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    RateLimitedLLMError,
+)
+# Mensagens que começam pelo código HTTP ("429 Too Many Requests") ou citam o status do gRPC
+RATE_LIMIT_MESSAGE_PATTERN = re.compile(r'^429\s|\bresource[ _]exhausted\b', re.IGNORECASE)
+
+
+class TokenBucket:
+    """Balde de fichas com reposição contínua; o saldo pode ficar negativo (reservas)"""
+
+    def __init__(self, per_minute, now):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated_at = now
+
+    def refill(self, now, rate_factor):
+        elapsed = now - self.updated_at
+        self.updated_at = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate * rate_factor)
+
+    def reserve(self, amount, rate_factor):
+        """Consome amount fichas e retorna quantos segundos esperar até que existam"""
+        self.tokens -= amount
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / (self.rate * rate_factor)
+
+
+class AdaptiveRateLimiter:
+    """
+    Limitador de requisições e tokens por minuto, seguro entre threads.
+    clock é a fonte de tempo em segundos (substituída nos testes).
+    """
+
+    def __init__(self, rpm, tpm, clock=time.monotonic):
+        self.clock = clock
+        self.requests = TokenBucket(rpm, clock())
+        self.tokens = TokenBucket(tpm, clock())
+        self.rate_factor = 1.0
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self, estimated_tokens):
+        """Reserva a cota de uma chamada e retorna o tempo de espera em segundos"""
+        with self.lock:
+            now = self.clock()
+            self.requests.refill(now, self.rate_factor)
+            self.tokens.refill(now, self.rate_factor)
+            # Tokens além da capacidade do balde nunca caberiam; limitar para não travar
+            estimated_tokens = min(estimated_tokens, self.tokens.capacity)
+            wait = max(
+                self.requests.reserve(1, self.rate_factor),
+                self.tokens.reserve(estimated_tokens, self.rate_factor),
+                self.blocked_until - now,
+            )
+        return max(0.0, wait)
+
+    def acquire(self, estimated_tokens=0):
+        wait = self.reserve(estimated_tokens)
+        if wait > 0:
+            logger.debug(f"Aguardando {wait:.2f}s pela cota da API")
+            time.sleep(wait)
+
+    async def aacquire(self, estimated_tokens=0):
+        wait = self.reserve(estimated_tokens)
+        if wait > 0:
+            logger.debug(f"Aguardando {wait:.2f}s pela cota da API")
+            await asyncio.sleep(wait)
+
+    def record_success(self, estimated_tokens, actual_tokens=None):
+        """Recupera gradualmente a taxa e corrige a estimativa de tokens"""
+        with self.lock:
+            self.rate_factor = min(1.0, self.rate_factor + RATE_RECOVERY_STEP)
+            if actual_tokens is not None:
+                self.tokens.tokens -= actual_tokens - min(estimated_tokens, self.tokens.capacity)
+
+    def record_rate_limited(self, retry_after=None):
+        """Reduz a taxa efetiva e bloqueia novas chamadas até o fim da espera"""
+        with self.lock:
+            self.rate_factor = max(MIN_RATE_FACTOR, self.rate_factor / 2)
+            # Sem indicação da API, esperar o intervalo de uma requisição na nova taxa
+            if retry_after is None:
+                retry_after = 1.0 / (self.requests.rate * self.rate_factor)
+            self.blocked_until = max(self.blocked_until, self.clock() + retry_after)
+            logger.warning(
+                f"Limite de requisições da API atingido; taxa reduzida para "
+                f"{self.rate_factor:.0%} e pausa de {retry_after:.1f}s"
+            )
+
+    def headroom(self):
+        """Número aproximado de requisições que podem ser feitas agora sem espera"""
+        with self.lock:
+            now = self.clock()
+            self.requests.refill(now, self.rate_factor)
+            if self.blocked_until > now:
+                return 0
+            return max(0, int(self.requests.tokens))
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Limitador compartilhado pelo processo, criado a partir das configurações"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = AdaptiveRateLimiter(settings.GEMINI_RPM, settings.GEMINI_TPM)
+    return _limiter
+
+
+def estimate_tokens(prompt):
+    """Estimativa de tokens de uma chamada: prompt (~4 caracteres por token) mais a resposta esperada"""
+    return len(prompt) // 4 + settings.GEMINI_ESTIMATED_OUTPUT_TOKENS
+
+
+def is_rate_limit_error(error):
+    """
+    Verifica se a exceção indica cota esgotada (HTTP 429 / ResourceExhausted):
+    pelo tipo, pelo código de status e, em último caso, pelo início da
+    mensagem (um "429" qualquer no meio dela, como em ids ou contagens, não conta)
+    """
+    if isinstance(error, RATE_LIMIT_ERRORS):
+        return True
+    if getattr(error, 'status_code', None) == 429 or getattr(error, 'code', None) == 429:
+        return True
+    return bool(RATE_LIMIT_MESSAGE_PATTERN.search(str(error)))
+
+
+def get_retry_delay(error):
+    """Extrai o tempo de espera sugerido pela API, se houver"""
+    match = RETRY_DELAY_PATTERN.search(str(error))
+    return float(match.group(1)) if match else None
+
+
+def get_total_tokens(response):
+    """Total de tokens consumidos informado pelo provedor (LLMResponse.total_tokens), se disponível"""
+    return getattr(response, 'total_tokens', None) or None
+
+
+def rate_limited_call(call, prompt, count_tokens=True):
+    """
+    Executa call() respeitando o limitador compartilhado.
+
+    Em caso de 429, a taxa é reduzida e a chamada é refeita após a espera
+    mínima, até settings.GEMINI_RATE_LIMIT_RETRIES vezes. Com
+    count_tokens=False (respostas em streaming, cujo uso ainda não é
+    conhecido) a estimativa de tokens não é corrigida.
+    """
+    limiter = get_rate_limiter()
+    estimated_tokens = estimate_tokens(prompt)
+    attempt = 0
+    while True:
+        limiter.acquire(estimated_tokens)
+        try:
+            response = call()
+        except Exception as api_error:
+            if attempt < settings.GEMINI_RATE_LIMIT_RETRIES and is_rate_limit_error(api_error):
+                attempt += 1
+                record_retry()
+                limiter.record_rate_limited(get_retry_delay(api_error))
+                continue
+            raise
+        limiter.record_success(estimated_tokens, get_total_tokens(response) if count_tokens else None)
+        return response
+
+
+async def arate_limited_call(call, prompt):
+    """Versão assíncrona de rate_limited_call; call() deve retornar um awaitable"""
+    limiter = get_rate_limiter()
+    estimated_tokens = estimate_tokens(prompt)
+    attempt = 0
+    while True:
+        await limiter.aacquire(estimated_tokens)
+        try:
+            response = await call()
+        except Exception as api_error:
+            if attempt < settings.GEMINI_RATE_LIMIT_RETRIES and is_rate_limit_error(api_error):
+                attempt += 1
+                record_retry()
+                limiter.record_rate_limited(get_retry_delay(api_error))
+                continue
+            raise
+        limiter.record_success(estimated_tokens, get_total_tokens(response))
+        return response
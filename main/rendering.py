@@ -0,0 +1,158 @@
+"""
+Pós-processamento e renderização do Markdown gerado pela IA.
+
+A instância de markdown.Markdown (extensões e processadores já montados) é
+criada uma vez por thread e reaproveitada entre as chamadas com reset(), em
+vez de ser reconstruída a cada renderização.
+"""
+import hashlib
+import re
+import threading
+
+import markdown
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+from markdown.extensions import Extension
+from markdown.preprocessors import Preprocessor
+
+from .metrics import record_cache_hit, span
+from .mini_challenges import process_mini_challenges
+
+MARKDOWN_EXTENSIONS = ['extra', 'fenced_code', 'tables', 'nl2br', 'sane_lists']
+
+# Incrementar quando a renderização mudar, para descartar fragmentos antigos do cache
+FRAGMENT_VERSION = 1
+
+# Título que separa a introdução das partes no guia montado
+PARTS_HEADING = "# PARTES"
+
+# Linhas que abrem ou fecham um bloco de código cercado
+FENCE_PATTERN = re.compile(r'^\s*(```|~~~)', re.MULTILINE)
+
+
+class MiniChallengePreprocessor(Preprocessor):
+    """Estrutura conquistas e mini-desafios antes dos demais processadores"""
+
+    def run(self, lines):
+        with span('postprocess'):
+            return process_mini_challenges('\n'.join(lines)).split('\n')
+
+
+class MiniChallengeExtension(Extension):
+    """Extensão Markdown com o tratamento de conquistas e mini-desafios do guia"""
+
+    def extendMarkdown(self, md):
+        # Prioridade acima de normalize_whitespace (30): recebe o texto como a IA o gerou
+        md.preprocessors.register(MiniChallengePreprocessor(md), 'mini_challenges', 35)
+
+
+_local = threading.local()
+
+
+def get_markdown():
+    """Instância de markdown.Markdown da thread atual, criada na primeira chamada"""
+    md = getattr(_local, 'markdown', None)
+    if md is None:
+        md = markdown.Markdown(
+            extensions=MARKDOWN_EXTENSIONS + [MiniChallengeExtension()],
+            output_format='html5',
+        )
+        _local.markdown = md
+    return md
+
+
+def render_markdown(markdown_text):
+    """Aplica o pré-processamento de mini-desafios e converte o Markdown em HTML seguro"""
+    md = get_markdown()
+    try:
+        # Usar safe para garantir que o HTML não é escapado
+        return mark_safe(md.convert(markdown_text))
+    finally:
+        # Limpar o estado do documento (notas de rodapé, HTML guardado, etc.)
+        md.reset()
+
+
+def fragment_cache_key(markdown_text):
+    digest = hashlib.sha256(markdown_text.encode('utf-8')).hexdigest()
+    return f"fragment:{FRAGMENT_VERSION}:{digest}"
+
+
+def render_fragment(markdown_text):
+    """
+    Renderiza uma seção do guia, reaproveitando o HTML já gerado para o
+    mesmo Markdown (cache do Django, chave pelo hash do conteúdo).
+    """
+    with span('render'):
+        key = fragment_cache_key(markdown_text)
+        html = cache.get(key)
+        if html is None:
+            html = str(render_markdown(markdown_text))
+            cache.set(key, html, settings.RENDER_FRAGMENT_TTL)
+        else:
+            record_cache_hit('fragment')
+        return mark_safe(html)
+
+
+def render_sections(sections):
+    """
+    Monta o HTML do guia a partir dos fragmentos de cada seção (introdução,
+    partes e conclusão, como devolvido por order_sections). Só as seções
+    ainda não vistas são renderizadas.
+
+    Cada seção é um documento Markdown independente: mini-desafios e notas
+    de rodapé de uma parte não se misturam com os de outra.
+    """
+    fragments = [render_fragment(sections['intro']), render_fragment(PARTS_HEADING)]
+    fragments.extend(render_fragment(part_content) for part_content in sections['parts'])
+    fragments.append(render_fragment(sections['conclusion']))
+    return mark_safe('\n'.join(fragments))
+
+
+class IncrementalMarkdownRenderer:
+    """
+    Renderiza uma seção em Markdown enquanto ela ainda está sendo gerada.
+
+    Os trechos recebidos são acumulados e apenas os blocos já estáveis (que
+    terminam em uma linha em branco fora de um bloco de código) são
+    convertidos para HTML. Cada bloco é renderizado uma única vez, então o
+    custo total é linear no tamanho da seção. O HTML produzido é uma
+    prévia: o resultado definitivo continua sendo render_markdown() sobre a
+    seção completa.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+
+    def feed(self, text):
+        """Adiciona um trecho e devolve o HTML dos blocos que ficaram estáveis, ou None"""
+        self.buffer += text
+        boundary = self._stable_boundary()
+        if boundary <= 0:
+            return None
+        stable, self.buffer = self.buffer[:boundary], self.buffer[boundary:]
+        return render_markdown(stable)
+
+    def flush(self):
+        """Renderiza o que restou no buffer, fechando blocos de código abertos"""
+        remaining, self.buffer = self.buffer, ""
+        if not remaining.strip():
+            return None
+        if len(FENCE_PATTERN.findall(remaining)) % 2:
+            remaining += "\n```"
+        return render_markdown(remaining)
+
+    def _stable_boundary(self):
+        """Posição logo após a última linha em branco que não está dentro de um bloco de código"""
+        boundary = -1
+        in_fence = False
+        position = 0
+        for line in self.buffer.splitlines(keepends=True):
+            position += len(line)
+            if not line.endswith("\n"):
+                break  # Linha ainda incompleta
+            if FENCE_PATTERN.match(line):
+                in_fence = not in_fence
+            elif not in_fence and not line.strip():
+                boundary = position
+        return boundary
@@ -0,0 +1,192 @@
+"""
+Retentativas com backoff exponencial e circuit breaker para as chamadas ao Gemini.
+
+Erros transitórios (indisponibilidade, erro interno, timeout, falha de
+conexão) são repetidos até settings.GEMINI_MAX_RETRIES vezes, com espera
+exponencial e jitter completo entre as tentativas. Erros definitivos
+(filtro de conteúdo, argumento inválido) são propagados imediatamente.
+Erros de cota (429/ResourceExhausted) também não são repetidos aqui: quem
+os repete, com a espera indicada pela API, é rate_limited_call
+(main/ratelimit.py), e repetir nas duas camadas multiplicaria as chamadas
+justamente quando a API pede menos.
+
+O circuit breaker é compartilhado pelo processo: após
+settings.GEMINI_CIRCUIT_FAILURE_THRESHOLD falhas transitórias seguidas, as
+chamadas falham imediatamente por settings.GEMINI_CIRCUIT_RESET_TIMEOUT
+segundos, em vez de ocupar workers esperando uma API fora do ar. Depois
+desse intervalo uma chamada de teste é liberada e, se funcionar, o
+circuito volta a fechar.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from google.api_core import exceptions as google_exceptions
+
+from .llm import TransientLLMError
+from .metrics import record_retry
+from .ratelimit import is_rate_limit_error
+
+logger = logging.getLogger(__name__)
+
+TRANSIENT_ERRORS = (
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.GatewayTimeout,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    ConnectionError,
+    TimeoutError,
+    TransientLLMError,
+)
+
+
+class CircuitOpenError(Exception):
+    """Chamada recusada porque o circuito está aberto"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker simples (fechado → aberto → meio-aberto), seguro entre
+    threads. clock é a fonte de tempo em segundos (substituída nos testes).
+    """
+
+    def __init__(self, failure_threshold, reset_timeout, clock=time.monotonic):
+        self.clock = clock
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_progress = False
+        self.lock = threading.Lock()
+
+    def before_call(self):
+        """Levanta CircuitOpenError se a chamada não deve ser feita agora"""
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if self.clock() - self.opened_at < self.reset_timeout or self.trial_in_progress:
+                raise CircuitOpenError(
+                    "Serviço de IA temporariamente indisponível (circuit breaker aberto). "
+                    "Tente novamente em alguns instantes."
+                )
+            # Meio-aberto: liberar uma única chamada de teste
+            self.trial_in_progress = True
+
+    def record_success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                logger.info("Circuit breaker fechado: API voltou a responder")
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_progress = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            reopen = self.trial_in_progress
+            self.trial_in_progress = False
+            if reopen or (self.opened_at is None and self.failures >= self.failure_threshold):
+                self.opened_at = self.clock()
+                logger.error(f"Circuit breaker aberto após {self.failures} falhas seguidas")
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker():
+    """Circuit breaker compartilhado pelo processo"""
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker(
+                    settings.GEMINI_CIRCUIT_FAILURE_THRESHOLD,
+                    settings.GEMINI_CIRCUIT_RESET_TIMEOUT,
+                )
+    return _breaker
+
+
+def is_transient_error(error):
+    """Verifica se vale a pena repetir a chamada que gerou a exceção"""
+    if is_rate_limit_error(error):
+        # A API está no ar e pediu menos chamadas; já repetido por rate_limited_call
+        return False
+    if isinstance(error, TRANSIENT_ERRORS):
+        return True
+    error_msg = str(error).lower()
+    return "timeout" in error_msg or "deadline" in error_msg or "unavailable" in error_msg
+
+
+def backoff_delay(attempt):
+    """Espera antes da tentativa seguinte: exponencial com jitter completo"""
+    ceiling = min(settings.GEMINI_RETRY_MAX_DELAY, settings.GEMINI_RETRY_BASE_DELAY * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+def call_with_retries(call, stage='section'):
+    """Executa call() com retentativas para erros transitórios e circuit breaker"""
+    breaker = get_circuit_breaker()
+    attempt = 0
+    while True:
+        breaker.before_call()
+        try:
+            result = call()
+        except Exception as api_error:
+            if not is_transient_error(api_error):
+                # A API respondeu (ex: filtro de conteúdo); não conta como indisponibilidade
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if attempt >= settings.GEMINI_MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt)
+            attempt += 1
+            record_retry()
+            logger.warning(
+                f"Falha transitória na etapa '{stage}' ({str(api_error)}); "
+                f"tentativa {attempt}/{settings.GEMINI_MAX_RETRIES} em {delay:.1f}s"
+            )
+            time.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
+
+
+async def acall_with_retries(call, stage='section'):
+    """Versão assíncrona de call_with_retries; call() deve retornar um awaitable"""
+    breaker = get_circuit_breaker()
+    attempt = 0
+    while True:
+        breaker.before_call()
+        try:
+            result = await call()
+        except Exception as api_error:
+            if not is_transient_error(api_error):
+                # A API respondeu (ex: filtro de conteúdo); não conta como indisponibilidade
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if attempt >= settings.GEMINI_MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt)
+            attempt += 1
+            record_retry()
+            logger.warning(
+                f"Falha transitória na etapa '{stage}' ({str(api_error)}); "
+                f"tentativa {attempt}/{settings.GEMINI_MAX_RETRIES} em {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
@@ -0,0 +1,79 @@
+"""
+Memorização das saídas de cada etapa da geração.
+
+Cada resposta da API é armazenada sob o hash do texto exato do prompt e do
+nome do modelo. Uma requisição repetida ou reenviada após uma falha reutiliza
+as etapas já concluídas (esqueleto, introdução, partes, conclusão) e só chama
+a API para as que estiverem faltando. As entradas expiram após
+settings.SECTION_MEMO_TTL segundos.
+
+Assim como no cache de guias, falhas no banco de dados são apenas
+registradas no log e tratadas como ausência da entrada.
+"""
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import SectionMemo
+
+logger = logging.getLogger(__name__)
+
+
+def prompt_digest(prompt, model_name):
+    """Endereço de conteúdo de uma etapa: hash do modelo e do prompt"""
+    return hashlib.sha256(f"{model_name}\x00{prompt}".encode('utf-8')).hexdigest()
+
+
+def _expired_before():
+    return timezone.now() - timedelta(seconds=settings.SECTION_MEMO_TTL)
+
+
+def get_section(prompt, model_name):
+    """Retorna a saída memorizada para o prompt, ou None"""
+    try:
+        return (
+            SectionMemo.objects
+            .filter(digest=prompt_digest(prompt, model_name), created_at__gte=_expired_before())
+            .values_list('content', flat=True)
+            .first()
+        )
+    except Exception as cache_error:
+        logger.warning(f"Falha ao consultar seções memorizadas: {str(cache_error)}")
+        return None
+
+
+def store_section(prompt, model_name, stage, content):
+    """Memoriza a saída de uma etapa"""
+    try:
+        # Upsert em um único comando: as etapas são gravadas em paralelo
+        # pelas threads do pool e não devem disputar uma transação
+        SectionMemo.objects.bulk_create(
+            [SectionMemo(
+                digest=prompt_digest(prompt, model_name),
+                stage=stage,
+                model_name=model_name,
+                content=content,
+                created_at=timezone.now(),
+            )],
+            update_conflicts=True,
+            unique_fields=['digest'],
+            update_fields=['stage', 'content', 'created_at'],
+        )
+    except Exception as cache_error:
+        logger.warning(f"Falha ao memorizar a etapa '{stage}': {str(cache_error)}")
+
+
+def forget_section(prompt, model_name):
+    """Descarta a saída memorizada de um prompt (ex: esqueleto em formato inválido)"""
+    try:
+        SectionMemo.objects.filter(digest=prompt_digest(prompt, model_name)).delete()
+    except Exception as cache_error:
+        logger.warning(f"Falha ao descartar seção memorizada: {str(cache_error)}")
+
+
+def purge_expired_sections():
+    """Remove as entradas expiradas"""
+    return SectionMemo.objects.filter(created_at__lt=_expired_before()).delete()[0]
@@ -0,0 +1,164 @@
+"""
+Coalescência de requisições idênticas (single-flight).
+
+Quando vários usuários pedem o mesmo guia ao mesmo tempo, só a primeira
+requisição gera; as demais esperam a geração terminar e consultam o cache de
+guias de novo. A espera usa duas travas por chave de cache:
+- uma threading.Lock, entre as threads do processo;
+- uma linha GenerationLock no banco, entre processos (ex: workers do
+  gunicorn), adquirida com INSERT ou com um UPDATE condicional sobre uma
+  trava expirada, como em claim_next_job.
+
+As views assíncronas usam asingle_flight, que espera só pela linha no banco
+(consultada com asyncio.sleep entre as tentativas), sem bloquear o event
+loop com a threading.Lock.
+
+Se o guia gerado ficou incompleto ele não vai para o cache, mas as seções
+prontas ficam memorizadas (main/section_cache.py): a requisição seguinte só
+chama a API para as que faltaram.
+
+Assim como nos caches, falhas no banco não interrompem a geração: são
+registradas no log e a requisição segue sem a trava entre processos. Após
+settings.SINGLE_FLIGHT_TIMEOUT segundos de espera a requisição também gera
+por conta própria.
+"""
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from .models import GenerationLock
+
+logger = logging.getLogger(__name__)
+
+
+class KeyedLocks:
+    """Uma threading.Lock por chave, descartada quando ninguém mais a usa"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.locks = {}
+
+    @contextmanager
+    def hold(self, key, timeout):
+        """Segura a trava da chave; retorna (adquiriu, esperou)"""
+        with self.lock:
+            entry = self.locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        key_lock = entry[0]
+        waited = not key_lock.acquire(blocking=False)
+        acquired = not waited or key_lock.acquire(timeout=timeout)
+        try:
+            yield acquired, waited
+        finally:
+            if acquired:
+                key_lock.release()
+            with self.lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self.locks[key]
+
+
+_local_locks = KeyedLocks()
+
+
+def acquire_lock(key, owner):
+    """Tenta adquirir a trava da chave no banco; retorna True se conseguiu"""
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=settings.SINGLE_FLIGHT_LOCK_TTL)
+    lock, created = GenerationLock.objects.get_or_create(
+        key=key, defaults={'owner': owner, 'expires_at': expires_at}
+    )
+    if created:
+        return True
+    if lock.expires_at >= now:
+        return False
+    # Trava abandonada: só um dos processos que a encontraram fica com ela
+    return bool(GenerationLock.objects.filter(pk=lock.pk, owner=lock.owner, expires_at=lock.expires_at).update(
+        owner=owner, expires_at=expires_at, created_at=now,
+    ))
+
+
+def release_lock(key, owner):
+    try:
+        GenerationLock.objects.filter(key=key, owner=owner).delete()
+    except Exception as db_error:
+        logger.warning(f"Falha ao liberar a trava de geração: {str(db_error)}")
+
+
+def wait_for_lock(key, owner, deadline):
+    """
+    Espera (consultando o banco) até adquirir a trava da chave; retorna
+    (adquiriu, esperou).
+    """
+    waited = False
+    while True:
+        try:
+            if acquire_lock(key, owner):
+                return True, waited
+        except Exception as db_error:
+            logger.warning(f"Falha ao adquirir a trava de geração: {str(db_error)}")
+            return False, waited
+        if time.monotonic() >= deadline:
+            return False, waited
+        waited = True
+        time.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+
+
+async def await_for_lock(key, owner, deadline):
+    """Versão assíncrona de wait_for_lock"""
+    waited = False
+    while True:
+        try:
+            if await sync_to_async(acquire_lock)(key, owner):
+                return True, waited
+        except Exception as db_error:
+            logger.warning(f"Falha ao adquirir a trava de geração: {str(db_error)}")
+            return False, waited
+        if time.monotonic() >= deadline:
+            return False, waited
+        waited = True
+        await asyncio.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+
+
+@contextmanager
+def single_flight(key):
+    """
+    Executa o bloco sozinho entre as requisições com a mesma chave, no
+    processo e entre processos. O valor produzido é True quando outra
+    requisição estava gerando a mesma chave: o chamador deve consultar o
+    cache de novo antes de gerar.
+    """
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_TIMEOUT
+    with _local_locks.hold(key, settings.SINGLE_FLIGHT_TIMEOUT) as (local_acquired, local_waited):
+        owner = uuid.uuid4().hex
+        remote_acquired, remote_waited = wait_for_lock(key, owner, deadline)
+        if not (local_acquired and remote_acquired):
+            logger.warning(f"Gerando sem a trava de geração para a chave {key[:12]}")
+        try:
+            yield local_waited or remote_waited
+        finally:
+            if remote_acquired:
+                release_lock(key, owner)
+
+
+@asynccontextmanager
+async def asingle_flight(key):
+    """Versão assíncrona de single_flight, com a trava apenas no banco"""
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_TIMEOUT
+    owner = uuid.uuid4().hex
+    acquired, waited = await await_for_lock(key, owner, deadline)
+    if not acquired:
+        logger.warning(f"Gerando sem a trava de geração para a chave {key[:12]}")
+    try:
+        yield waited
+    finally:
+        if acquired:
+            await sync_to_async(release_lock)(key, owner)
@@ -0,0 +1,198 @@
+"""
+Esqueleto estrutural do guia: schema da resposta estruturada do Gemini e
+conversão da resposta em partes tipadas.
+
+O esqueleto é pedido em JSON (response_mime_type/response_schema). Se o
+modelo ainda assim responder no formato de texto antigo, o parser por
+expressões regulares é usado como alternativa.
+"""
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+SKELETON_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'parts': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'number': {'type': 'integer'},
+                    'title': {'type': 'string'},
+                    'topics': {'type': 'array', 'items': {'type': 'string'}},
+                    'difficulty': {'type': 'integer'},
+                },
+                'required': ['number', 'title', 'topics', 'difficulty'],
+            },
+        },
+    },
+    'required': ['parts'],
+}
+
+SKELETON_GENERATION_CONFIG = {
+    'response_mime_type': 'application/json',
+    'response_schema': SKELETON_SCHEMA,
+}
+
+
+@dataclass
+class SkeletonPart:
+    """Entrada do esqueleto para uma parte do guia"""
+    title: str
+    topics: list = field(default_factory=list)
+    difficulty: int = 1
+
+
+def parse_skeleton_json(skeleton_content, num_partes):
+    """
+    Converte a resposta em JSON em {número da parte: SkeletonPart}.
+
+    Entradas inválidas ou fora do intervalo são ignoradas (e tratadas como
+    partes faltantes); retorna None se o texto não for JSON.
+    """
+    try:
+        data = json.loads(skeleton_content)
+    except ValueError:
+        return None
+    entries = data.get('parts') if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        return None
+
+    skeleton_parts = {}
+    for entry in entries:
+        parsed = parse_skeleton_entry(entry, num_partes)
+        if parsed is not None and parsed[0] not in skeleton_parts:
+            skeleton_parts[parsed[0]] = parsed[1]
+    return skeleton_parts
+
+
+def parse_skeleton_entry(entry, num_partes):
+    """Converte uma entrada da lista "parts" em (número, SkeletonPart), ou None se for inválida"""
+    if not isinstance(entry, dict):
+        return None
+    try:
+        part = int(entry['number'])
+        title = str(entry['title']).strip()
+        topics = [str(topic).strip() for topic in entry['topics'] if str(topic).strip()]
+        difficulty = min(5, max(1, int(entry['difficulty'])))
+    except (KeyError, TypeError, ValueError):
+        logger.warning(f"Entrada inválida no esqueleto: {entry}")
+        return None
+    if 1 <= part <= num_partes and title and topics:
+        return part, SkeletonPart(title=title, topics=topics, difficulty=difficulty)
+    return None
+
+
+class IncrementalSkeletonParser:
+    """
+    Lê o esqueleto em JSON à medida que ele chega em streaming e devolve
+    cada entrada da lista "parts" assim que o objeto dela se fecha, sem
+    esperar o restante da resposta.
+
+    Respostas fora do formato JSON não produzem entradas; nesse caso vale o
+    parse da resposta completa (parse_skeleton_response).
+    """
+    PARTS_KEY_PATTERN = re.compile(r'"parts"\s*:\s*\[')
+
+    def __init__(self, num_partes):
+        self.num_partes = num_partes
+        self.buffer = ""
+        self.position = None  # início da próxima entrada, depois de encontrar a lista
+        self.seen = set()
+        self.decoder = json.JSONDecoder()
+
+    def feed(self, text):
+        """Acrescenta um trecho da resposta; retorna [(número, SkeletonPart)] das entradas completadas"""
+        self.buffer += text
+        if self.position is None and not self._find_list():
+            return []
+
+        completed = []
+        while True:
+            # Pular separadores entre as entradas
+            while self.position < len(self.buffer) and self.buffer[self.position] in ' \t\r\n,':
+                self.position += 1
+            if self.position >= len(self.buffer) or self.buffer[self.position] != '{':
+                return completed
+            try:
+                entry, end = self.decoder.raw_decode(self.buffer, self.position)
+            except ValueError:
+                # Objeto ainda incompleto: esperar o próximo trecho
+                return completed
+            self.position = end
+            parsed = parse_skeleton_entry(entry, self.num_partes)
+            if parsed is not None and parsed[0] not in self.seen:
+                self.seen.add(parsed[0])
+                completed.append(parsed)
+
+    def _find_list(self):
+        stripped = self.buffer.lstrip()
+        if stripped.startswith('['):
+            # Lista de entradas no nível superior (aceita também por parse_skeleton_json)
+            self.position = len(self.buffer) - len(stripped) + 1
+            return True
+        match = self.PARTS_KEY_PATTERN.search(self.buffer)
+        if match is None:
+            return False
+        self.position = match.end()
+        return True
+
+
+# Formatos em texto aceitos para cada parte ({part} é o número da parte)
+TEXT_SKELETON_PATTERNS = (
+    # Formato original com asteriscos
+    r"\*\*Parte {part}:\*\*\n- Título: (.*?)\n- Tópicos principais:\n(.*?)\n- Nível de dificuldade: (\d+)",
+    # Formato sem asteriscos (como visto no log)
+    r"Parte {part}:\n- Título: (.*?)\n- Tópicos principais:\n(.*?)\n- Nível de dificuldade: (\d+)",
+    # Possível formato alternativo
+    r"Parte {part}:\s*\n\s*- Título: (.*?)\n\s*- Tópicos principais:\n(.*?)\n\s*- Nível de dificuldade: (\d+)",
+)
+
+
+@lru_cache(maxsize=None)
+def text_skeleton_patterns(part):
+    """Padrões do formato de texto de uma parte, compilados uma vez por processo"""
+    return tuple(re.compile(pattern.format(part=part), re.DOTALL) for pattern in TEXT_SKELETON_PATTERNS)
+
+
+def parse_skeleton(skeleton_content, num_partes):
+    """Parseia o esqueleto em texto para extrair títulos, tópicos e dificuldade de cada parte"""
+    skeleton_parts = {}
+    for part in range(1, num_partes + 1):
+        # Todos os formatos contêm "Parte N:"; sem ele nenhum padrão casa
+        if f"Parte {part}:" not in skeleton_content:
+            continue
+
+        # Tentar vários formatos possíveis para capturar a resposta da API
+        match = None
+        for pattern in text_skeleton_patterns(part):
+            match = pattern.search(skeleton_content)
+            if match:
+                break
+
+        if match:
+            title = match.group(1).strip()
+            # Limpar os tópicos de indentação e marcadores
+            topics_text = match.group(2)
+            topics = [line.strip().lstrip('- ') for line in topics_text.strip().split("\n")]
+            difficulty = int(match.group(3).strip())
+            skeleton_parts[part] = SkeletonPart(title=title, topics=topics, difficulty=difficulty)
+    return skeleton_parts
+
+
+def parse_skeleton_response(skeleton_content, num_partes):
+    """Lê o esqueleto em JSON, recorrendo ao formato de texto se necessário"""
+    skeleton_parts = parse_skeleton_json(skeleton_content, num_partes)
+    if skeleton_parts is None:
+        logger.warning("Esqueleto não veio em JSON; usando o parser de texto")
+        skeleton_parts = parse_skeleton(skeleton_content, num_partes)
+    return skeleton_parts
+
+
+def missing_skeleton_parts(skeleton_parts, num_partes):
+    return [part for part in range(1, num_partes + 1) if part not in skeleton_parts]
@@ -1,3 +1,1493 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import io
+import json
+import re
+import tempfile
+import threading
+import time
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from google.api_core import exceptions as google_exceptions
+
+from .benchmarks import (
+    legacy_parse_skeleton,
+    legacy_process_mini_challenges,
+    legacy_render_markdown,
+    legacy_synthesize_phase_titles,
+    synthetic_content_samples,
+    synthetic_guide,
+    synthetic_guide_sections,
+    synthetic_sections,
+    synthetic_skeleton_text,
+)
+from .compression import CODEC_RAW, CODEC_ZLIB, compress, decompress, load_dictionary, train_dictionary
+from .context_cache import GeminiCachedContext, InlineContext, join_prefix, open_shared_context
+from .generation import (
+    SKELETON_REPAIR_ATTEMPTS,
+    aplan_guide,
+    assemble_guide,
+    build_context_prefix,
+    build_guide,
+    build_section_tasks,
+    call_model,
+    choose_strategy,
+    describe_missing_sections,
+    merge_skeleton_repair,
+    plan_guide,
+    split_guide_sections,
+)
+from .guide_cache import evict_guides, get_cached_guide, make_cache_key, purge_orphan_blobs, store_guide
+from .jobs import claim_next_job, enqueue_job, requeue_stale_jobs, run_job
+from .llm import LLMResponse, RateLimitedLLMError, get_backend
+from .llm.gemini import GeminiBackend
+from .llm.openai_compat import generation_parameters
+from .llm.stub import StubBackend, StubRateLimitError
+from .loadtest import StoreFailureCounter, compare_results, percentile, timed_request
+from .maintenance import MAINTENANCE_MESSAGE, invalidate_maintenance_cache, set_maintenance_mode
+from .mini_challenges import process_mini_challenges
+from .models import ContentBlob, GenerationJob, GenerationLock, Guide, GuideCacheStats, GuideSection, SectionMemo
+from .rendering import PARTS_HEADING, render_fragment, render_markdown, render_sections
+from .resilience import CircuitBreaker, CircuitOpenError, backoff_delay, call_with_retries
+from .prompts.chunking_prompt import generate_prompt
+from .prompts.guide_prompts import build_conclusion_prompt, build_skeleton_prompt
+from .ratelimit import AdaptiveRateLimiter, is_rate_limit_error, rate_limited_call
+from .section_cache import forget_section
+from .singleflight import KeyedLocks, acquire_lock, release_lock
+from .skeleton import (
+    SKELETON_GENERATION_CONFIG,
+    IncrementalSkeletonParser,
+    SkeletonPart,
+    missing_skeleton_parts,
+    parse_skeleton,
+    parse_skeleton_json,
+    parse_skeleton_response,
+)
+from .titles import calculate_phase_distribution, extract_emoji, get_phase_for_part, synthesize_phase_titles
+
+
+class ProcessMiniChallengesTests(SimpleTestCase):
+    """A versão de passagem única deve produzir exatamente a saída da anterior"""
+
+    def assertSameOutput(self, text):
+        self.assertEqual(process_mini_challenges(text), legacy_process_mini_challenges(text))
+
+    def test_synthetic_guides(self):
+        self.assertSameOutput(synthetic_guide(22, 5))
+        self.assertSameOutput(synthetic_sections(22, 5))
+
+    def test_conquest_structure(self):
+        text = (
+            "1️⃣ **Fase 1: Base (Parte 1)**\r\n"
+            "- **Conquista:** Ler arquivos\n"
+            "texto solto\n"
+            "    - *Mini-desafio:* Ler um CSV\n"
+            "- Mini-desafio: ↳ ↳ Outro\n"
+            "- *Conquista:* Escrever arquivos\n"
+            "\n\n\n"
+            "- **Conquista:** Sem desafio\n"
+        )
+        self.assertSameOutput(text)
+        output = process_mini_challenges(text)
+        self.assertIn("<span class='conquest-marker'>**Conquista:**</span>", output)
+        self.assertEqual(output.count("<ul class='mini-challenges-list'>"), 1)
+        self.assertNotIn("\n\n\n", output)
+
+    def test_orphan_mini_challenges(self):
+        self.assertSameOutput("- *Mini-desafio:* antes de tudo\n- **Conquista:** depois")
+        self.assertSameOutput(
+            "<span class='conquest-marker'>x</span>\n- Mini-desafio: a\n- Mini-desafio: b\n<!-- processed: 1 -->"
+        )
+
+
+class RenderMarkdownTests(SimpleTestCase):
+    """A instância reaproveitada deve renderizar como o pipeline montado a cada chamada"""
+
+    def test_matches_fresh_pipeline(self):
+        text = synthetic_guide(3, 3)
+        self.assertEqual(str(render_markdown(text)), legacy_render_markdown(text))
+
+    def test_state_does_not_leak_between_calls(self):
+        render_markdown("Texto[^1]\n\n[^1]: nota de rodapé")
+        self.assertNotIn("nota de rodapé", render_markdown("Outro texto"))
+
+
+class RenderSectionsTests(SimpleTestCase):
+    """O HTML do guia é montado a partir dos fragmentos de cada seção"""
+
+    def test_stitches_sections_in_order(self):
+        sections = {
+            'intro': "# Introdução",
+            'parts': ["# Parte 1: Começar", "# Parte 2: Avançar"],
+            'conclusion': "# CONSIDERAÇÕES FINAIS",
+        }
+        html = str(render_sections(sections))
+        positions = [html.index(title) for title in ("Introdução", "PARTES", "Parte 1", "Parte 2", "CONSIDERAÇÕES")]
+        self.assertEqual(positions, sorted(positions))
+
+    def test_fragment_is_cached_by_content(self):
+        text = "# Parte 9: Fragmento em cache"
+        first = render_fragment(text)
+        with mock.patch('main.rendering.render_markdown') as render:
+            self.assertEqual(render_fragment(text), first)
+            render.assert_not_called()
+
+
+class SkeletonParsingTests(SimpleTestCase):
+    """Esqueleto em JSON, com o formato de texto como alternativa"""
+
+    def test_json_skeleton(self):
+        content = (
+            '{"parts": ['
+            '{"number": 1, "title": "Instalar o Go 🚀", "topics": ["go mod", " "], "difficulty": 1},'
+            '{"number": 3, "title": "Dominar goroutines ⚡", "topics": ["canais"], "difficulty": 9},'
+            '{"number": 7, "title": "Fora do intervalo", "topics": ["x"], "difficulty": 2},'
+            '{"number": "dois", "title": "Inválida", "topics": ["x"], "difficulty": 2}'
+            ']}'
+        )
+        parts = parse_skeleton_response(content, 3)
+        self.assertEqual(parts[1], SkeletonPart(title="Instalar o Go 🚀", topics=["go mod"], difficulty=1))
+        self.assertEqual(parts[3].difficulty, 5)
+        self.assertEqual(missing_skeleton_parts(parts, 3), [2])
+
+    def test_text_fallback(self):
+        content = (
+            "Parte 1:\n- Título: Instalar o Go 🚀\n- Tópicos principais:\n  - go mod\n  - gofmt\n"
+            "- Nível de dificuldade: 1"
+        )
+        parts = parse_skeleton_response(content, 2)
+        self.assertEqual(parts[1].topics, ["go mod", "gofmt"])
+        self.assertEqual(missing_skeleton_parts(parts, 2), [2])
+
+    def test_incremental_parser(self):
+        content = (
+            '{"parts": ['
+            '{"number": 1, "title": "Instalar o Go {1.22} 🚀", "topics": ["go mod"], "difficulty": 1}, '
+            '{"number": 2, "title": "Dominar goroutines ⚡", "topics": ["canais"], "difficulty": 2}'
+            ']}'
+        )
+        parser = IncrementalSkeletonParser(2)
+        completed = {}
+        for position, char in enumerate(content):
+            for part_num, part in parser.feed(char):
+                completed[part_num] = (position, part)
+        # A parte 1 sai assim que o seu objeto se fecha, antes do restante da resposta
+        self.assertEqual(completed[1][0], content.index('}, '))
+        self.assertEqual({part_num: part for part_num, (_, part) in completed.items()}, parse_skeleton_json(content, 2))
+
+
+class TitleSynthesisTests(SimpleTestCase):
+    """Fases e títulos das fases com as expressões pré-compiladas, com a saída da versão anterior"""
+
+    def test_phase_distribution(self):
+        self.assertEqual(calculate_phase_distribution(2), [(1, 1), (2, 1), (2, 2)])
+        self.assertEqual(calculate_phase_distribution(6), [(1, 2), (3, 4), (5, 6)])
+        self.assertEqual(calculate_phase_distribution(22), [(1, 7), (8, 15), (16, 22)])
+        self.assertEqual([get_phase_for_part(part, calculate_phase_distribution(6)) for part in (1, 4, 6, 9)], [1, 2, 3, 1])
+
+    def test_extract_emoji(self):
+        self.assertEqual(extract_emoji("Dominar goroutines ⚡🚀"), "🚀")
+        self.assertEqual(extract_emoji("Sem emoji"), "📚")
+
+    def test_phase_titles(self):
+        parts = {
+            1: SkeletonPart(title="Instalar o Go: ambiente 🚀", topics=[], difficulty=1),
+            2: SkeletonPart(title="Sintaxe básica", topics=[], difficulty=1),
+            3: SkeletonPart(title="Goroutines: concorrência 🧵", topics=[], difficulty=3),
+        }
+        self.assertEqual(
+            synthesize_phase_titles(parts, [(1, 2), (3, 3)]),
+            ["Instalar o Go e Sintaxe básica – ambiente 🚀📚", "Goroutines: concorrência 🧵"],
+        )
+        self.assertEqual(synthesize_phase_titles(parts, [(1, 3)]), [
+            "Instalar o Go –  ambiente + Sintaxe básica + Goroutines –  concorrência 🚀📚"
+        ])
+
+    def test_matches_legacy(self):
+        for num_partes in range(2, 23):
+            text = synthetic_skeleton_text(num_partes)
+            parts = parse_skeleton(text, num_partes)
+            self.assertEqual(parts, legacy_parse_skeleton(text, num_partes))
+            distribution = calculate_phase_distribution(num_partes)
+            self.assertEqual(
+                synthesize_phase_titles(parts, distribution),
+                legacy_synthesize_phase_titles(parts, distribution),
+            )
+
+
+class SharedContextTests(SimpleTestCase):
+    """Prefixo compartilhado das partes: cache remoto ou prompt completo"""
+
+    def test_small_prefix_is_sent_inline(self):
+        context = open_shared_context(mock.Mock(), "contexto curto")
+        self.assertIsInstance(context, InlineContext)
+        llm = mock.Mock()
+        self.assertEqual(context.resolve(llm, "prompt"), (llm, "prompt"))
+
+    def test_cached_context_sends_only_the_suffix(self):
+        cached_llm = mock.Mock()
+        with mock.patch('main.context_cache.GeminiBackend.from_cached_content', return_value=cached_llm):
+            context = GeminiCachedContext("contexto", mock.Mock())
+        llm = mock.Mock()
+        self.assertEqual(context.resolve(llm, join_prefix("contexto", "parte 1")), (cached_llm, "parte 1"))
+        self.assertEqual(context.resolve(llm, "introdução"), (llm, "introdução"))
+        context.close()
+        context.cached_content.delete.assert_called_once()
+
+
+    def plan(self, num_partes, topics_per_part=1):
+        """Plano de um guia, com tópicos do tamanho dos gerados pelo modelo"""
+        skeleton_parts = {
+            part_num: SkeletonPart(
+                title=f"Orquestrar workloads com Kubernetes, etapa {part_num} 🚀",
+                topics=[f"recursos declarativos do cluster, tópico {topic}" for topic in range(topics_per_part)],
+                difficulty=min(5, 1 + part_num // 5),
+            )
+            for part_num in range(1, num_partes + 1)
+        }
+        distribution = calculate_phase_distribution(num_partes)
+        return {
+            'skeleton_parts': skeleton_parts,
+            'phase_distribution': distribution,
+            'phase_titles': synthesize_phase_titles(skeleton_parts, distribution),
+        }
+
+    def test_parts_use_lean_context_without_cache(self):
+        plan = self.plan(22, topics_per_part=3)
+        llm = mock.Mock(supports_context_cache=True)
+        context = open_shared_context(llm, build_context_prefix('Kubernetes', 22, plan))
+        self.assertFalse(context.cached)
+        prompts = dict((key, prompt) for key, prompt, _ in build_section_tasks('Kubernetes', 22, plan, context))
+        # O contexto completo seria cobrado em cada parte: elas levam só o próprio trecho
+        self.assertNotIn("Esqueleto completo", prompts['part-22'])
+        self.assertLess(len(prompts['part-22']), 2000)
+
+    @override_settings(GEMINI_CONTEXT_CACHE_MIN_TOKENS=1024)
+    def test_realistic_guide_uses_cached_context(self):
+        plan = self.plan(22, topics_per_part=3)
+        prefix = build_context_prefix('Kubernetes', 22, plan)
+        llm = mock.Mock(supports_context_cache=True)
+        with mock.patch('main.context_cache.caching.CachedContent.create') as create, \
+                mock.patch('main.context_cache.GeminiBackend.from_cached_content') as from_cached_content:
+            context = open_shared_context(llm, prefix)
+        create.assert_called_once()
+        self.assertTrue(context.cached)
+        prompts = dict((key, prompt) for key, prompt, _ in build_section_tasks('Kubernetes', 22, plan, context))
+        cached_llm, suffix = context.resolve(llm, prompts['part-22'])
+        self.assertIs(cached_llm, from_cached_content.return_value)
+        self.assertTrue(suffix.startswith("Crie APENAS a parte 22"))
+
+
+class StubBackendTests(SimpleTestCase):
+    """Provedor local usado nos testes de carga"""
+
+    def test_skeleton_is_deterministic_and_complete(self):
+        llm = StubBackend(latency=0, tokens_per_second=10 ** 9)
+        prompt = build_skeleton_prompt("Rust", 4)
+        first = llm.generate(prompt, SKELETON_GENERATION_CONFIG)
+        self.assertEqual(first, llm.generate(prompt, SKELETON_GENERATION_CONFIG))
+        self.assertEqual(missing_skeleton_parts(parse_skeleton_response(first.text, 4), 4), [])
+        self.assertGreater(first.total_tokens, 0)
+
+    def test_simulated_rate_limit(self):
+        llm = StubBackend(latency=0, tokens_per_second=10 ** 9, rate_limit_every=2)
+        llm.generate("prompt")
+        with self.assertRaises(StubRateLimitError) as raised:
+            llm.generate("prompt")
+        self.assertTrue(is_rate_limit_error(raised.exception))
+
+    def test_stream_matches_generate(self):
+        llm = StubBackend(latency=0, tokens_per_second=10 ** 9)
+        self.assertEqual("".join(llm.stream("prompt")), llm.generate("prompt").text)
+
+
+class FakeClock:
+    """Relógio controlado pelo teste; sleep apenas avança o tempo"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class RateLimiterTests(SimpleTestCase):
+    """Baldes de requisições e tokens, redução da taxa em 429 e recuperação"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_rate_limit_errors(self):
+        status_error = Exception("Too Many Requests")
+        status_error.status_code = 429
+        for error in (
+            google_exceptions.ResourceExhausted("Quota exceeded"),
+            google_exceptions.TooManyRequests("slow down"),
+            RateLimitedLLMError("Rate limit reached for requests"),
+            status_error,
+            Exception("429 Too Many Requests"),
+            Exception("RESOURCE_EXHAUSTED: quota exceeded"),
+        ):
+            with self.subTest(error=error):
+                self.assertTrue(is_rate_limit_error(error))
+        for error in (
+            google_exceptions.InvalidArgument("prompt com 4290 tokens"),
+            Exception("Falha ao ler 1429 bytes"),
+            Exception("request id a429f; conexão recusada"),
+            ValueError("quota de disco do servidor"),
+        ):
+            with self.subTest(error=error):
+                self.assertFalse(is_rate_limit_error(error))
+
+    def test_requests_refill_over_time(self):
+        limiter = AdaptiveRateLimiter(rpm=60, tpm=10 ** 6, clock=self.clock)
+        self.assertEqual([limiter.reserve(0) for _ in range(60)], [0.0] * 60)
+        self.assertEqual(limiter.reserve(0), 1.0)
+        self.clock.now += 2
+        self.assertEqual(limiter.reserve(0), 0.0)
+        # O balde nunca passa da capacidade
+        self.clock.now += 3600
+        self.assertEqual(limiter.headroom(), 60)
+
+    def test_tokens_bucket(self):
+        limiter = AdaptiveRateLimiter(rpm=1000, tpm=600, clock=self.clock)
+        self.assertEqual(limiter.reserve(600), 0.0)
+        self.assertEqual(limiter.reserve(100), 10.0)
+        # Uso real acima da estimativa consome a diferença
+        limiter.record_success(100, actual_tokens=160)
+        self.clock.now += 10
+        self.assertEqual(limiter.reserve(0), 6.0)
+
+    def test_backoff_and_recovery(self):
+        limiter = AdaptiveRateLimiter(rpm=60, tpm=10 ** 6, clock=self.clock)
+        limiter.record_rate_limited()
+        self.assertEqual(limiter.rate_factor, 0.5)
+        # Sem retry_delay da API: o intervalo de uma requisição na nova taxa
+        self.assertEqual(limiter.headroom(), 0)
+        self.assertEqual(limiter.reserve(0), 2.0)
+        limiter.record_rate_limited(retry_after=30)
+        self.assertEqual(limiter.reserve(0), 30.0)
+        for _ in range(10):
+            limiter.record_rate_limited()
+        self.assertEqual(limiter.rate_factor, 0.1)
+
+        for _ in range(18):
+            limiter.record_success(0)
+        self.assertAlmostEqual(limiter.rate_factor, 1.0)
+        limiter.record_success(0)
+        self.assertEqual(limiter.rate_factor, 1.0)
+
+    def test_reduced_rate_refills_slower(self):
+        limiter = AdaptiveRateLimiter(rpm=60, tpm=10 ** 6, clock=self.clock)
+        for _ in range(60):
+            limiter.reserve(0)
+        limiter.record_rate_limited(retry_after=0)
+        self.clock.now += 10
+        self.assertEqual(limiter.headroom(), 5)
+
+    @override_settings(GEMINI_RATE_LIMIT_RETRIES=2, GEMINI_ESTIMATED_OUTPUT_TOKENS=0)
+    def test_rate_limited_call(self):
+        limiter = AdaptiveRateLimiter(rpm=60, tpm=10 ** 6, clock=self.clock)
+        quota_error = google_exceptions.ResourceExhausted("Quota exceeded. retry_delay { seconds: 7 }")
+        call = mock.Mock(side_effect=[quota_error, quota_error, "resposta"])
+        with mock.patch('main.ratelimit.get_rate_limiter', return_value=limiter), \
+                mock.patch('main.ratelimit.time.sleep', side_effect=self.clock.sleep):
+            self.assertEqual(rate_limited_call(call, "prompt"), "resposta")
+        self.assertEqual(call.call_count, 3)
+        # A pausa pedida pela API é respeitada antes de cada nova tentativa
+        self.assertEqual(self.clock.sleeps, [7.0, 7.0])
+        self.assertAlmostEqual(limiter.rate_factor, 0.25 + 0.05)
+
+        call = mock.Mock(side_effect=quota_error)
+        with mock.patch('main.ratelimit.get_rate_limiter', return_value=limiter), \
+                mock.patch('main.ratelimit.time.sleep', side_effect=self.clock.sleep):
+            with self.assertRaises(google_exceptions.ResourceExhausted):
+                rate_limited_call(call, "prompt")
+        self.assertEqual(call.call_count, 3)
+
+
+@override_settings(
+    GEMINI_MAX_RETRIES=2,
+    GEMINI_RETRY_BASE_DELAY=1.0,
+    GEMINI_RETRY_MAX_DELAY=20.0,
+    GEMINI_RATE_LIMIT_RETRIES=0,
+)
+class ResilienceTests(SimpleTestCase):
+    """Retentativas com backoff, circuit breaker e falhas no meio do streaming"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=self.clock)
+        for target, value in (
+            ('main.resilience.get_circuit_breaker', self.breaker),
+            ('main.generation.get_circuit_breaker', self.breaker),
+            ('main.ratelimit.get_rate_limiter', AdaptiveRateLimiter(10 ** 6, 10 ** 9)),
+        ):
+            patcher = mock.patch(target, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch('main.resilience.time.sleep', side_effect=self.clock.sleep)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_transient_errors_are_retried(self):
+        unavailable = google_exceptions.ServiceUnavailable("indisponível")
+        call = mock.Mock(side_effect=[unavailable, unavailable, "resposta"])
+        self.assertEqual(call_with_retries(call), "resposta")
+        self.assertEqual((call.call_count, len(self.clock.sleeps)), (3, 2))
+        self.assertEqual(self.breaker.failures, 0)
+
+        call = mock.Mock(side_effect=unavailable)
+        with self.assertRaises(google_exceptions.ServiceUnavailable):
+            call_with_retries(call)
+        self.assertEqual(call.call_count, 3)
+
+    @override_settings(GEMINI_RATE_LIMIT_RETRIES=3)
+    def test_rate_limit_is_retried_only_by_the_limiter(self):
+        llm = mock.Mock(**{'generate.side_effect': google_exceptions.ResourceExhausted("Quota exceeded")})
+        with mock.patch('main.ratelimit.time.sleep'):
+            with self.assertRaises(google_exceptions.ResourceExhausted):
+                call_model(llm, "prompt")
+        # Só as retentativas do limitador de taxa, sem backoff nem falhas no circuit breaker
+        self.assertEqual(llm.generate.call_count, 3 + 1)
+        self.assertEqual((self.clock.sleeps, self.breaker.failures), ([], 0))
+
+    def test_permanent_errors_are_not_retried(self):
+        call = mock.Mock(side_effect=google_exceptions.InvalidArgument("bloqueado por safety"))
+        with self.assertRaises(google_exceptions.InvalidArgument):
+            call_with_retries(call)
+        self.assertEqual((call.call_count, self.clock.sleeps, self.breaker.failures), (1, [], 0))
+
+    def test_backoff_jitter_bounds(self):
+        with mock.patch('main.resilience.random.uniform', side_effect=lambda low, high: high):
+            self.assertEqual([backoff_delay(attempt) for attempt in range(7)], [1, 2, 4, 8, 16, 20, 20])
+        for attempt in range(7):
+            for _ in range(50):
+                self.assertTrue(0 <= backoff_delay(attempt) <= min(20, 2 ** attempt))
+
+    def test_circuit_breaker_opens_and_half_opens(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.assertTrue(self.breaker.is_open)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+        # Após o intervalo, uma única chamada de teste; se falhar, o circuito reabre
+        self.clock.now += 30
+        self.breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        self.breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+        self.clock.now += 30
+        self.breaker.before_call()
+        self.breaker.record_success()
+        self.assertFalse(self.breaker.is_open)
+        self.breaker.before_call()
+
+    def test_stream_is_retried_until_the_first_chunk(self):
+        attempts = []
+
+        def stream(prompt, generation_config=None, timeout=None):
+            attempts.append(prompt)
+            if len(attempts) == 1:
+                # Falha na primeira iteração, como a espera pelo primeiro token do stub
+                raise google_exceptions.DeadlineExceeded("timeout")
+            yield "primeiro "
+            yield "segundo"
+
+        llm = mock.Mock(stream=stream)
+        self.assertEqual("".join(call_model(llm, "prompt", stream=True)), "primeiro segundo")
+        self.assertEqual(len(attempts), 2)
+
+    def test_failure_in_the_middle_of_a_stream(self):
+        def stream(prompt, generation_config=None, timeout=None):
+            yield "primeiro"
+            raise google_exceptions.ServiceUnavailable("conexão perdida")
+
+        chunks = call_model(mock.Mock(stream=stream), "prompt", stream=True)
+        self.assertEqual(next(chunks), "primeiro")
+        with self.assertRaises(google_exceptions.ServiceUnavailable):
+            next(chunks)
+        self.assertEqual(self.breaker.failures, 1)
+
+
+@override_settings(
+    GENERATION_STRATEGY='auto',
+    GENERATION_ONESHOT_MAX_PARTS=3,
+    GENERATION_ONESHOT_PRESSURE_MAX_PARTS=8,
+)
+class GenerationStrategyTests(TransactionTestCase):
+    """Escolha entre chamada única e fanout, e o retorno ao fanout quando a resposta única não serve"""
+
+    def choose(self, num_partes, requested=None, headroom=100):
+        limiter = mock.Mock(**{'headroom.return_value': headroom})
+        with mock.patch('main.generation.get_rate_limiter', return_value=limiter):
+            return choose_strategy(num_partes, requested)
+
+    def test_choose_strategy(self):
+        cases = [
+            # (partes, estratégia pedida, cota disponível, esperada)
+            (2, None, 100, 'oneshot'),
+            (3, None, 100, 'oneshot'),
+            (3, None, 0, 'oneshot'),
+            (4, None, 100, 'fanout'),
+            (4, None, 6, 'oneshot'),
+            (4, None, 7, 'fanout'),
+            (8, None, 0, 'oneshot'),
+            (9, None, 0, 'fanout'),
+            (22, None, 100, 'fanout'),
+            (2, 'fanout', 100, 'fanout'),
+            (22, 'oneshot', 100, 'oneshot'),
+            (5, 'pipeline', 0, 'pipeline'),
+            (2, 'desconhecida', 100, 'oneshot'),
+        ]
+        for num_partes, requested, headroom, expected in cases:
+            with self.subTest(num_partes=num_partes, requested=requested, headroom=headroom):
+                self.assertEqual(self.choose(num_partes, requested, headroom), expected)
+
+    def test_configured_strategy(self):
+        with self.settings(GENERATION_STRATEGY='fanout'):
+            self.assertEqual(self.choose(2), 'fanout')
+            self.assertEqual(self.choose(2, 'oneshot'), 'oneshot')
+
+    def test_split_guide_sections(self):
+        content = StubBackend(latency=0).generate(generate_prompt('Rust', 3)).text
+        sections = split_guide_sections(content, 3)
+        self.assertNotIn('# Parte', sections['intro'])
+        self.assertNotIn('# PARTES', sections['intro'])
+        self.assertEqual(len(sections['parts']), 3)
+        for part_num, part in enumerate(sections['parts'], 1):
+            self.assertTrue(part.startswith(f'# Parte {part_num}:'))
+        self.assertRegex(sections['conclusion'], r'^# (Conclusão|CONCLUSÃO|CONSIDERAÇÕES FINAIS)')
+
+    def test_split_malformed_guide(self):
+        content = StubBackend(latency=0).generate(generate_prompt('Rust', 3)).text
+        conclusion = re.search(r'^# (Conclusão|CONCLUSÃO|CONSIDERAÇÕES FINAIS)', content, re.MULTILINE)
+        malformed = {
+            'sem conclusão': content[:conclusion.start()],
+            'parte faltando': content.replace('# Parte 2:', '## Parte 2:'),
+            'partes a mais': content,
+            'fora de ordem': content.replace('# Parte 1:', '# Parte 9:').replace('# Parte 3:', '# Parte 1:')
+                                    .replace('# Parte 9:', '# Parte 3:'),
+            'texto livre': "Desculpe, não consigo gerar esse guia.",
+        }
+        for name, text in malformed.items():
+            with self.subTest(name):
+                self.assertIsNone(split_guide_sections(text, 2 if name == 'partes a mais' else 3))
+
+    def test_malformed_oneshot_falls_back_to_fanout(self):
+        llm = StubBackend(latency=0, tokens_per_second=10 ** 9)
+        oneshot_prompt = generate_prompt('Rust', 3)
+        generate = llm.generate
+        prompts = []
+
+        def malformed_oneshot(prompt, generation_config=None, timeout=None):
+            prompts.append(prompt)
+            if prompt == oneshot_prompt:
+                return LLMResponse(text="# Rust\n\nUm guia sem partes nem conclusão.")
+            return generate(prompt, generation_config, timeout)
+
+        llm.generate = malformed_oneshot
+        with mock.patch('main.generation.forget_section', wraps=forget_section) as forget:
+            sections, missing = build_guide(llm, 'Rust', 3, strategy='oneshot')
+        # A resposta inválida não fica memorizada para a próxima requisição
+        forget.assert_called_once_with(oneshot_prompt, 'stub')
+        self.assertEqual(prompts[0], oneshot_prompt)
+        self.assertEqual(len(prompts), 1 + 3 + 3)
+        self.assertEqual(missing, [])
+        self.assertEqual([part.split(':')[0] for part in sections['parts']], ['# Parte 1', '# Parte 2', '# Parte 3'])
+        self.assertTrue(sections['conclusion'])
+
+
+@override_settings(
+    LLM_BACKEND='stub',
+    LLM_STUB_LATENCY=0,
+    LLM_STUB_TOKENS_PER_SECOND=10 ** 9,
+    LLM_STUB_RATE_LIMIT_EVERY=0,
+    # Uma seção por vez: o SQLite em memória dos testes não espera por escritas simultâneas
+    GEMINI_MAX_CONCURRENCY=1,
+)
+class PartialGuideTests(TransactionTestCase):
+    """Uma seção que falha não derruba o guia: ele sai com um aviso e fica fora do cache"""
+
+    def test_failed_section_is_rendered_as_missing(self):
+        generate = StubBackend.generate
+
+        def failing_part_2(llm, prompt, *args, **kwargs):
+            if 'Crie APENAS a parte 2 de' in prompt:
+                raise google_exceptions.InvalidArgument("Resposta bloqueada")
+            return generate(llm, prompt, *args, **kwargs)
+
+        with mock.patch.object(StubBackend, 'generate', failing_part_2):
+            response = self.client.post(reverse('home'), {'tema': 'Rust', 'num_partes': 4, 'strategy': 'fanout'})
+        self.assertIsNone(response.context['error'])
+        self.assertEqual(response.context['warning'], describe_missing_sections(['part-2']))
+        self.assertIn("# Parte 2:", response.context['result'])
+        self.assertIn("Esta seção não pôde ser gerada agora", str(response.context['html_result']))
+        self.assertIn("# Parte 3:", response.context['result'])
+        self.assertFalse(Guide.objects.exists())
+
+        # Reenviado, o guia só gera a parte que faltou
+        with mock.patch.object(StubBackend, 'generate', autospec=True, side_effect=generate) as retried:
+            response = self.client.post(reverse('home'), {'tema': 'Rust', 'num_partes': 4, 'strategy': 'fanout'})
+        self.assertIsNone(response.context['warning'])
+        self.assertEqual(retried.call_count, 1)
+
+
+class SkeletonRepairStub(StubBackend):
+    """Stub cujo esqueleto sempre vem sem as partes em dropped"""
+
+    def __init__(self, dropped, **kwargs):
+        super().__init__(latency=0, tokens_per_second=10 ** 9, **kwargs)
+        self.dropped = dropped
+        self.prompts = []
+
+    def _response(self, prompt, generation_config):
+        self.prompts.append(prompt)
+        response = super()._response(prompt, generation_config)
+        if prompt.startswith(build_skeleton_prompt('', 0)[:40]):
+            skeleton = json.loads(response.text)
+            skeleton['parts'] = [part for part in skeleton['parts'] if part['number'] not in self.dropped]
+            response.text = json.dumps(skeleton)
+        return response
+
+
+class SkeletonRepairTests(TransactionTestCase):
+    """Partes que faltam no esqueleto são pedidas de novo, do mesmo jeito no planejamento síncrono e no assíncrono"""
+
+    def assert_repaired(self, llm, plan):
+        self.assertEqual(sorted(plan['skeleton_parts']), [1, 2, 3, 4])
+        repair_prompts = [prompt for prompt in llm.prompts if 'SOMENTE as partes' in prompt]
+        self.assertEqual(len(repair_prompts), 1)
+        self.assertIn('SOMENTE as partes 2, 3', repair_prompts[0])
+        self.assertEqual(len(llm.prompts), 2)
+
+    def test_sync_plan_repairs_missing_parts(self):
+        llm = SkeletonRepairStub(dropped={2, 3})
+        self.assert_repaired(llm, plan_guide(llm, 'Rust', 4))
+
+    def test_async_plan_repairs_missing_parts(self):
+        llm = SkeletonRepairStub(dropped={2, 3})
+        self.assert_repaired(llm, async_to_sync(aplan_guide)(llm, 'Rust', 4))
+
+    def test_incomplete_repair_is_forgotten(self):
+        llm = SkeletonRepairStub(dropped={2})
+        merge = merge_skeleton_repair
+
+        def incomplete_repair(repair_content, skeleton_parts, missing_parts, num_partes):
+            return merge("{}", skeleton_parts, missing_parts, num_partes)
+
+        with mock.patch('main.generation.merge_skeleton_repair', incomplete_repair), \
+                mock.patch('main.generation.forget_section', wraps=forget_section) as forget:
+            with self.assertRaises(Exception):
+                plan_guide(llm, 'Rust', 4)
+        # As duas complementações e o esqueleto inválido não ficam memorizados
+        repair_prompts = [prompt for prompt in llm.prompts if 'SOMENTE as partes' in prompt]
+        self.assertEqual(len(repair_prompts), SKELETON_REPAIR_ATTEMPTS)
+        self.assertEqual(
+            [call.args[0] for call in forget.call_args_list],
+            [repair_prompts[0], repair_prompts[0], build_skeleton_prompt('Rust', 4)],
+        )
+
+
+@override_settings(
+    LLM_BACKEND='stub',
+    LLM_STUB_LATENCY=0,
+    LLM_STUB_TOKENS_PER_SECOND=10 ** 9,
+    LLM_STUB_RATE_LIMIT_EVERY=0,
+    # Uma seção por vez: o SQLite em memória dos testes não espera por escritas simultâneas
+    GEMINI_MAX_CONCURRENCY=1,
+)
+class SectionMemoTests(TransactionTestCase):
+    """Etapas já geradas para outro guia não voltam a chamar a API"""
+
+    def track_calls(self, llm):
+        prompts = []
+        generate, stream = llm.generate, llm.stream
+
+        def tracked_generate(prompt, *args, **kwargs):
+            prompts.append(prompt)
+            return generate(prompt, *args, **kwargs)
+
+        def tracked_stream(prompt, *args, **kwargs):
+            prompts.append(prompt)
+            return stream(prompt, *args, **kwargs)
+
+        llm.generate, llm.stream = tracked_generate, tracked_stream
+        return prompts
+
+    def test_other_strategy_reuses_sections(self):
+        llm = StubBackend(latency=0)
+        first, _ = build_guide(llm, 'Rust', 4, strategy='pipeline')
+        self.assertEqual(SectionMemo.objects.count(), 1 + 1 + 4 + 1)
+
+        # Mesmos prompts (esqueleto, introdução, partes e conclusão) por outro caminho
+        prompts = self.track_calls(llm)
+        second, missing = build_guide(llm, 'Rust', 4, strategy='fanout')
+        self.assertEqual(prompts, [])
+        self.assertEqual(missing, [])
+        self.assertEqual(second, first)
+
+        # Outro guia só compartilha o que tem o mesmo prompt
+        build_guide(llm, 'Rust', 5, strategy='fanout')
+        self.assertEqual(len(prompts), 1 + 1 + 5 + 1)
+        self.assertNotIn(build_conclusion_prompt('Rust', 4), prompts)
+
+    def test_expired_guide_is_rebuilt_from_memo(self):
+        data = {'tema': 'Rust', 'num_partes': 4, 'strategy': 'fanout'}
+        first = self.client.post(reverse('home'), data)
+        Guide.objects.update(created_at=timezone.now() - timedelta(seconds=settings.GUIDE_CACHE_TTL + 1))
+
+        with mock.patch.object(StubBackend, 'generate', autospec=True) as generate:
+            second = self.client.post(reverse('home'), data)
+        generate.assert_not_called()
+        self.assertEqual(second.context['result'], first.context['result'])
+        # O guia volta ao cache com o mesmo link
+        guide = Guide.objects.get()
+        self.assertIsNone(guide.retired_at)
+        self.assertEqual(second.context['permalink_url'], first.context['permalink_url'])
+
+
+@override_settings(LLM_BACKEND='stub', LLM_STUB_LATENCY=0)
+class BackendRegistryTests(SimpleTestCase):
+    """Provedores criados uma vez por processo"""
+
+    def test_backend_is_reused(self):
+        self.assertIs(get_backend(), get_backend())
+
+    def test_settings_change_recreates_backend(self):
+        llm = get_backend()
+        with override_settings(LLM_STUB_LATENCY=0.5):
+            self.assertIsNot(get_backend(), llm)
+            self.assertEqual(get_backend().latency, 0.5)
+        self.assertEqual(get_backend().latency, 0)
+
+    def test_openai_generation_parameters(self):
+        parameters = generation_parameters(
+            {'temperature': 0.3, 'max_output_tokens': 512},
+            {'temperature': 0.9, 'response_mime_type': 'application/json', 'response_schema': {}},
+        )
+        self.assertEqual(parameters, {
+            'temperature': 0.9,
+            'max_tokens': 512,
+            'response_format': {'type': 'json_object'},
+        })
+
+    def test_gemini_async_client_stays_in_its_loop(self):
+        response = mock.Mock(text="texto", usage_metadata=mock.Mock(
+            total_token_count=30, prompt_token_count=10, candidates_token_count=20,
+        ))
+        model = mock.Mock(model_name='gemini-teste', **{
+            'generate_content.return_value': response,
+            'generate_content_async': mock.AsyncMock(return_value=response),
+        })
+        llm = GeminiBackend(model=model)
+
+        async def generate_twice():
+            return [await llm.agenerate("prompt"), await llm.agenerate("prompt")]
+
+        with mock.patch('main.llm.gemini._async_client_loop', None):
+            self.assertEqual([r.text for r in asyncio.run(generate_twice())], ["texto", "texto"])
+            self.assertEqual(model.generate_content_async.await_count, 2)
+            # Em outro event loop (view assíncrona sob WSGI) a chamada síncrona roda em uma thread
+            self.assertEqual(asyncio.run(llm.agenerate("prompt")).total_tokens, 30)
+        self.assertEqual(model.generate_content_async.await_count, 2)
+        model.generate_content.assert_called_once()
+
+
+def parse_sse(content):
+    """Lista de (evento, dados) de uma resposta Server-Sent Events"""
+    events = []
+    for block in content.decode().split("\n\n"):
+        if block.strip():
+            fields = dict(line.split(": ", 1) for line in block.splitlines())
+            events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+@override_settings(
+    LLM_BACKEND='stub',
+    LLM_STUB_LATENCY=0,
+    LLM_STUB_TOKENS_PER_SECOND=10 ** 9,
+    LLM_STUB_OUTPUT_TOKENS=200,
+    LLM_STUB_RATE_LIMIT_EVERY=0,
+)
+class GuideViewTests(TransactionTestCase):
+    """Views de geração de ponta a ponta com o provedor stub"""
+
+    def test_sync_view_fanout(self):
+        response = self.client.post(reverse('home'), {'tema': 'Rust', 'num_partes': 4, 'strategy': 'fanout'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['error'])
+        self.assertIsNone(response.context['warning'])
+        self.assertIn('# Parte 4:', response.context['result'])
+        self.assertIn('# CONSIDERAÇÕES FINAIS', response.context['result'])
+
+    def test_sync_view_oneshot_is_cached(self):
+        data = {'tema': 'Go', 'num_partes': 2, 'strategy': 'oneshot'}
+        first = self.client.post(reverse('home'), data)
+        with mock.patch('main.llm.stub.StubBackend.generate') as generate:
+            second = self.client.post(reverse('home'), data)
+        generate.assert_not_called()
+        self.assertEqual(first.context['result'], second.context['result'])
+        self.assertEqual(first.context['permalink_url'], second.context['permalink_url'])
+        self.assertContains(self.client.get(first.context['permalink_url']), 'Link permanente')
+
+    async def test_async_view(self):
+        response = await self.async_client.post(reverse('home_async'), {'tema': 'Elixir', 'num_partes': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['error'])
+        self.assertIn('# Parte 3:', response.context['result'])
+
+    async def test_async_view_cache_hit(self):
+        data = {'tema': 'Elixir', 'num_partes': 3, 'strategy': 'fanout'}
+        first = await self.async_client.post(reverse('home_async'), data)
+        with mock.patch('main.llm.stub.StubBackend.agenerate') as agenerate:
+            second = await self.async_client.post(reverse('home_async'), data)
+        agenerate.assert_not_called()
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.context['result'], first.context['result'])
+        self.assertEqual(second.context['permalink_url'], first.context['permalink_url'])
+
+    @override_settings(LLM_STUB_LATENCY=0.5)
+    async def test_async_requests_overlap(self):
+        async def post(tema):
+            return await self.async_client.post(
+                reverse('home_async'), {'tema': tema, 'num_partes': 2, 'strategy': 'oneshot'}
+            )
+
+        started = time.monotonic()
+        responses = await asyncio.gather(*(post(tema) for tema in ('Lua', 'Nim', 'Ruby', 'Julia')))
+        elapsed = time.monotonic() - started
+        self.assertTrue(all(response.context['has_content'] for response in responses))
+        # Uma de cada vez seriam pelo menos 4 x 0,5s
+        self.assertLess(elapsed, 1.5)
+
+    @override_settings(LLM_STUB_LATENCY=0.3, SINGLE_FLIGHT_POLL_INTERVAL=0.01)
+    async def test_identical_async_requests_coalesce(self):
+        prompts = []
+        agenerate = StubBackend.agenerate
+
+        async def recording_agenerate(llm, prompt, *args, **kwargs):
+            prompts.append(prompt)
+            return await agenerate(llm, prompt, *args, **kwargs)
+
+        data = {'tema': 'OCaml', 'num_partes': 2, 'strategy': 'oneshot'}
+        with mock.patch.object(StubBackend, 'agenerate', recording_agenerate):
+            first, second = await asyncio.gather(
+                self.async_client.post(reverse('home_async'), data),
+                self.async_client.post(reverse('home_async'), data),
+            )
+        self.assertEqual(len(prompts), 1)
+        self.assertEqual(first.context['result'], second.context['result'])
+
+    async def test_stream_view_under_asgi(self):
+        response = await self.async_client.get(reverse('stream_guide'), {'tema': 'Dart', 'num_partes': 2})
+        # Iterador assíncrono: o Django envia cada evento sem ler a resposta inteira antes
+        self.assertTrue(response.is_async)
+        content = "".join([chunk.decode() async for chunk in response.streaming_content])
+        self.assertEqual(content.count('event: section'), 4)
+        self.assertIn('event: done', content)
+
+    def test_stream_view_events(self):
+        response = self.client.get(reverse('stream_guide'), {'tema': 'Kotlin', 'num_partes': 3})
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('event: outline', content)
+        self.assertEqual(content.count('event: section'), 5)
+        self.assertIn('event: done', content)
+        self.assertNotIn('event: error', content)
+
+    def test_stream_view_token_deltas(self):
+        params = {'tema': 'Kotlin', 'num_partes': 3, 'tokens': '1'}
+        events = parse_sse(b''.join(self.client.get(reverse('stream_guide'), params).streaming_content))
+        names = [name for name, _ in events]
+        self.assertEqual(names[0], 'outline')
+        self.assertEqual(names[-1], 'done')
+        self.assertNotIn('error', names)
+
+        finished = {}
+        deltas = {}
+        for index, (name, data) in enumerate(events):
+            if name == 'delta':
+                # Prévias de uma seção chegam antes do evento definitivo dela
+                self.assertNotIn(data['key'], finished)
+                deltas.setdefault(data['key'], []).append(data)
+            elif name == 'section':
+                finished[data['key']] = data
+        self.assertEqual(set(finished), {'intro', 'part-1', 'part-2', 'part-3', 'conclusion'})
+        # Seções curtas podem terminar sem nenhum bloco estável antes do fim
+        self.assertLessEqual({'part-1', 'part-2', 'part-3'}, set(deltas))
+        self.assertLessEqual(set(deltas), set(finished))
+        for key, previews in deltas.items():
+            self.assertEqual({preview['position'] for preview in previews}, {finished[key]['position']})
+        self.assertIn('Parte 2:', deltas['part-2'][0]['html'])
+        self.assertIn('Parte 2:', finished['part-2']['html'])
+
+        # O guia completo foi armazenado: a próxima requisição recebe um único evento 'guide'
+        permalink = events[-1][1]['permalink']
+        cached = parse_sse(b''.join(self.client.get(reverse('stream_guide'), params).streaming_content))
+        self.assertEqual([name for name, _ in cached], ['guide', 'done'])
+        self.assertEqual(cached[0][1]['permalink'], permalink)
+        self.assertEqual(
+            cached[0][1]['html'],
+            Guide.HTML_SEPARATOR.join([finished['intro']['html'], str(render_fragment(PARTS_HEADING))]
+                                      + [finished[f'part-{part}']['html'] for part in (1, 2, 3)]
+                                      + [finished['conclusion']['html']]),
+        )
+
+    def test_server_timing_and_metrics(self):
+        response = self.client.post(reverse('home'), {'tema': 'Scala', 'num_partes': 4, 'strategy': 'fanout'})
+        server_timing = response['Server-Timing']
+        # As partes rodam no pool de threads e herdam o trace da requisição
+        for stage in ('skeleton', 'skeleton-parse', 'intro', 'part-4', 'conclusion', 'render', 'total'):
+            self.assertIn(f'{stage};dur=', server_timing)
+
+        metrics = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('chunkify_stage_duration_seconds_count{stage="part"}', metrics)
+        self.assertIn('chunkify_stage_tokens_total{stage="skeleton",kind="response"}', metrics)
+
+    def test_pipeline_starts_parts_while_skeleton_streams(self):
+        llm = StubBackend(latency=0, tokens_per_second=500)
+        events = []
+        stream, generate = llm.stream, llm.generate
+
+        def recording_stream(prompt, generation_config=None, timeout=None):
+            yield from stream(prompt, generation_config, timeout)
+            events.append('skeleton')
+
+        def recording_generate(prompt, generation_config=None, timeout=None):
+            if 'Crie APENAS a parte 1 de' in prompt:
+                events.append('part-1')
+            return generate(prompt, generation_config, timeout)
+
+        llm.stream, llm.generate = recording_stream, recording_generate
+        sections, missing = build_guide(llm, 'Zig', 4, strategy='pipeline')
+        self.assertEqual(events, ['part-1', 'skeleton'])
+        self.assertEqual(missing, [])
+        self.assertTrue(sections['parts'][3].startswith('# Parte 4:'))
+        self.assertIn('Fase 3', sections['intro'])
+
+    def test_invalid_num_partes(self):
+        response = self.client.post(reverse('home'), {'tema': 'Rust', 'num_partes': 30})
+        self.assertEqual(response.context['error'], "O número máximo de partes permitido é 22.")
+
+
+class LoadTestReportTests(SimpleTestCase):
+    """Estatísticas do comando loadtest"""
+
+    def test_percentile_nearest_rank(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 0.50), 50)
+        self.assertEqual(percentile(samples, 0.99), 99)
+        self.assertEqual(percentile([7], 0.95), 7)
+
+    def test_compare_results(self):
+        baseline = [{'view': 'sync', 'parts': 2, 'p50_ms': 100.0, 'p95_ms': 200.0, 'p99_ms': 0.0,
+                     'peak_kib': 10.0, 'mini_challenges_cpu_ms': 1.0, 'render_cpu_ms': 2.0}]
+        results = [dict(baseline[0], p50_ms=110.0), dict(baseline[0], parts=4)]
+        deltas = compare_results(baseline, results)
+        self.assertEqual(len(deltas), 1)
+        self.assertAlmostEqual(deltas[0]['p50_ms_%'], 10.0)
+        self.assertEqual(deltas[0]['p99_ms_%'], 0.0)
+
+    def test_store_failures_count_as_errors(self):
+        counter = StoreFailureCounter()
+        # store_guide registra a exceção e devolve None; a resposta da view parece normal
+        store = counter.wrap(lambda tema, *args: None if tema == 'travado' else object())
+
+        def request(num_partes, index, strategy):
+            store(index, num_partes, 'stub', {})
+            return False
+
+        self.assertTrue(timed_request(request, 2, 'travado', None)[1])
+        self.assertFalse(timed_request(request, 2, 'Rust', None)[1])
+        self.assertEqual(counter.total, 1)
+
+
+@override_settings(LLM_BACKEND='stub', SINGLE_FLIGHT_POLL_INTERVAL=0)
+class SingleFlightTests(TestCase):
+    """Requisições idênticas simultâneas esperam a geração em andamento"""
+
+    def test_lock_row(self):
+        self.assertTrue(acquire_lock('chave', 'worker-1'))
+        self.assertFalse(acquire_lock('chave', 'worker-2'))
+        release_lock('chave', 'worker-1')
+        self.assertTrue(acquire_lock('chave', 'worker-2'))
+
+    def test_abandoned_lock_is_taken_over(self):
+        GenerationLock.objects.create(key='chave', owner='worker-1', expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertTrue(acquire_lock('chave', 'worker-2'))
+        self.assertEqual(GenerationLock.objects.get(key='chave').owner, 'worker-2')
+
+    def test_local_waiter(self):
+        locks = KeyedLocks()
+        results = []
+
+        def wait():
+            with locks.hold('chave', timeout=5) as result:
+                results.append(result)
+
+        with locks.hold('chave', timeout=5) as first:
+            waiter = threading.Thread(target=wait)
+            waiter.start()
+            waiter.join(0.05)
+            self.assertTrue(waiter.is_alive())
+        waiter.join()
+        self.assertEqual((first, results), ((True, False), [(True, True)]))
+        self.assertEqual(locks.locks, {})
+
+    def test_view_waits_for_other_worker(self):
+        key = make_cache_key('Haskell', 3, 'stub')
+        GenerationLock.objects.create(key=key, owner='outro-worker', expires_at=timezone.now() + timedelta(seconds=60))
+
+        def other_worker_finishes(seconds):
+            store_guide('Haskell', 3, 'stub', synthetic_guide_sections('Haskell', 3))
+            GenerationLock.objects.filter(key=key).delete()
+
+        with mock.patch('main.singleflight.time.sleep', side_effect=other_worker_finishes), \
+                mock.patch('main.views.build_guide') as build_guide:
+            response = self.client.post(reverse('home'), {'tema': 'Haskell', 'num_partes': 3})
+        build_guide.assert_not_called()
+        self.assertEqual(response.context['result'], assemble_guide(synthetic_guide_sections('Haskell', 3)))
+        self.assertFalse(GenerationLock.objects.exists())
+
+    def hold_lock_until_stored(self, tema):
+        """Trava de outro worker que termina (guarda o guia) na primeira espera"""
+        key = make_cache_key(tema, 3, 'stub')
+        GenerationLock.objects.create(key=key, owner='outro-worker', expires_at=timezone.now() + timedelta(seconds=60))
+
+        def other_worker_finishes(seconds):
+            store_guide(tema, 3, 'stub', synthetic_guide_sections(tema, 3))
+            GenerationLock.objects.filter(key=key).delete()
+
+        return mock.patch('main.singleflight.time.sleep', side_effect=other_worker_finishes)
+
+    def test_job_waits_for_other_worker(self):
+        job = enqueue_job('Haskell', 3)
+        with self.hold_lock_until_stored('Haskell'), mock.patch('main.jobs.build_guide') as build_guide:
+            run_job(job)
+        build_guide.assert_not_called()
+        job.refresh_from_db()
+        self.assertEqual(job.status, GenerationJob.STATUS_DONE)
+        self.assertEqual(job.html_result, Guide.objects.get(tema='Haskell').html)
+        self.assertFalse(GenerationLock.objects.exists())
+
+    def test_stream_waits_for_other_worker(self):
+        with self.hold_lock_until_stored('Haskell'), mock.patch('main.views.plan_guide') as plan_guide:
+            response = self.client.get(reverse('stream_guide'), {'tema': 'Haskell', 'num_partes': 3})
+            events = parse_sse(b''.join(response.streaming_content))
+        plan_guide.assert_not_called()
+        self.assertEqual([name for name, _ in events], ['guide', 'done'])
+        self.assertEqual(events[0][1]['html'], Guide.objects.get(tema='Haskell').html)
+        self.assertFalse(GenerationLock.objects.exists())
+
+
+@override_settings(
+    LLM_BACKEND='stub',
+    LLM_STUB_LATENCY=0,
+    LLM_STUB_TOKENS_PER_SECOND=10 ** 9,
+    LLM_STUB_RATE_LIMIT_EVERY=0,
+    GENERATION_JOB_STALE_AFTER=600,
+    GENERATION_JOB_MAX_ATTEMPTS=2,
+)
+class GenerationJobTests(TestCase):
+    """Fila de geração no banco: reivindicação, jobs travados e status"""
+
+    def test_claim_is_exclusive(self):
+        first = enqueue_job('Rust', 2)
+        second = enqueue_job('Go', 2)
+        now = timezone.now
+        selected = []
+
+        def other_worker_claims_first():
+            # Outro worker fica com o primeiro job entre a consulta e o UPDATE condicional
+            if not selected:
+                selected.append(first.pk)
+                GenerationJob.objects.filter(pk=first.pk).update(
+                    status=GenerationJob.STATUS_RUNNING, worker='worker-2',
+                )
+            return now()
+
+        with mock.patch('main.jobs.timezone.now', side_effect=other_worker_claims_first):
+            claimed = claim_next_job('worker-1')
+        self.assertEqual((claimed.pk, claimed.worker, claimed.attempts), (second.pk, 'worker-1', 1))
+        self.assertEqual(GenerationJob.objects.get(pk=first.pk).worker, 'worker-2')
+        self.assertIsNone(claim_next_job('worker-3'))
+
+    def test_stale_jobs_are_requeued_then_failed(self):
+        stale_heartbeat = timezone.now() - timedelta(seconds=601)
+        retried, exhausted, alive = (enqueue_job(tema, 2) for tema in ('Rust', 'Go', 'Zig'))
+        GenerationJob.objects.filter(pk__in=[retried.pk, exhausted.pk, alive.pk]).update(
+            status=GenerationJob.STATUS_RUNNING, worker='worker-1', attempts=1, heartbeat_at=stale_heartbeat,
+        )
+        GenerationJob.objects.filter(pk=exhausted.pk).update(attempts=2)
+        GenerationJob.objects.filter(pk=alive.pk).update(heartbeat_at=timezone.now())
+
+        requeue_stale_jobs()
+        statuses = dict(GenerationJob.objects.values_list('tema', 'status'))
+        self.assertEqual(statuses, {
+            'Rust': GenerationJob.STATUS_PENDING,
+            'Go': GenerationJob.STATUS_FAILED,
+            'Zig': GenerationJob.STATUS_RUNNING,
+        })
+        self.assertEqual(claim_next_job('worker-2').pk, retried.pk)
+
+    def test_failed_job(self):
+        enqueue_job('Rust', 2)
+        with mock.patch('main.jobs.build_guide', side_effect=Exception("Quota exceeded")):
+            run_job(claim_next_job('worker-1'))
+        response = self.client.get(reverse('job_status', args=[GenerationJob.objects.get().public_id]))
+        self.assertEqual(response.json()['status'], GenerationJob.STATUS_FAILED)
+        self.assertEqual(
+            response.json()['error'],
+            "Limite de requisições da API atingido. Por favor, tente novamente em alguns minutos.",
+        )
+        self.assertIsNotNone(GenerationJob.objects.get().finished_at)
+
+    def test_job_status_json(self):
+        response = self.client.post(reverse('enqueue_guide'), {'tema': 'Rust', 'num_partes': 4})
+        self.assertEqual(response.status_code, 202)
+        status_url = response.json()['status_url']
+        self.assertEqual(self.client.get(status_url).json(), {
+            'job_id': response.json()['job_id'],
+            'tema': 'Rust',
+            'num_partes': 4,
+            'status': GenerationJob.STATUS_PENDING,
+            'stage': '',
+            'progress': {'completed': 0, 'total': 7},
+        })
+
+        run_job(claim_next_job('worker-1'))
+        data = self.client.get(status_url).json()
+        self.assertEqual((data['status'], data['stage']), (GenerationJob.STATUS_DONE, 'done'))
+        self.assertEqual(data['progress'], {'completed': 7, 'total': 7})
+        self.assertIn('Parte 4:', data['html'])
+        self.assertNotIn('warning', data)
+
+        self.assertEqual(self.client.post(reverse('enqueue_guide'), {'tema': ''}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('job_status', args=[uuid.uuid4()])).status_code, 404)
+
+
+@override_settings(
+    LLM_BACKEND='stub',
+    LLM_STUB_LATENCY=0,
+    LLM_STUB_TOKENS_PER_SECOND=10 ** 9,
+    LLM_STUB_RATE_LIMIT_EVERY=0,
+    GENERATION_JOB_HEARTBEAT_INTERVAL=0.01,
+)
+class GenerationJobHeartbeatTests(TransactionTestCase):
+    """Heartbeat periódico do job, independente do fim das etapas"""
+
+    def test_heartbeat_during_slow_stage(self):
+        enqueue_job('Rust', 2)
+        job = claim_next_job('worker-1')
+        stale_heartbeat = timezone.now() - timedelta(seconds=601)
+        GenerationJob.objects.filter(pk=job.pk).update(heartbeat_at=stale_heartbeat)
+        beats = []
+
+        def slow_stage(llm, tema, num_partes, on_progress=None):
+            # Uma etapa que não termina enquanto o heartbeat não aparecer (ex: espera de retentativa)
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                heartbeat_at = GenerationJob.objects.get(pk=job.pk).heartbeat_at
+                if heartbeat_at > stale_heartbeat:
+                    beats.append(heartbeat_at)
+                    break
+                time.sleep(0.01)
+            raise Exception("Falha depois da espera")
+
+        with mock.patch('main.jobs.build_guide', side_effect=slow_stage):
+            run_job(job)
+        self.assertEqual(len(beats), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, GenerationJob.STATUS_FAILED)
+        self.assertEqual(job.stage, '')
+
+
+class GuidePermalinkTests(TestCase):
+    """Guias armazenados com link permanente, servidos do banco com GET condicional"""
+
+    def store(self, tema, parts=("# Parte 1: Começar", "# Parte 2: Avançar")):
+        sections = {'intro': f"# {tema}", 'parts': list(parts), 'conclusion': "# CONSIDERAÇÕES FINAIS"}
+        return store_guide(tema, len(parts), 'stub', sections)
+
+    def test_sections_are_stored(self):
+        guide = self.store('Elixir')
+        self.assertEqual(
+            [(section.position, section.key) for section in guide.sections.all()],
+            [(0, 'intro'), (1, 'parts-heading'), (2, 'part-1'), (3, 'part-2'), (4, 'conclusion')],
+        )
+        self.assertIn('<h1>Elixir</h1>', guide.sections.first().html)
+
+    def test_permalink_is_one_query_and_cacheable(self):
+        guide = self.store('Elixir')
+        self.client.get(guide.get_absolute_url())  # Estado do modo de manutenção já em cache
+        with self.assertNumQueries(1):
+            response = self.client.get(guide.get_absolute_url())
+        self.assertContains(response, '<h1>Elixir</h1>')
+        self.assertNotContains(response, 'csrfmiddlewaretoken')
+        self.assertNotContains(response, 'js/stream.js')
+        self.assertNotIn('csrftoken', response.cookies)
+        self.assertEqual(response['ETag'], f'"{guide.content_hash}"')
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=3600', response['Cache-Control'])
+
+        response = self.client.get(guide.get_absolute_url(), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(guide.get_absolute_url(), HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(GUIDE_CACHE_MAX_ENTRIES=1)
+    def test_eviction_retires_instead_of_deleting(self):
+        first = self.store('Elixir')
+        self.store('Erlang')
+        self.assertIsNotNone(Guide.objects.get(pk=first.pk).retired_at)
+        self.assertIsNone(get_cached_guide('Elixir', 2, 'stub'))
+        self.assertEqual(self.client.get(first.get_absolute_url()).status_code, 200)
+
+        # Gerado de novo, o guia volta ao cache com o mesmo link
+        regenerated = self.store('Elixir')
+        self.assertEqual(regenerated.public_id, first.public_id)
+        self.assertEqual(get_cached_guide('Elixir', 2, 'stub').pk, first.pk)
+
+    def test_form_streams_sections(self):
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, f'data-stream-url="{reverse("stream_guide")}"')
+        self.assertContains(response, 'id="stream-container"')
+        self.assertContains(response, 'js/stream.js')
+
+    def test_unknown_permalink(self):
+        self.assertEqual(self.client.get('/guias/00000000-0000-0000-0000-000000000000/').status_code, 404)
+
+
+class CompressGuideContentMigrationTests(TransactionTestCase):
+    """Migração 0010: guias gravados antes da compressão são separados em seções"""
+
+    before = [('main', '0009_contentblob')]
+    after = [('main', '0010_compress_guide_content')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_guides_are_split_into_sections(self):
+        apps = self.migrate(self.before)
+        OldGuide = apps.get_model('main', 'Guide')
+        sections = synthetic_guide_sections('Elixir', 3)
+        for tema, markdown_text in (('Elixir', assemble_guide(sections)), ('Erlang', "# Erlang\n\nSem partes")):
+            OldGuide.objects.create(
+                cache_key=tema, tema=tema, normalized_tema=tema.lower(), num_partes=3, model_name='stub',
+                prompt_version='v1', markdown=markdown_text, html=f"<p>{tema}</p>",
+                created_at=timezone.now(), last_accessed_at=timezone.now(),
+            )
+
+        apps = self.migrate(self.after)
+        GuideSection = apps.get_model('main', 'GuideSection')
+
+        def stored(tema):
+            return list(GuideSection.objects.filter(guide__tema=tema).order_by('position').values_list('key', flat=True))
+
+        self.assertEqual(stored('Elixir'), ['intro', 'parts-heading', 'part-1', 'part-2', 'part-3', 'conclusion'])
+        html = str(render_sections(sections))
+        self.assertEqual(
+            apps.get_model('main', 'Guide').objects.get(tema='Elixir').content_hash,
+            hashlib.sha256(html.encode('utf-8')).hexdigest(),
+        )
+        # Conteúdo que não pode ser separado continua em uma única seção
+        self.assertEqual(stored('Erlang'), ['guide'])
+
+
+@override_settings(GUIDE_CACHE_TTL=3600, GUIDE_PERMALINK_TTL=7200)
+class GuideCacheTests(TestCase):
+    """Validade dos guias em cache e contadores de acertos e falhas"""
+
+    def store(self, tema):
+        sections = {'intro': f"# {tema}", 'parts': ["# Parte 1: Começar"], 'conclusion': "# CONSIDERAÇÕES FINAIS"}
+        return store_guide(tema, 1, 'stub', sections)
+
+    def age(self, guide, seconds):
+        Guide.objects.filter(pk=guide.pk).update(created_at=timezone.now() - timedelta(seconds=seconds))
+
+    def stats(self):
+        return GuideCacheStats.objects.get(pk=1)
+
+    def test_hits_and_misses_are_counted(self):
+        self.assertIsNone(get_cached_guide('Elixir', 1, 'stub'))
+        guide = self.store('Elixir')
+        for _ in range(2):
+            self.assertEqual(get_cached_guide('Elixir', 1, 'stub').pk, guide.pk)
+        # Outro número de partes ou outro modelo é outra chave
+        self.assertIsNone(get_cached_guide('Elixir', 2, 'stub'))
+        self.assertIsNone(get_cached_guide('Elixir', 1, 'outro-modelo'))
+
+        stats = self.stats()
+        self.assertEqual((stats.hits, stats.misses), (2, 3))
+        self.assertEqual(stats.bytes_saved, 2 * guide.size_bytes)
+        self.assertEqual(stats.hit_rate, 0.4)
+        guide.refresh_from_db()
+        self.assertEqual(guide.hits, 2)
+
+    def test_expired_guide_is_retired(self):
+        guide = self.store('Elixir')
+        self.age(guide, 3500)
+        self.assertEqual(get_cached_guide('Elixir', 1, 'stub').pk, guide.pk)
+
+        self.age(guide, 3700)
+        self.assertIsNone(get_cached_guide('Elixir', 1, 'stub'))
+        guide.refresh_from_db()
+        self.assertIsNotNone(guide.retired_at)
+        self.assertEqual((self.stats().hits, self.stats().misses), (1, 1))
+        # Retirado, o guia não volta a ser servido do cache, mas o link permanente continua
+        self.assertIsNone(get_cached_guide('Elixir', 1, 'stub'))
+        self.assertEqual(self.stats().misses, 2)
+        self.assertEqual(self.client.get(guide.get_absolute_url()).status_code, 200)
+
+    def test_eviction_retires_expired_and_deletes_old_permalinks(self):
+        expired = self.store('Elixir')
+        fresh = self.store('Erlang')
+        self.age(expired, 3700)
+        evict_guides()
+        expired.refresh_from_db()
+        self.assertIsNotNone(expired.retired_at)
+        self.assertIsNone(Guide.objects.get(pk=fresh.pk).retired_at)
+
+        Guide.objects.filter(pk=expired.pk).update(retired_at=timezone.now() - timedelta(seconds=7300))
+        evict_guides()
+        self.assertFalse(Guide.objects.filter(pk=expired.pk).exists())
+        self.assertEqual(self.client.get(expired.get_absolute_url()).status_code, 404)
+
+
+class GuideStorageTests(TestCase):
+    """Conteúdo dos guias comprimido, deduplicado por hash e descomprimido por seção"""
+
+    def make_dictionary(self, name='test'):
+        """Dicionário treinado em guias sintéticos, gravado em um diretório temporário"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch('main.compression.DICTIONARY_DIR', Path(directory.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(load_dictionary.cache_clear)
+        (Path(directory.name) / f'{name}.txt').write_bytes(train_dictionary(synthetic_content_samples(10)))
+        return name
+
+    def test_compression_round_trip(self):
+        text = synthetic_guide(2, 5)
+        for codec, dictionary in ((CODEC_ZLIB, ''), (CODEC_ZLIB, self.make_dictionary())):
+            stored = compress(text, codec, dictionary)
+            self.assertEqual(stored[:2], (codec, dictionary))
+            self.assertLess(len(stored[2]), len(text.encode('utf-8')))
+            self.assertEqual(decompress(*stored), text)
+        # Texto que não diminui é guardado como está
+        self.assertEqual(compress("# P"), (CODEC_RAW, '', b"# P"))
+
+    def test_dictionary_helps_short_sections(self):
+        section = str(render_fragment(synthetic_guide_sections('Rust', 3, seed=99)['intro']))
+        dictionary = self.make_dictionary()
+        self.assertLess(len(compress(section, CODEC_ZLIB, dictionary)[2]), len(compress(section, CODEC_ZLIB, '')[2]))
+
+    def test_no_dictionary_by_default(self):
+        self.assertEqual(compress(synthetic_guide(2, 5))[:2], (CODEC_ZLIB, ''))
+
+    def test_guide_is_rebuilt_from_sections(self):
+        sections = synthetic_guide_sections('Rust', 3)
+        store_guide('Rust', 3, 'stub', sections)
+        guide = Guide.objects.get(tema='Rust')
+        self.assertEqual(guide.markdown, assemble_guide(sections))
+        self.assertEqual(guide.html, str(render_sections(sections)))
+        self.assertEqual(guide.size_bytes, len(guide.markdown.encode('utf-8')) + len(guide.html.encode('utf-8')))
+
+    def test_identical_sections_are_stored_once(self):
+        shared = synthetic_guide_sections('Rust', 3)
+        store_guide('Rust', 3, 'stub', shared)
+        blobs = ContentBlob.objects.count()
+        store_guide('Rust para web', 3, 'stub', dict(shared, intro="# Rust para web"))
+        # Só a introdução nova (Markdown e HTML) foi gravada
+        self.assertEqual(ContentBlob.objects.count(), blobs + 2)
+
+    def test_sections_are_decompressed_lazily(self):
+        store_guide('Rust', 3, 'stub', synthetic_guide_sections('Rust', 3))
+        sections = list(GuideSection.objects.filter(guide__tema='Rust').select_related('html_blob'))
+        with mock.patch('main.models.decompress', wraps=decompress) as tracked_decompress:
+            self.assertIn('<h1>', sections[0].html)
+        tracked_decompress.assert_called_once()
+
+    def used_blobs(self):
+        sections = GuideSection.objects.all()
+        return set(sections.values_list('markdown_blob', flat=True)) | set(sections.values_list('html_blob', flat=True))
+
+    def test_unused_content_is_purged(self):
+        first = synthetic_guide_sections('Rust', 3, seed=1)
+        store_guide('Rust', 3, 'stub', first)
+        store_guide('Rust', 3, 'stub', synthetic_guide_sections('Rust', 3, seed=2))
+        # Gravar um guia não percorre os conteúdos: os sem seção ficam para o worker
+        orphans = set(ContentBlob.objects.values_list('pk', flat=True)) - self.used_blobs()
+        self.assertTrue(orphans)
+
+        # Conteúdo sem seção reaproveitado antes da limpeza continua valendo
+        store_guide('Rust', 3, 'stub', first)
+        with mock.patch('main.guide_cache.ORPHAN_PURGE_BATCH', 3):
+            self.assertGreater(purge_orphan_blobs(), 0)
+        self.assertEqual(set(ContentBlob.objects.values_list('pk', flat=True)), self.used_blobs())
+        self.assertTrue(orphans & self.used_blobs())
+        self.assertEqual(Guide.objects.get(tema='Rust').markdown, assemble_guide(first))
+        self.assertEqual(purge_orphan_blobs(), 0)
+
+    def test_worker_purges_unused_content(self):
+        store_guide('Rust', 3, 'stub', synthetic_guide_sections('Rust', 3, seed=1))
+        store_guide('Rust', 3, 'stub', synthetic_guide_sections('Rust', 3, seed=2))
+        call_command('run_generation_worker', '--once', stdout=io.StringIO())
+        self.assertEqual(set(ContentBlob.objects.values_list('pk', flat=True)), self.used_blobs())
+
+
+class MaintenanceModeTests(TestCase):
+    """Modo de manutenção no middleware, com o estado em cache no processo"""
+
+    def setUp(self):
+        invalidate_maintenance_cache()
+        self.addCleanup(invalidate_maintenance_cache)
+
+    def test_static_503_without_queries_within_ttl(self):
+        set_maintenance_mode(True)
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '300')
+        self.assertIn(MAINTENANCE_MESSAGE, response.content.decode())
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.post(reverse('home'), {'tema': 'Rust'}).status_code, 503)
+
+    def test_jobs_receive_json(self):
+        set_maintenance_mode(True)
+        response = self.client.post(reverse('enqueue_guide'), {'tema': 'Rust', 'num_partes': 3})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {'error': MAINTENANCE_MESSAGE})
+
+    def test_exempt_paths_and_turning_off(self):
+        set_maintenance_mode(True)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+        set_maintenance_mode(False)
+        self.assertEqual(self.client.get(reverse('home')).status_code, 200)
@@ -0,0 +1,91 @@
+"""
+Fases e títulos do guia: distribuição das partes entre as três fases,
+emojis dos títulos e síntese do título de cada fase a partir dos títulos
+das suas partes.
+
+Funções puras, com as expressões regulares compiladas uma única vez na
+importação do módulo; o custo por requisição é medido pela suíte 'titles'
+de `python manage.py benchmark`.
+"""
+import re
+
+# Caracteres fora do plano básico do Unicode (onde ficam os emojis)
+EMOJI_PATTERN = re.compile(r'[\U00010000-\U0010ffff]')
+# Emoji usado quando o título da parte não tem nenhum
+DEFAULT_EMOJI = "📚"
+# Emoji de uma fase sem partes
+EMPTY_PHASE_EMOJI = "🔄"
+
+
+def calculate_phase_distribution(total_parts):
+    """Calcula a distribuição das partes entre as três fases do guia"""
+    # Para 6 partes exemplo: [1-2], [3-4], [5-6]
+    first_phase = max(1, total_parts // 3)
+    third_phase = max(1, total_parts // 3)
+    second_phase = total_parts - first_phase - third_phase
+
+    return [
+        (1, first_phase),
+        (first_phase + 1, first_phase + second_phase),
+        (first_phase + second_phase + 1, total_parts)
+    ]
+
+
+def get_phase_for_part(part_num, phase_distribution):
+    """Determina a qual fase pertence uma parte específica"""
+    for phase_idx, (start, end) in enumerate(phase_distribution, 1):
+        if start <= part_num <= end:
+            return phase_idx
+    return 1  # Fallback para fase 1
+
+
+def extract_emoji(title):
+    """Extrai o emoji de um título de parte"""
+    match = EMOJI_PATTERN.search(title)
+    return match.group() if match else DEFAULT_EMOJI
+
+
+def strip_emojis(title):
+    """Título sem os emojis"""
+    return EMOJI_PATTERN.sub('', title).strip()
+
+
+def combine_two_titles(first, second):
+    """Título sintético de uma fase com duas partes, combinando os trechos antes e depois dos dois-pontos"""
+    prefix1, _, suffix1 = (text.strip() for text in first.partition(":"))
+    prefix2, _, suffix2 = (text.strip() for text in second.partition(":"))
+    if suffix1 and suffix2:
+        return f"{prefix1} e {prefix2} – {suffix1} e {suffix2}"
+    if suffix1:
+        return f"{prefix1} e {prefix2} – {suffix1}"
+    if suffix2:
+        return f"{prefix1} e {prefix2} – {suffix2}"
+    return f"{prefix1} e {prefix2}"
+
+
+def combine_titles(titles):
+    """Título sintético de uma fase com 3 ou mais partes"""
+    return " + ".join(
+        "{} – {}".format(*title.split(":", 1)) if ":" in title else title
+        for title in titles
+    )
+
+
+def synthesize_phase_titles(skeleton_parts, phase_distribution):
+    """Prepara os títulos das fases baseados na distribuição das partes"""
+    phase_titles = []
+    for start, end in phase_distribution:
+        if start == end:  # Uma única parte na fase
+            phase_titles.append(skeleton_parts[start].title)
+            continue
+
+        part_titles = [skeleton_parts[part_num].title for part_num in range(start, end + 1)]
+        base_titles = [strip_emojis(title) for title in part_titles]
+        if len(base_titles) == 2:
+            synthetic_title = combine_two_titles(*base_titles)
+        else:
+            synthetic_title = combine_titles(base_titles)
+        # Até 2 emojis, dos títulos das primeiras partes da fase (a fase do meio fica vazia em guias de 2 partes)
+        emojis = "".join(extract_emoji(title) for title in part_titles[:2]) or EMPTY_PHASE_EMOJI
+        phase_titles.append(f"{synthetic_title} {emojis}")
+    return phase_titles
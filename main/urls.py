@@ -3,5 +3,11 @@ from . import views
 
 urlpatterns = [
     path('', views.test_gemini, name='home'),
+    path('async/', views.test_gemini_async, name='home_async'),
+    path('stream/', views.stream_guide, name='stream_guide'),
+    path('jobs/', views.enqueue_guide, name='enqueue_guide'),
+    path('jobs/<uuid:job_id>/', views.job_status, name='job_status'),
+    path('guias/<uuid:guide_id>/', views.guide_permalink, name='guide_permalink'),
+    path('metrics/', views.metrics, name='metrics'),
     path('visualize-markdown/', views.visualize_markdown, name='visualize_markdown'),
 ]
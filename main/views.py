@@ -1,42 +1,99 @@
-from django.shortcuts import render
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.shortcuts import get_object_or_404, render
 from django.conf import settings
-from django.utils.safestring import mark_safe
-import markdown
-import re
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_POST, require_safe
+import json
 import requests
 import logging
 import traceback
 from .prompts.chunking_prompt import generate_prompt
-import os
-import google.generativeai as genai
-import time
+from .prompts.guide_prompts import format_phase_range
+from .generation import (
+    abuild_guide,
+    assemble_guide,
+    build_guide,
+    call_model,
+    describe_api_error,
+    describe_missing_sections,
+    iter_section_events,
+    iter_sections,
+    missing_section_markdown,
+    order_sections,
+    plan_guide,
+    run_in_worker,
+)
+from .guide_cache import get_cached_guide, get_cached_guide_payload, make_cache_key, store_guide
+from .jobs import enqueue_job
+from .metrics import RequestTrace, iter_with_trace, registry
+from .llm import get_backend
+from .models import GenerationJob, Guide, GuideSection
+from .rendering import IncrementalMarkdownRenderer, render_fragment, render_sections
+from .singleflight import asingle_flight, single_flight
+from django.utils.safestring import mark_safe
 
 # Configurar o logger
 logger = logging.getLogger(__name__)
 
+
+def validate_guide_request(tema, raw_num_partes):
+    """
+    Valida o tema e o número de partes recebidos.
+    
+    Retorna uma tupla (num_partes, error); quando há erro, num_partes é o
+    valor que deve ser reexibido no formulário.
+    """
+    # Verificar se o tema é muito longo
+    if (len(tema) > 200):
+        return 2, f"O tema é muito longo ({len(tema)} caracteres). Por favor, reduza para no máximo 200 caracteres."
+    
+    try:
+        num_partes = int(raw_num_partes)
+    except (TypeError, ValueError):
+        return 2, "O número de partes deve ser um número inteiro válido."
+    
+    if num_partes < 2:
+        return num_partes, "O número de partes deve ser maior que 1."
+    # Adicionando limite máximo de partes
+    if num_partes > 22:
+        return 22, "O número máximo de partes permitido é 22."  # Redefinindo para o máximo permitido
+    
+    return num_partes, None
+
+def render_cached_guide(request, cached_guide, tema, num_partes):
+    return render(request, 'index.html', {
+        'result': cached_guide.markdown,
+        'html_result': mark_safe(cached_guide.html),
+        'error': None,
+        'tema': tema,
+        'num_partes': num_partes,
+        'has_content': True,
+        'permalink_url': cached_guide.get_absolute_url(),
+        'app_title': 'Chunkify'
+    })
+
 def test_gemini(request):
     result = None
     error = None
+    warning = None
     tema = ""
     num_partes = 2
     html_result = None
-    
-    # Verificar se o sistema está em modo de manutenção
-    maintenance_mode = os.path.exists(os.path.join(settings.BASE_DIR, 'maintenance_mode'))
-    if maintenance_mode:
-        error = "O serviço está temporariamente indisponível para manutenção. Por favor, tente novamente mais tarde."
-        return render(request, 'index.html', {
-            'error': error,
-            'tema': tema,
-            'num_partes': num_partes
-        })
+    permalink_url = None
     
     try:
-        # Configurar o cliente Gemini
+        # Configurar o provedor de LLM (settings.LLM_BACKEND)
         try:
-            genai.configure(api_key=settings.GEMINI_API_KEY)
-        except Exception as gemini_error:
-            logger.error(f"Erro ao configurar Gemini API: {str(gemini_error)}")
+            llm = get_backend()
+        except Exception as llm_error:
+            logger.error(f"Erro ao configurar o provedor de LLM: {str(llm_error)}")
             error = "Erro na configuração do serviço de IA. Por favor, tente novamente mais tarde."
             return render(request, 'index.html', {
                 'error': error,
@@ -50,558 +107,75 @@ def test_gemini(request):
             # Log do tema recebido para diagnóstico
             logger.info(f"Tema recebido: '{tema}' (tamanho: {len(tema)} caracteres)")
             
-            # Verificar se o tema é muito longo
-            if (len(tema) > 200):
-                error = f"O tema é muito longo ({len(tema)} caracteres). Por favor, reduza para no máximo 200 caracteres."
+            num_partes, error = validate_guide_request(tema, request.POST.get('num_partes', '2'))
+            if error:
                 return render(request, 'index.html', {
                     'error': error,
                     'tema': tema,
                     'num_partes': num_partes
                 })
-                
-            try:
-                num_partes = int(request.POST.get('num_partes', '2'))
-                if num_partes < 2:
-                    error = "O número de partes deve ser maior que 1."
-                    return render(request, 'index.html', {
-                        'error': error,
-                        'tema': tema,
-                        'num_partes': num_partes
-                    })
-                # Adicionando limite máximo de partes
-                if num_partes > 22:
-                    error = "O número máximo de partes permitido é 22."
-                    return render(request, 'index.html', {
-                        'error': error,
-                        'tema': tema,
-                        'num_partes': 22  # Redefinindo para o máximo permitido
-                    })
-            except ValueError:
-                error = "O número de partes deve ser um número inteiro válido."
-                return render(request, 'index.html', {
-                    'error': error,
-                    'tema': tema,
-                    'num_partes': 2
-                })
             
-            try:
-                # Implementação da abordagem de uma requisição por parte usando Gemini
-                logger.info(f"Processando '{tema}' com {num_partes} partes usando abordagem de requisição por parte")
-                
-                # Definir o modelo Gemini a ser utilizado
-                gemini_model = genai.GenerativeModel('gemini-2.0-flash')
-                
-                # Resultado final para ser concatenado
-                final_result = ""
-                
-                # Calcular distribuição das partes entre as fases
-                def calculate_phase_distribution(total_parts):
-                    # Para 6 partes exemplo: [1-2], [3-4], [5-6]
-                    first_phase = max(1, total_parts // 3)
-                    third_phase = max(1, total_parts // 3)
-                    second_phase = total_parts - first_phase - third_phase
-                    
-                    return [
-                        (1, first_phase),
-                        (first_phase + 1, first_phase + second_phase),
-                        (first_phase + second_phase + 1, total_parts)
-                    ]
-                
-                phase_distribution = calculate_phase_distribution(num_partes)
-                
-                # ETAPA NOVA: Gerar esqueleto estrutural (invisível ao usuário)
-                logger.info("Gerando esqueleto estrutural invisível para guiar a estrutura...")
-                
-                skeleton_prompt = f"""Crie um esqueleto estrutural detalhado e CONSISTENTE para um guia de estudos sobre "{tema}" em {num_partes} partes.
-
-Para cada parte, defina:
-1. Um título específico (começando com um verbo e incluindo um emoji)
-2. 3-4 tópicos principais que serão abordados nesta parte
-3. Nível de dificuldade (1-5, aumentando progressivamente)
-
-Use EXATAMENTE este formato estruturado:
-Parte {num_partes}:
-- Título: [Título específico com verbo e emoji]
-- Tópicos principais:
-  - [Tópico 1]
-  - [Tópico 2]
-  - [Tópico 3]
-- Nível de dificuldade: [Nível de dificuldade]"""
-
-                skeleton_response = gemini_model.generate_content(skeleton_prompt)
-                if hasattr(skeleton_response, 'text'):
-                    skeleton_content = skeleton_response.text
-                    logger.info(f"Esqueleto estrutural gerado com sucesso:\n{skeleton_content}")
-                else:
-                    raise Exception("Resposta inválida na geração do esqueleto estrutural.")
-                
-                # Parsear o esqueleto para extrair títulos e tópicos
-                skeleton_parts = {}
-                for part in range(1, num_partes + 1):
-                    # Tentar vários formatos possíveis para capturar a resposta da API
-                    patterns = [
-                        # Formato original com asteriscos
-                        rf"\*\*Parte {part}:\*\*\n- Título: (.*?)\n- Tópicos principais:\n(.*?)\n- Nível de dificuldade: (\d+)",
-                        # Formato sem asteriscos (como visto no log)
-                        rf"Parte {part}:\n- Título: (.*?)\n- Tópicos principais:\n(.*?)\n- Nível de dificuldade: (\d+)",
-                        # Possível formato alternativo
-                        rf"Parte {part}:\s*\n\s*- Título: (.*?)\n\s*- Tópicos principais:\n(.*?)\n\s*- Nível de dificuldade: (\d+)"
-                    ]
-                    
-                    match = None
-                    for pattern in patterns:
-                        match = re.search(pattern, skeleton_content, re.DOTALL)
-                        if match:
-                            break
-                    
-                    if match:
-                        title = match.group(1).strip()
-                        # Limpar os tópicos de indentação e marcadores
-                        topics_text = match.group(2)
-                        topics = [line.strip().lstrip('- ') for line in topics_text.strip().split("\n")]
-                        difficulty = int(match.group(3).strip())
-                        skeleton_parts[part] = {
-                            "title": title,
-                            "topics": topics,
-                            "difficulty": difficulty
-                        }
-                
-                # Verificar se todas as partes foram encontradas
-                if len(skeleton_parts) != num_partes:
-                    missing_parts = [i for i in range(1, num_partes + 1) if i not in skeleton_parts]
-                    logger.warning(f"Partes faltantes no esqueleto: {missing_parts}. Formato retornado:\n{skeleton_content}")
-                    raise Exception(f"Falha ao extrair todas as partes do esqueleto ({len(skeleton_parts)}/{num_partes})")
-                
-                # Função auxiliar para extrair emoji de um título
-                def extract_emoji(title):
-                    """Extrai o emoji de um título de parte"""
-                    emoji_pattern = re.compile(r'[\U00010000-\U0010ffff]', flags=re.UNICODE)
-                    emojis = emoji_pattern.findall(title)
-                    return emojis[0] if emojis else "📚"  # Emoji padrão se nenhum for encontrado
-
-                # Preparar títulos das fases baseados na distribuição
-                phase_titles = []
-
-                for phase_idx, (start, end) in enumerate(phase_distribution, 1):
-                    if start == end:  # Uma única parte na fase
-                        phase_title = skeleton_parts[start]['title']
-                        phase_titles.append(f"{phase_title}")
-                    else:  # Múltiplas partes na fase
-                        # Para fases com múltiplas partes, realizar uma verdadeira síntese
-                        part_titles = [skeleton_parts[i]['title'] for i in range(start, end + 1)]
-                        part_titles_base = [re.sub(r'[\U00010000-\U0010ffff]', '', title).strip() for title in part_titles]
-
-                        # Extrair emojis de todas as partes
-                        emojis = []
-                        for i in range(start, end + 1):
-                            emoji = extract_emoji(skeleton_parts[i]['title'])
-                            if emoji:
-                                emojis.append(emoji)
-
-                        selected_emoji = "".join(emojis[:2]) if emojis else "🔄"  # Usar até 2 emojis
-
-                        # Criar um título sintético que lida corretamente com dois-pontos
-                        if len(part_titles_base) == 2:
-                            # Processar cada título para lidar com dois-pontos internos
-                            processed_titles = []
-                            for title in part_titles_base:
-                                if ":" in title:
-                                    # Dividir pelo primeiro dois-pontos
-                                    prefix, suffix = title.split(":", 1)
-                                    processed_titles.append((prefix.strip(), suffix.strip()))
-                                else:
-                                    processed_titles.append((title, ""))
-                            
-                            # Extrair componentes para combinar
-                            if len(processed_titles) == 2:
-                                # Se ambos os títulos têm estrutura com dois-pontos
-                                if processed_titles[0][1] and processed_titles[1][1]:
-                                    # Combine os prefixos e os sufixos separadamente
-                                    prefix1, suffix1 = processed_titles[0]
-                                    prefix2, suffix2 = processed_titles[1]
-                                    synthetic_title = f"{prefix1} e {prefix2} – {suffix1} e {suffix2}"
-                                # Se apenas um título tem dois-pontos
-                                elif processed_titles[0][1]:
-                                    prefix1, suffix1 = processed_titles[0]
-                                    title2 = processed_titles[1][0]
-                                    synthetic_title = f"{prefix1} e {title2} – {suffix1}"
-                                elif processed_titles[1][1]:
-                                    title1 = processed_titles[0][0]
-                                    prefix2, suffix2 = processed_titles[1]
-                                    synthetic_title = f"{title1} e {prefix2} – {suffix2}"
-                                else:
-                                    # Se nenhum tem dois-pontos, simplesmente combine
-                                    synthetic_title = f"{processed_titles[0][0]} e {processed_titles[1][0]}"
-                            else:
-                                # Fallback para caso o processamento falhe
-                                synthetic_title = " e ".join([t.replace(":", " –") for t in part_titles_base])
-                        else:
-                            # Para 3 ou 4 partes, use uma abordagem mais genérica
-                            processed_titles = []
-                            for title in part_titles_base:
-                                if ":" in title:
-                                    prefix, suffix = title.split(":", 1)
-                                    processed_titles.append(f"{prefix} – {suffix}")
-                                else:
-                                    processed_titles.append(title)
-                            
-                            synthetic_title = " + ".join(processed_titles)
-
-                        # Adicionar o emoji selecionado
-                        synthetic_title = f"{synthetic_title} {selected_emoji}"
-                        phase_titles.append(synthetic_title)
-                
-                # Gerar introdução
-                logger.info("Gerando introdução...")
-                intro_prompt = f"""Crie apenas a introdução para um guia de estudos sobre "{tema}" em {num_partes} partes.
-
-Use esta formatação:
-# {tema} em {num_partes} Partes: Seu Mapa para Dominar {tema} do Zero
-
-## Por Onde Começar?
-[4 perguntas específicas com problemas relacionados a {tema}, sem começar com "Você"]
-FORMATO CORRETO (sem pronome inicial):
-- Se sente perdido ao tentar [ação específica de {tema}]?
-- Tem dificuldade em entender [conceito específico de {tema}]?
-- Fica confuso ao tentar [ação relacionada a {tema}]?
-- Precisa dominar [habilidade específica] em [tempo determinado]?
-
-## O Que Você Vai Construir:
-1️⃣ **Fase 1: {phase_titles[0]} (Parte{'s' if phase_distribution[0][1] > phase_distribution[0][0] else ''} {phase_distribution[0][0]}{f'-{phase_distribution[0][1]}' if phase_distribution[0][1] > phase_distribution[0][0] else ''})**
-- **Conquista:** [Habilidade concreta específica sobre {tema}]
-    - *Mini-desafio:* [Tarefa prática sobre {tema} relacionada à conquista acima]
-- **Conquista:** [Outra habilidade concreta específica sobre {tema}]
-    - *Mini-desafio:* [Outra tarefa prática sobre {tema} relacionada à conquista acima]
-
-2️⃣ **Fase 2: {phase_titles[1]} (Parte{'s' if phase_distribution[1][1] > phase_distribution[1][0] else ''} {phase_distribution[1][0]}{f'-{phase_distribution[1][1]}' if phase_distribution[1][1] > phase_distribution[1][0] else ''})**
-- **Conquista:** [Habilidade intermediária específica sobre {tema}]
-    - *Mini-desafio:* [Tarefa mais complexa sobre {tema} relacionada à conquista acima]
-- **Conquista:** [Outra habilidade intermediária específica sobre {tema}]
-    - *Mini-desafio:* [Outra tarefa complexa sobre {tema} relacionada à conquista acima]
-- **Conquista:** [Terceira habilidade intermediária sobre {tema}]
-    - *Mini-desafio:* [Tarefa desafiadora sobre {tema} relacionada à conquista acima]
-
-3️⃣ **Fase 3: {phase_titles[2]} (Parte{'s' if phase_distribution[2][1] > phase_distribution[2][0] else ''} {phase_distribution[2][0]}{f'-{phase_distribution[2][1]}' if phase_distribution[2][1] > phase_distribution[2][0] else ''})**
-- **Conquista:** [Habilidade avançada específica sobre {tema}]
-    - *Mini-desafio:* [Projeto avançado sobre {tema} relacionado à conquista acima]
-- **Conquista:** [Outra habilidade avançada sobre {tema}]
-    - *Mini-desafio:* [Outro projeto avançado sobre {tema} relacionado à conquista acima]
-- **Conquista:** [Habilidade de expert em {tema}]
-    - *Mini-desafio:* [Projeto complexo sobre {tema} para demonstrar maestria]
-
-## Kit Ferramentas Incluso:
-[Lista de 5 ferramentas principais para {tema}, cada uma com emoji e descrição específica de uso]
-Exemplo de formato para cada ferramenta:
-- [Emoji] **[Nome da Ferramenta]:** [Descrição curta e específica do uso para {tema}]
-
-## Primeiro Passo Imediato:
-[3 ações concretas e verificáveis para começar com {tema}, com foco em resultados práticos]
-Exemplo de formato para cada ação:
-1️⃣ **[Ação específica]** → [Resultado esperado]
-
-IMPORTANTE: 
-1. NÃO mencione tempo ou duração (minutos, horas, etc.) nos primeiros passos
-2. Coloque TODO o texto do passo em negrito (incluindo a ação e o resultado)
-3. Use APENAS exemplos e termos específicos de {tema}"""
-
-                intro_response = gemini_model.generate_content(intro_prompt)
-                if hasattr(intro_response, 'text'):
-                    intro_content = intro_response.text
-                    final_result += intro_content + "\n\n# PARTES\n\n"
-                else:
-                    raise Exception("Resposta inválida na geração da introdução.")
+            # Servir do cache quando o mesmo guia já foi gerado
+            cached_guide = get_cached_guide(tema, num_partes, llm.model_name)
+            if cached_guide is not None:
+                return render_cached_guide(request, cached_guide, tema, num_partes)
+            
+            # Requisições idênticas simultâneas esperam a geração em andamento
+            # e consultam o cache de novo (ver main/singleflight.py)
+            with single_flight(make_cache_key(tema, num_partes, llm.model_name)) as waited:
+                cached_guide = get_cached_guide(tema, num_partes, llm.model_name) if waited else None
+                if cached_guide is not None:
+                    return render_cached_guide(request, cached_guide, tema, num_partes)
                 
-                # Passo 2: Gerar cada parte individualmente
-                def get_phase_for_part(part_num, phase_distribution):
-                    """Determina a qual fase pertence uma parte específica"""
-                    for phase_idx, (start, end) in enumerate(phase_distribution, 1):
-                        if start <= part_num <= end:
-                            return phase_idx
-                    return 1  # Fallback para fase 1
-
-                for part_num in range(1, num_partes + 1):
-                    logger.info(f"Gerando parte {part_num}...")
-                    
-                    # Breve pausa entre chamadas para evitar rate limiting
-                    if part_num > 1:
-                        time.sleep(0.5)
-                    
-                    part_prompt = f"""Crie APENAS a parte {part_num} de um guia de estudos sobre "{tema}" em {num_partes} partes.
-
-IMPORTANTE: Use EXATAMENTE este título, sem alterações:
-# Parte {part_num}: {skeleton_parts[part_num]['title']}
-
-Esta parte se refere à Fase {get_phase_for_part(part_num, phase_distribution)} do guia.
-
-Inclua para a Parte {part_num}:
-- Dificuldade: {skeleton_parts[part_num]['difficulty']}/5  
-- Taxonomia de Bloom: [Nível]
-- Estilo de Aprendizado: [Perfil]
-- Progresso Acumulado: [{part_num*10}]% do core mastery
-- Objetivo Transformador: frase específica sobre o que a pessoa conseguirá fazer
-- Conexões com partes anteriores e posteriores
-- Tópicos Nucleares: {', '.join(skeleton_parts[part_num]['topics'])}
-- Rotas Alternativas: caminho simples e avançado para aprender
-- Armadilhas Comuns: problemas reais frequentes com soluções concretas
-- Checklist de Domínio: 3-4 itens verificáveis sobre habilidades concretas
-- Caso Real: exemplo específico de uso de {tema} no mundo real
-- Prompt de IA: um prompt detalhado para praticar o aprendizado
-- Desafio Relâmpago: desafio específico
-
-IMPORTANTE:
-1. Seja ALTAMENTE ESPECÍFICO sobre {tema}, use exemplos reais e termos técnicos
-2. Crie APENAS a parte {part_num}, sem introdução ou conclusão
-3. Use linguagem técnica própria de {tema}
-4. NÃO INCLUA nenhuma referência a tempo de estudo (horas, dias, semanas, etc.)"""
-
-                    part_response = gemini_model.generate_content(part_prompt)
-                    if hasattr(part_response, 'text'):
-                        part_content = part_response.text
-                        final_result += part_content + "\n\n"
-                    else:
-                        raise Exception(f"Resposta inválida na geração da parte {part_num}.")
+                try:
+                    # Implementação da abordagem de uma requisição por parte
+                    logger.info(f"Processando '{tema}' com {num_partes} partes usando abordagem de requisição por parte")
                 
-                # Passo 3: Gerar conclusão
-                logger.info("Gerando conclusão...")
-                conclusion_prompt = f"""Crie apenas a conclusão para um guia de estudos sobre "{tema}" em {num_partes} partes.
-
-Use esta formatação:
-# CONSIDERAÇÕES FINAIS
-## Integração dos Conhecimentos
-## Síntese
-## Conclusão
-
-A conclusão deve:
-1. Sintetizar a progressão de conhecimento através das {num_partes} partes 
-2. Explicar como os conceitos aprendidos se integram no uso real de {tema}
-3. Sugerir próximos passos para continuar o aprendizado
-4. Reforçar a jornada completa de domínio do {tema}
-
-Seja específico sobre {tema}, não use texto genérico."""
-
-                conclusion_response = gemini_model.generate_content(conclusion_prompt)
-                if hasattr(conclusion_response, 'text'):
-                    conclusion_content = conclusion_response.text
-                    final_result += conclusion_content
-                else:
-                    raise Exception("Resposta inválida na geração da conclusão.")
+                    # Gerar o esqueleto e, em paralelo, introdução, partes e conclusão
+                    sections, missing_sections = build_guide(
+                        llm, tema, num_partes, strategy=request.POST.get('strategy')
+                    )
+                    final_result = assemble_guide(sections)
                 
-                # Atribuir o resultado final
-                result = final_result
-                logger.info(f"Geração completa, resultado com {len(result)} caracteres")
+                    # Atribuir o resultado final
+                    result = final_result
+                    logger.info(f"Geração completa, resultado com {len(result)} caracteres")
                 
-            except Exception as api_error:
-                # Log detalhado do erro
-                logger.error(f"API Error: {str(api_error)}")
-                logger.error(traceback.format_exc())
+                except Exception as api_error:
+                    # Log detalhado do erro
+                    logger.error(f"API Error: {str(api_error)}")
+                    logger.error(traceback.format_exc())
                 
-                # Determinar o tipo de erro para uma mensagem mais informativa
-                error_msg = str(api_error).lower()
-                if "content filter" in error_msg or "blocked" in error_msg or "safety" in error_msg:
-                    error = "O tema foi bloqueado pelo filtro de conteúdo da API. Por favor, tente outro tema."
-                elif "rate limit" in error_msg or "quota" in error_msg:
-                    error = "Limite de requisições da API atingido. Por favor, tente novamente em alguns minutos."
-                elif "context length" in error_msg or "too many tokens" in error_msg or "maximum token" in error_msg:
-                    error = "O tema solicitado é muito complexo ou extenso. Por favor, tente um tema mais específico ou reduza o número de partes."
-                elif "timeout" in error_msg or "deadline" in error_msg:
-                    error = "A requisição excedeu o tempo limite. Por favor, tente novamente ou escolha um tema menos complexo."
-                elif "invalid" in error_msg and "character" in error_msg:
-                    error = "O tema contém caracteres inválidos ou especiais. Por favor, simplifique o texto."
-                else:
-                    # Se estiver em modo de desenvolvimento, mostrar o erro real
-                    if settings.DEBUG:
-                        error = f"Erro na API: {str(api_error)}"
-                    else:
-                        error = "Ocorreu um erro ao processar sua solicitação. Por favor, tente novamente mais tarde."
+                    # Determinar o tipo de erro para uma mensagem mais informativa
+                    error = describe_api_error(api_error)
                 
-                logger.info(f"Mensagem de erro exibida: {error}")
-                return render(request, 'index.html', {
-                    'error': error,
-                    'tema': tema,
-                    'num_partes': num_partes,
-                    'has_content': False,
-                    'app_title': 'Chunkify'
-                })
+                    logger.info(f"Mensagem de erro exibida: {error}")
+                    return render(request, 'index.html', {
+                        'error': error,
+                        'tema': tema,
+                        'num_partes': num_partes,
+                        'has_content': False,
+                        'app_title': 'Chunkify'
+                    })
             
-            # Converter markdown para HTML
-            if result:
-                try:
-                    # Função aprimorada para processamento de mini-desafios
-                    def process_mini_challenges(markdown_text):
-                        # Garantir quebras de linha consistentes
-                        markdown_text = markdown_text.replace("\r\n", "\n")
-                        
-                        # Corrigir setas duplicadas antes do processamento
-                        markdown_text = markdown_text.replace('↳ ↳', '↳')
-                        
-                        # Pré-processamento: inserir marcadores de início de fase
-                        phase_pattern = r'(^\d+️⃣\s+\*\*Fase\s+\d+:.*?\*\*\s*$)'
-                        markdown_text = re.sub(phase_pattern, r'<!-- phase-marker -->\n\1', markdown_text, flags=re.MULTILINE)
-                        
-                        # Dividir o conteúdo em linhas para processamento
-                        lines = markdown_text.split('\n')
-                        result_lines = []
-                        
-                        # Mapeamento para rastrear as conquistas e seus mini-desafios
-                        conquest_map = {}
-                        current_conquest = None
-                        current_phase = None
-                        
-                        # Primeira passagem: identificar todas as conquistas e fases
-                        for i, line in enumerate(lines):
-                            if '<!-- phase-marker -->' in line:
-                                current_phase = i + 1  # A linha seguinte contém a fase
-                            
-                            if "**Conquista:**" in line or "*Conquista:*" in line:
-                                conquest_id = f"conquest-{len(conquest_map)}"
-                                conquest_map[conquest_id] = {
-                                    'line_number': i,
-                                    'phase': current_phase,
-                                    'mini_challenges': []
-                                }
-                                current_conquest = conquest_id
-                            
-                            if ("*Mini-desafio:*" in line or "Mini-desafio:" in line) and current_conquest:
-                                conquest_map[current_conquest]['mini_challenges'].append(i)
-                        
-                        # Segunda passagem: processar todas as linhas e criar estrutura aninhada
-                        i = 0
-                        while i < len(lines):
-                            line = lines[i]
-                            
-                            # Substituir marcador de fase
-                            if '<!-- phase-marker -->' in line:
-                                result_lines.append('')  # Linha em branco para separar
-                                i += 1
-                                continue
-                            
-                            # Identificar linhas de conquistas e aplicar classes
-                            if "**Conquista:**" in line or "*Conquista:*" in line:
-                                # Adicionar classe e começar uma estrutura para a conquista
-                                conquest_line = line.replace("- **Conquista:**", "- <span class='conquest-marker'>**Conquista:**</span>")
-                                conquest_line = conquest_line.replace("- *Conquista:*", "- <span class='conquest-marker'>*Conquista:*</span>")
-                                result_lines.append(conquest_line)
-                                
-                                # Verificar se a próxima linha é um mini-desafio
-                                has_mini_challenge = False
-                                
-                                # Procurar pela próxima linha para verificar se é um mini-desafio
-                                next_index = i + 1
-                                while next_index < len(lines) and not ("**Conquista:**" in lines[next_index] or "*Conquista:*" in lines[next_index]):
-                                    if "*Mini-desafio:*" in lines[next_index] or "Mini-desafio:" in lines[next_index]:
-                                        has_mini_challenge = True
-                                        break
-                                    next_index += 1
-                                
-                                if has_mini_challenge:
-                                    # Começar uma lista HTML explícita para os mini-desafios
-                                    result_lines.append("<ul class='mini-challenges-list'>")
-                                    
-                                    # Encontrar e processar todos os mini-desafios consecutivos
-                                    next_i = i + 1
-                                    while next_i < len(lines):
-                                        if "**Conquista:**" in lines[next_i] or "*Conquista:*" in lines[next_i]:
-                                            break
-                                        
-                                        if "*Mini-desafio:*" in lines[next_i] or "Mini-desafio:" in lines[next_i]:
-                                            mini_line = lines[next_i].strip()
-                                            if mini_line.startswith("- "):
-                                                mini_line = mini_line[2:]
-                                            
-                                            # Aplicar formatação consistente
-                                            mini_line = mini_line.replace("*Mini-desafio:*", "<span class='mini-desafio'>↳ <em>Mini-desafio:</em></span>")
-                                            mini_line = mini_line.replace("Mini-desafio:", "<span class='mini-desafio'>↳ <em>Mini-desafio:</em></span>")
-                                            
-                                            # Adicionar como item de lista
-                                            result_lines.append(f"  <li class='mini-challenge'>{mini_line}</li>")
-                                            
-                                            # Marcar como processado para evitar duplicação
-                                            lines[next_i] = f"<!-- processed: {next_i} -->"
-                                        
-                                        next_i += 1
-                                    
-                                    # Fechar a lista de mini-desafios
-                                    result_lines.append("</ul>")
-                            
-                            # Se for um mini-desafio já processado, pular
-                            elif line.startswith("<!-- processed:"):
-                                pass
-                            # Se for um mini-desafio órfão (não vinculado diretamente a uma conquista)
-                            elif "*Mini-desafio:*" in line or "Mini-desafio:" in line:
-                                # Tentar encontrar a última conquista para associar
-                                last_conquest_index = -1
-                                for j in range(len(result_lines) - 1, -1, -1):
-                                    if "conquest-marker" in result_lines[j]:
-                                        last_conquest_index = j
-                                        break
-                                
-                                if last_conquest_index >= 0:
-                                    # Verificar se já existe uma lista de mini-desafios
-                                    if last_conquest_index + 1 < len(result_lines) and result_lines[last_conquest_index + 1] == "<ul class='mini-challenges-list'>":
-                                        # Encontrar o último </ul> para adicionar antes dele
-                                        for k in range(last_conquest_index + 2, len(result_lines)):
-                                            if result_lines[k] == "</ul>":
-                                                # Formatar mini-desafio
-                                                mini_line = line.strip()
-                                                if mini_line.startswith("- "):
-                                                    mini_line = mini_line[2:]
-                                                
-                                                mini_line = mini_line.replace("*Mini-desafio:*", "<span class='mini-desafio'>↳ <em>Mini-desafio:</em></span>")
-                                                mini_line = mini_line.replace("Mini-desafio:", "<span class='mini-desafio'>↳ <em>Mini-desafio:</em></span>")
-                                                
-                                                # Adicionar à lista existente
-                                                result_lines.insert(k, f"  <li class='mini-challenge'>{mini_line}</li>")
-                                                break
-                                    else:
-                                        # Criar nova lista para mini-desafios
-                                        result_lines.insert(last_conquest_index + 1, "<ul class='mini-challenges-list'>")
-                                        
-                                        # Formatar mini-desafio
-                                        mini_line = line.strip()
-                                        if mini_line.startswith("- "):
-                                            mini_line = mini_line[2:]
-                                        
-                                        mini_line = mini_line.replace("*Mini-desafio:*", "<span class='mini-desafio'>↳ <em>Mini-desafio:</em></span>")
-                                        mini_line = mini_line.replace("Mini-desafio:", "<span class='mini-desafio'>↳ <em>Mini-desafio:</em></span>")
-                                        
-                                        # Adicionar mini-desafio à lista
-                                        result_lines.insert(last_conquest_index + 2, f"  <li class='mini-challenge'>{mini_line}</li>")
-                                        result_lines.insert(last_conquest_index + 3, "</ul>")
-                                else:
-                                    # Se não encontrar conquista, adicionar o mini-desafio normalmente
-                                    result_lines.append(line)
-                            else:
-                                # Outras linhas são adicionadas sem alteração
-                                result_lines.append(line)
-                            
-                            i += 1
-                        
-                        # Limpar linhas vazias consecutivas
-                        cleaned_lines = []
-                        for i, line in enumerate(result_lines):
-                            if i > 0 and line.strip() == '' and result_lines[i-1].strip() == '':
-                                continue
-                            cleaned_lines.append(line)
-                        
-                        return '\n'.join(cleaned_lines)
+                # Converter markdown para HTML
+                if result:
+                    try:
+                        html_result = render_sections(sections)
                     
-                    # Aplicar o pré-processamento
-                    processed_result = process_mini_challenges(result)
-
-                    # Usar safe para garantir que o HTML não é escapado
-                    html_result = mark_safe(markdown.markdown(
-                        processed_result, 
-                        extensions=['extra', 'fenced_code', 'tables', 'nl2br', 'sane_lists'],
-                        output_format='html5'
-                    ))
-                    
-                    # Verificar se temos um resultado válido
-                    if not html_result or not str(html_result).strip():
-                        logger.warning("Resultado HTML vazio ou inválido")
-                        error = "Erro: Não foi possível gerar o conteúdo solicitado. Resultado vazio."
-                except Exception as md_error:
-                    logger.error(f"Erro na conversão Markdown: {str(md_error)}")
-                    error = "Erro na formatação do conteúdo. Por favor, tente novamente."
+                        # Verificar se temos um resultado válido
+                        if not html_result or not str(html_result).strip():
+                            logger.warning("Resultado HTML vazio ou inválido")
+                            error = "Erro: Não foi possível gerar o conteúdo solicitado. Resultado vazio."
+                        elif missing_sections:
+                            # Guia incompleto não vai para o cache; as seções prontas já estão memorizadas
+                            warning = describe_missing_sections(missing_sections)
+                        else:
+                            guide = store_guide(tema, num_partes, llm.model_name, sections)
+                            permalink_url = guide.get_absolute_url() if guide else None
+                    except Exception as md_error:
+                        logger.error(f"Erro na conversão Markdown: {str(md_error)}")
+                        error = "Erro na formatação do conteúdo. Por favor, tente novamente."
                     
     except requests.exceptions.HTTPError as http_error:
         logger.error(f"HTTP Error: {str(http_error)}")
@@ -624,17 +198,338 @@ Seja específico sobre {tema}, não use texto genérico."""
         'result': result,
         'html_result': html_result,
         'error': error,
+        'warning': warning,
         'tema': tema,
         'num_partes': num_partes,
         'has_content': bool(html_result),
+        'permalink_url': permalink_url,
         'app_title': 'Chunkify'
     }
     
     return render(request, 'index.html', context)
 
+async def test_gemini_async(request):
+    """
+    Versão assíncrona de test_gemini para execução sob ASGI (ex: uvicorn).
+    
+    As chamadas ao modelo usam LLMBackend.agenerate, então a espera pela
+    API não ocupa uma thread por requisição e um único processo pode manter
+    muitas gerações em andamento.
+    """
+    context = {
+        'result': None,
+        'html_result': None,
+        'error': None,
+        'warning': None,
+        'tema': "",
+        'num_partes': 2,
+        'has_content': False,
+        'app_title': 'Chunkify'
+    }
+    
+    if request.method == 'POST':
+        tema = request.POST.get('tema', '')
+        context['tema'] = tema
+        logger.info(f"Tema recebido (async): '{tema}' (tamanho: {len(tema)} caracteres)")
+        
+        num_partes, error = validate_guide_request(tema, request.POST.get('num_partes', '2'))
+        context['num_partes'] = num_partes
+        if error:
+            context['error'] = error
+            return render(request, 'index.html', context)
+        
+        llm = get_backend()
+        # Markdown e HTML do guia em cache são lidos do banco, então são montados fora do event loop
+        cached_guide = await sync_to_async(get_cached_guide_payload)(tema, num_partes, llm.model_name)
+        if cached_guide is None:
+            # Requisições idênticas simultâneas esperam a geração em andamento, como em test_gemini
+            async with asingle_flight(make_cache_key(tema, num_partes, llm.model_name)) as waited:
+                if waited:
+                    cached_guide = await sync_to_async(get_cached_guide_payload)(tema, num_partes, llm.model_name)
+                if cached_guide is None:
+                    await agenerate_guide_context(context, llm, tema, num_partes, request.POST.get('strategy'))
+                    return render(request, 'index.html', context)
+        
+        context.update({
+            'result': cached_guide['markdown'],
+            'html_result': mark_safe(cached_guide['html']),
+            'has_content': True,
+            'permalink_url': cached_guide['permalink_url'],
+        })
+    
+    return render(request, 'index.html', context)
+
+async def agenerate_guide_context(context, llm, tema, num_partes, strategy):
+    """Gera o guia na view assíncrona e preenche o contexto da página com o resultado ou o erro"""
+    try:
+        sections, missing_sections = await abuild_guide(llm, tema, num_partes, strategy=strategy)
+        result = assemble_guide(sections)
+        logger.info(f"Geração completa (async), resultado com {len(result)} caracteres")
+    except Exception as api_error:
+        logger.error(f"API Error (async): {str(api_error)}")
+        logger.error(traceback.format_exc())
+        context['error'] = describe_api_error(api_error)
+        return
+    
+    try:
+        html_result = render_sections(sections)
+        if html_result and str(html_result).strip():
+            if missing_sections:
+                context['warning'] = describe_missing_sections(missing_sections)
+            else:
+                guide = await sync_to_async(store_guide)(tema, num_partes, llm.model_name, sections)
+                context['permalink_url'] = guide.get_absolute_url() if guide else None
+            context.update({'result': result, 'html_result': html_result, 'has_content': True})
+        else:
+            logger.warning("Resultado HTML vazio ou inválido")
+            context['error'] = "Erro: Não foi possível gerar o conteúdo solicitado. Resultado vazio."
+    except Exception as md_error:
+        logger.error(f"Erro na conversão Markdown: {str(md_error)}")
+        context['error'] = "Erro na formatação do conteúdo. Por favor, tente novamente."
+
+async def iterate_in_thread(iterator):
+    """
+    Consome um iterador síncrono em uma thread própria, item a item, sem
+    bloquear o event loop. A thread compartilhada de sync_to_async não serve:
+    enquanto um stream esperasse o modelo, as demais requisições esperariam
+    por ela.
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='stream')
+    finished = object()
+    try:
+        while True:
+            item = await loop.run_in_executor(executor, next, iterator, finished)
+            if item is finished:
+                return
+            yield item
+    finally:
+        # Encerrar o gerador (ex: cliente desconectado) na mesma thread, liberando as conexões de banco dela
+        executor.submit(run_in_worker, getattr(iterator, 'close', lambda: None))
+        executor.shutdown(wait=False)
+
+def streaming_content(request, iterator):
+    """
+    Conteúdo de uma StreamingHttpResponse de view síncrona. Sob ASGI o Django
+    leria um iterador síncrono inteiro antes de enviar a resposta, então ele
+    é consumido em uma thread e entregue como iterador assíncrono.
+    """
+    if isinstance(request, ASGIRequest):
+        return iterate_in_thread(iter(iterator))
+    return iterator
+
+def sse_event(event, data):
+    """Formata um evento Server-Sent Events com payload JSON"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def stream_guide(request):
+    """
+    Versão em streaming (Server-Sent Events) da geração do guia.
+    
+    Envia o sumário derivado do esqueleto assim que ele é processado e, em
+    seguida, cada seção (introdução, partes e conclusão) já convertida para
+    HTML, na ordem em que ficam prontas. O cliente reposiciona as seções
+    usando o campo 'position'.
+    
+    Com ?tokens=1 as respostas do modelo também são consumidas em streaming
+    e eventos 'delta' trazem prévias em HTML dos blocos já estáveis de cada
+    seção; o evento 'section' continua trazendo o HTML definitivo.
+    """
+    tema = request.GET.get('tema', '')
+    stream_tokens = request.GET.get('tokens') == '1'
+    num_partes, error = validate_guide_request(tema, request.GET.get('num_partes', '2'))
+    if not error and not tema:
+        error = "Informe um tema para gerar o guia."
+    # As etapas rodam depois do cabeçalho Server-Timing; a duração delas vai no evento 'done'
+    trace = RequestTrace()
+    
+    def event_stream():
+        if error:
+            yield sse_event('error', {'message': error})
+            return
+        
+        def cached_guide_events(cached_guide):
+            yield sse_event('guide', {'html': cached_guide.html, 'permalink': cached_guide.get_absolute_url()})
+            yield sse_event('done', {'server_timing': trace.server_timing()})
+        
+        llm = get_backend()
+        cached_guide = get_cached_guide(tema, num_partes, llm.model_name)
+        if cached_guide is not None:
+            yield from cached_guide_events(cached_guide)
+            return
+        
+        # Requisições idênticas simultâneas (aqui, na view principal ou na fila) esperam a
+        # geração em andamento e consultam o cache de novo (ver main/singleflight.py)
+        with single_flight(make_cache_key(tema, num_partes, llm.model_name)) as waited:
+            cached_guide = get_cached_guide(tema, num_partes, llm.model_name) if waited else None
+            if cached_guide is not None:
+                yield from cached_guide_events(cached_guide)
+                return
+            
+            try:
+                logger.info(f"Processando '{tema}' com {num_partes} partes em modo streaming")
+                plan = plan_guide(llm, tema, num_partes)
+                skeleton_parts = plan['skeleton_parts']
+                yield sse_event('outline', {
+                    'tema': tema,
+                    'num_partes': num_partes,
+                    'phases': [
+                        {'title': title, 'range': format_phase_range(phase_range)}
+                        for title, phase_range in zip(plan['phase_titles'], plan['phase_distribution'])
+                    ],
+                    'parts': [
+                        {'number': part_num, 'title': skeleton_parts[part_num].title}
+                        for part_num in range(1, num_partes + 1)
+                    ],
+                })
+            
+                # Posição de cada seção no guia final: introdução, partes, conclusão
+                positions = {'intro': 0, 'conclusion': num_partes + 1}
+                positions.update({f'part-{part_num}': part_num for part_num in range(1, num_partes + 1)})
+            
+                if stream_tokens:
+                    renderers = {key: IncrementalMarkdownRenderer() for key in positions}
+                    events = iter_section_events(llm, tema, num_partes, plan)
+                else:
+                    events = (('section', key, content) for key, content in iter_sections(llm, tema, num_partes, plan))
+            
+                contents = {}
+                missing_sections = []
+                for kind, key, content in events:
+                    if kind == 'delta':
+                        preview = renderers[key].feed(content)
+                        if preview:
+                            yield sse_event('delta', {
+                                'key': key,
+                                'position': positions[key],
+                                'html': str(preview),
+                            })
+                        continue
+                
+                    if content is None:
+                        missing_sections.append(key)
+                        content = missing_section_markdown(key, tema, num_partes, plan)
+                    contents[key] = content
+                    yield sse_event('section', {
+                        'key': key,
+                        'position': positions[key],
+                        'html': str(render_fragment(content)),
+                        'missing': key in missing_sections,
+                    })
+            
+                done = {}
+                if missing_sections:
+                    yield sse_event('warning', {'message': describe_missing_sections(missing_sections)})
+                else:
+                    # Armazenar o guia completo para as próximas requisições
+                    sections = order_sections(contents, num_partes)
+                    guide = store_guide(tema, num_partes, llm.model_name, sections)
+                    if guide is not None:
+                        done['permalink'] = guide.get_absolute_url()
+                done['server_timing'] = trace.server_timing()
+                yield sse_event('done', done)
+            except Exception as api_error:
+                logger.error(f"API Error (streaming): {str(api_error)}")
+                logger.error(traceback.format_exc())
+                yield sse_event('error', {'message': describe_api_error(api_error)})
+    
+    response = StreamingHttpResponse(
+        streaming_content(request, iter_with_trace(event_stream(), trace)), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Evitar que proxies (ex: nginx) acumulem a resposta antes de enviar
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@require_POST
+def enqueue_guide(request):
+    """
+    Enfileira a geração do guia e responde imediatamente com o id do job.
+    
+    A geração é feita pelo worker (python manage.py run_generation_worker) e
+    o progresso pode ser consultado em job_status.
+    """
+    tema = request.POST.get('tema', '')
+    num_partes, error = validate_guide_request(tema, request.POST.get('num_partes', '2'))
+    if not error and not tema:
+        error = "Informe um tema para gerar o guia."
+    if error:
+        return JsonResponse({'error': error}, status=400)
+    
+    job = enqueue_job(tema, num_partes)
+    return JsonResponse({
+        'job_id': str(job.public_id),
+        'status_url': reverse('job_status', args=[job.public_id]),
+    }, status=202)
+
+def job_status(request, job_id):
+    """Retorna o status e o progresso por etapa de um job de geração"""
+    job = get_object_or_404(GenerationJob, public_id=job_id)
+    data = {
+        'job_id': str(job.public_id),
+        'tema': job.tema,
+        'num_partes': job.num_partes,
+        'status': job.status,
+        'stage': job.stage,
+        'progress': {
+            'completed': job.completed_steps,
+            'total': job.total_steps,
+        },
+    }
+    if job.status == GenerationJob.STATUS_DONE:
+        data['html'] = job.html_result
+        if job.error:
+            data['warning'] = job.error
+    elif job.status == GenerationJob.STATUS_FAILED:
+        data['error'] = job.error
+    return JsonResponse(data)
+
+@require_safe
+def guide_permalink(request, guide_id):
+    """
+    Link permanente de um guia armazenado: o HTML já renderizado sai de uma
+    única consulta pela chave única, sem nenhuma chamada à API. ETag (hash do
+    conteúdo) e Last-Modified permitem respostas 304, e o Cache-Control
+    público deixa o navegador ou uma CDN absorverem as visitas repetidas.
+    """
+    # Guia e HTML das seções em uma só consulta; cada seção só é descomprimida ao montar a página
+    sections = list(
+        GuideSection.objects.filter(guide__public_id=guide_id).select_related('guide', 'html_blob')
+    )
+    if not sections:
+        raise Http404
+    guide = sections[0].guide
+    etag = quote_etag(guide.content_hash)
+    last_modified = int(guide.updated_at.timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        # Sem o formulário (e o cookie de CSRF), a resposta é a mesma para qualquer visitante
+        response = render(request, 'index.html', {
+            'html_result': mark_safe(Guide.HTML_SEPARATOR.join(section.html for section in sections)),
+            'tema': guide.tema,
+            'num_partes': guide.num_partes,
+            'has_content': True,
+            'is_permalink': True,
+            'permalink_url': request.path,
+            'app_title': 'Chunkify'
+        })
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=settings.GUIDE_PERMALINK_MAX_AGE)
+    return response
+
+def metrics(request):
+    """Métricas por etapa da geração no formato de texto do Prometheus"""
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 def visualize_markdown(request):
     """
     Função para visualizar a saída markdown original da API Gemini (apenas introdução)
+    
+    Com ?stream=1 o markdown bruto é enviado em texto puro, à medida que os
+    tokens chegam da API.
     """
     raw_markdown = None
     error = None
@@ -642,11 +537,8 @@ def visualize_markdown(request):
     num_partes = int(request.GET.get('num_partes', '3'))
     
     try:
-        # Configurar o cliente Gemini
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        
-        # Usar o mesmo modelo da função principal
-        gemini_model = genai.GenerativeModel('gemini-2.0-flash')
+        # Usar o mesmo provedor da função principal
+        llm = get_backend()
         
         # Usar o mesmo prompt para gerar a introdução
         intro_prompt = f"""Crie apenas a introdução para um guia de estudos sobre "{tema}" em {num_partes} partes.
@@ -702,12 +594,26 @@ IMPORTANTE:
 4. Seja MUITO ESPECÍFICO sobre {tema}, usando exemplos concretos e terminologia própria desta área
 5. Escreva APENAS a introdução, não comece as partes!"""
 
+        if request.GET.get('stream') == '1':
+            def token_stream():
+                try:
+                    yield from call_model(llm, intro_prompt, 'intro', stream=True)
+                except Exception as stream_error:
+                    logger.error(f"Erro no streaming do markdown: {str(stream_error)}")
+                    yield f"\n\nErro ao gerar o markdown: {str(stream_error)}"
+            
+            response = StreamingHttpResponse(
+                streaming_content(request, token_stream()), content_type='text/plain; charset=utf-8'
+            )
+            response['X-Accel-Buffering'] = 'no'
+            return response
+        
         # Gerar apenas a introdução
-        intro_response = gemini_model.generate_content(intro_prompt)
-        if hasattr(intro_response, 'text'):
+        intro_response = call_model(llm, intro_prompt, 'intro')
+        if intro_response.text:
             raw_markdown = intro_response.text
         else:
-            error = "Resposta inválida da API Gemini."
+            error = "Resposta inválida do provedor de LLM."
             
     except Exception as e:
         error = f"Erro ao gerar o markdown: {str(e)}"
@@ -0,0 +1,127 @@
+/**
+ * Geração em streaming (Server-Sent Events) a partir do formulário principal.
+ *
+ * Com EventSource disponível, o envio do formulário abre /stream/?tokens=1 e
+ * mostra cada seção assim que chega: os eventos 'delta' trazem prévias e o
+ * evento 'section' o HTML definitivo, posicionado pelo campo 'position'.
+ * Quando o guia completo é armazenado, a página segue para o link permanente,
+ * onde index.js monta os cards. Sem EventSource o formulário é enviado
+ * normalmente (POST).
+ */
+document.addEventListener('DOMContentLoaded', () => {
+    const form = document.getElementById('chunk-form');
+    const container = document.getElementById('stream-container');
+    if (!form || !container || !form.dataset.streamUrl || typeof EventSource === 'undefined') {
+        return;
+    }
+
+    form.addEventListener('submit', (event) => {
+        event.preventDefault();
+        startStream(form, container);
+    });
+});
+
+function startStream(form, container) {
+    const params = new URLSearchParams({
+        tema: form.elements.tema.value,
+        num_partes: form.elements.num_partes.value,
+        tokens: '1'
+    });
+    const submitButton = form.querySelector('button[type="submit"]');
+    const status = container.querySelector('#stream-status');
+    const sectionsContainer = container.querySelector('#stream-sections');
+    const messages = container.querySelector('#stream-messages');
+
+    sectionsContainer.innerHTML = '';
+    messages.innerHTML = '';
+    status.classList.remove('d-none');
+    container.classList.remove('d-none');
+    submitButton.disabled = true;
+
+    const source = new EventSource(`${form.dataset.streamUrl}?${params}`);
+
+    const finish = () => {
+        source.close();
+        status.classList.add('d-none');
+        submitButton.disabled = false;
+    };
+
+    // Um elemento por seção, mantidos na ordem do guia (introdução, partes, conclusão)
+    const sectionElement = (position) => {
+        let element = sectionsContainer.querySelector(`[data-position="${position}"]`);
+        if (!element) {
+            element = document.createElement('div');
+            element.className = 'card shadow mb-4';
+            element.dataset.position = position;
+            element.innerHTML = '<div class="card-body"></div>';
+            const next = Array.from(sectionsContainer.children)
+                .find((child) => Number(child.dataset.position) > position);
+            sectionsContainer.insertBefore(element, next || null);
+        }
+        return element.querySelector('.card-body');
+    };
+
+    source.addEventListener('outline', (event) => {
+        const outline = JSON.parse(event.data);
+        outline.parts.forEach((part) => {
+            sectionElement(part.number).innerHTML =
+                `<h2 class="h5 text-muted">Parte ${part.number}: ${escapeHtml(part.title)}</h2>`;
+        });
+    });
+
+    source.addEventListener('delta', (event) => {
+        const delta = JSON.parse(event.data);
+        sectionElement(delta.position).innerHTML = delta.html;
+    });
+
+    source.addEventListener('section', (event) => {
+        const section = JSON.parse(event.data);
+        const body = sectionElement(section.position);
+        body.innerHTML = section.html;
+        body.parentElement.classList.toggle('border-warning', section.missing);
+    });
+
+    // Guia já pronto no cache: ir direto para o link permanente
+    source.addEventListener('guide', (event) => {
+        const guide = JSON.parse(event.data);
+        finish();
+        window.location.href = guide.permalink;
+    });
+
+    source.addEventListener('warning', (event) => {
+        showMessage(messages, 'warning', JSON.parse(event.data).message);
+    });
+
+    source.addEventListener('done', (event) => {
+        const done = JSON.parse(event.data);
+        finish();
+        if (done.permalink) {
+            window.location.href = done.permalink;
+        }
+    });
+
+    // Recebe tanto o evento 'error' do servidor (com dados) quanto falhas de conexão do EventSource
+    source.addEventListener('error', (event) => {
+        if (source.readyState === EventSource.CLOSED && !event.data) {
+            return;
+        }
+        const message = event.data
+            ? JSON.parse(event.data).message
+            : 'A conexão com o servidor foi interrompida. Por favor, tente novamente.';
+        showMessage(messages, 'danger', message);
+        finish();
+    });
+}
+
+function showMessage(messages, level, text) {
+    const alert = document.createElement('div');
+    alert.className = `alert alert-${level} shadow`;
+    alert.textContent = text;
+    messages.appendChild(alert);
+}
+
+function escapeHtml(text) {
+    const element = document.createElement('span');
+    element.textContent = text;
+    return element.innerHTML;
+}